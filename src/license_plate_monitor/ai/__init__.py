@@ -1,3 +1,18 @@
 from .detector import LicensePlateDetector
+from .ocr import OCRConfig, PlateOCRPool, PlateRecognizer
+from .reid import ReIDIndex
+from .runtime import RuntimeProfile
+from .scheduler import InferenceScheduler, ScheduleConfig
+from .tiling import TilingConfig
 
-__all__ = ["LicensePlateDetector"]
+__all__ = [
+    "InferenceScheduler",
+    "LicensePlateDetector",
+    "OCRConfig",
+    "PlateOCRPool",
+    "PlateRecognizer",
+    "ReIDIndex",
+    "RuntimeProfile",
+    "ScheduleConfig",
+    "TilingConfig",
+]
@@ -0,0 +1,226 @@
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any
+
+import cv2
+import numpy as np
+import numpy.typing as npt
+
+from license_plate_monitor.ai.detector import LicensePlateDetector
+from license_plate_monitor.ai.runtime import DEFAULT_PROFILE_PATH, RuntimeProfile
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TrialResult:
+    """Kết quả đo của một tổ hợp thông số"""
+
+    profile: RuntimeProfile
+    fps: float
+    p95_ms: float
+    recall: float
+
+    def dominates(self, other: "TrialResult") -> bool:
+        """True nếu tốt hơn hoặc bằng ở mọi tiêu chí và tốt hơn hẳn ở ít nhất một"""
+        no_worse = (
+            self.fps >= other.fps
+            and self.p95_ms <= other.p95_ms
+            and self.recall >= other.recall
+        )
+        better = (
+            self.fps > other.fps
+            or self.p95_ms < other.p95_ms
+            or self.recall > other.recall
+        )
+        return no_worse and better
+
+    def __str__(self) -> str:
+        return (
+            f"{self.profile} -> {self.fps:.1f} FPS, p95 {self.p95_ms:.1f} ms, "
+            f"recall {self.recall:.3f}"
+        )
+
+
+def load_clip(path: str, max_frames: int) -> list[npt.NDArray[Any]]:
+    """Giải mã trước clip mẫu vào RAM để thời gian decode không ảnh hưởng phép đo"""
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Không thể mở clip mẫu: {path}")
+
+    frames: list[npt.NDArray[Any]] = []
+    try:
+        while len(frames) < max_frames:
+            success, frame = cap.read()
+            if not success:
+                break
+            frames.append(frame)
+    finally:
+        cap.release()
+
+    if not frames:
+        raise ValueError(f"Clip mẫu không có frame nào: {path}")
+    return frames
+
+
+def box_recall(
+    boxes: npt.NDArray[Any], reference: npt.NDArray[Any], iou_threshold: float = 0.5
+) -> tuple[int, int]:
+    """Đếm số box tham chiếu được khớp (cùng lớp, IoU >= ngưỡng) trên tổng số"""
+    if len(reference) == 0:
+        return 0, 0
+    if len(boxes) == 0:
+        return 0, len(reference)
+
+    # Ma trận IoU giữa box tham chiếu (hàng) và box cần đánh giá (cột)
+    ref, det = reference[:, None, :4], boxes[None, :, :4]
+    ix1 = np.maximum(ref[..., 0], det[..., 0])
+    iy1 = np.maximum(ref[..., 1], det[..., 1])
+    ix2 = np.minimum(ref[..., 2], det[..., 2])
+    iy2 = np.minimum(ref[..., 3], det[..., 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area_ref = (ref[..., 2] - ref[..., 0]) * (ref[..., 3] - ref[..., 1])
+    area_det = (det[..., 2] - det[..., 0]) * (det[..., 3] - det[..., 1])
+    iou = inter / np.maximum(area_ref + area_det - inter, 1e-6)
+    iou[reference[:, None, 5] != boxes[None, :, 5]] = 0.0
+
+    # Ghép tham lam theo IoU giảm dần, mỗi box chỉ dùng một lần
+    matched = 0
+    used = np.zeros(len(boxes), dtype=bool)
+    for r in np.argsort(-iou.max(axis=1)):
+        candidates = np.where(~used & (iou[r] >= iou_threshold))[0]
+        if len(candidates):
+            used[candidates[np.argmax(iou[r, candidates])]] = True
+            matched += 1
+    return matched, len(reference)
+
+
+def pareto_front(results: list[TrialResult]) -> list[TrialResult]:
+    return [r for r in results if not any(o.dominates(r) for o in results)]
+
+
+def select_best(results: list[TrialResult], min_recall: float) -> TrialResult:
+    """
+    Chọn profile nhanh nhất trên biên Pareto mà vẫn đạt recall tối thiểu.
+    Nếu không có tổ hợp nào đạt, chọn tổ hợp có recall cao nhất.
+    """
+    front = pareto_front(results)
+    eligible = [r for r in front if r.recall >= min_recall]
+    if eligible:
+        return max(eligible, key=lambda r: (r.fps, -r.p95_ms))
+    return max(front, key=lambda r: (r.recall, r.fps))
+
+
+def run_trial(
+    detector: LicensePlateDetector,
+    frames: list[npt.NDArray[Any]],
+    profile: RuntimeProfile,
+    conf_threshold: float,
+    warmup: int,
+) -> tuple[float, float, list[npt.NDArray[Any]]]:
+    """
+    Chạy lại clip với một profile, trả về FPS, p95 (ms) và box từng frame.
+    Với streams > 1, frame được gửi theo lô 'streams' ảnh để các stream của
+    OpenVINO có việc chạy song song; độ trễ mỗi frame là thời gian cả lô.
+    """
+    detector.set_profile(profile)
+    batch = max(1, profile.streams)
+    for i in range(0, min(warmup, len(frames)), batch):
+        detector.detect_batch(frames[i : i + batch], conf_threshold)
+
+    latencies: list[float] = []
+    outputs: list[npt.NDArray[Any]] = []
+    start = time.perf_counter()
+    for i in range(0, len(frames), batch):
+        chunk = frames[i : i + batch]
+        t0 = time.perf_counter()
+        if batch == 1:
+            outputs.append(detector.detect(chunk[0], conf_threshold))
+        else:
+            outputs.extend(detector.detect_batch(chunk, conf_threshold))
+        latencies.extend([time.perf_counter() - t0] * len(chunk))
+    elapsed = time.perf_counter() - start
+
+    fps = len(frames) / elapsed if elapsed > 0 else 0.0
+    p95_ms = float(np.percentile(latencies, 95)) * 1000
+    return fps, p95_ms, outputs
+
+
+def autotune(
+    clip_path: str,
+    imgsz_grid: list[int],
+    thread_grid: list[int],
+    stream_grid: list[int],
+    output_path: str = DEFAULT_PROFILE_PATH,
+    model_name: str | None = None,
+    conf_threshold: float = 0.5,
+    max_frames: int = 150,
+    warmup: int = 5,
+    min_recall: float = 0.95,
+) -> TrialResult:
+    """
+    Đo thông lượng, độ trễ p95 và recall (so với imgsz lớn nhất) trên lưới
+    thông số, sau đó lưu profile tốt nhất trên biên Pareto.
+    """
+    frames = load_clip(clip_path, max_frames)
+    detector = (
+        LicensePlateDetector(model_name, profile_path=None)
+        if model_name
+        else LicensePlateDetector(profile_path=None)
+    )
+    print(f"[*] Autotune trên {len(frames)} frame từ {clip_path}")
+
+    # Kết quả ở kích thước đầu vào lớn nhất làm mốc để tính recall
+    reference_size = max(imgsz_grid)
+    _, _, reference = run_trial(
+        detector, frames, RuntimeProfile(imgsz=reference_size), conf_threshold, 1
+    )
+
+    results: list[TrialResult] = []
+    for imgsz in sorted(imgsz_grid):
+        for threads in thread_grid:
+            for streams in stream_grid:
+                if streams > 1 and not detector.batch_supported:
+                    # Không chạy batch được thì số stream không có tác dụng
+                    print(f"[!] Bỏ qua streams={streams}: mô hình không hỗ trợ batch")
+                    continue
+                profile = RuntimeProfile(imgsz=imgsz, threads=threads, streams=streams)
+                try:
+                    fps, p95_ms, outputs = run_trial(
+                        detector, frames, profile, conf_threshold, warmup
+                    )
+                except Exception as e:
+                    # Mô hình OpenVINO xuất với shape cố định sẽ từ chối imgsz khác
+                    print(f"[!] Bỏ qua {profile}: {e}")
+                    continue
+                if streams > 1 and not detector.batch_supported:
+                    print(f"[!] Bỏ qua {profile}: mô hình không hỗ trợ batch")
+                    continue
+
+                matched, total = 0, 0
+                for boxes, ref in zip(outputs, reference):
+                    m, t = box_recall(boxes, ref)
+                    matched += m
+                    total += t
+                recall = matched / total if total else 1.0
+
+                result = TrialResult(profile, fps, p95_ms, recall)
+                results.append(result)
+                print(f"    {result}")
+
+    if not results:
+        raise RuntimeError("Không có tổ hợp thông số nào chạy được.")
+
+    best = select_best(results, min_recall)
+    best.profile.metrics = {
+        "fps": round(best.fps, 2),
+        "p95_ms": round(best.p95_ms, 2),
+        "recall": round(best.recall, 4),
+        "tuned_at": datetime.now().timestamp(),
+    }
+    best.profile.save(output_path)
+    print(f"[+] Profile tốt nhất: {best}")
+    print(f"[+] Đã lưu vào {output_path}")
+    return best
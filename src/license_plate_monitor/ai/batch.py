@@ -0,0 +1,464 @@
+import json
+import logging
+import multiprocessing
+import os
+import shutil
+import subprocess
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any
+
+import cv2
+import numpy as np
+import numpy.typing as npt
+
+from license_plate_monitor.ai.detector import LicensePlateDetector
+from license_plate_monitor.ai.reid import ReIDIndex
+from license_plate_monitor.ai.runtime import RuntimeProfile
+from license_plate_monitor.ai.tiling import TilingConfig
+from license_plate_monitor.ai.tracks import TrackRegistry
+from license_plate_monitor.analytics.counting import CountingConfig, ZoneCounter
+from license_plate_monitor.config import load_stream_config, stream_key
+
+logger = logging.getLogger(__name__)
+
+BATCH_DIR = os.path.join("detections", "batch")
+
+# Detector riêng của mỗi tiến trình worker, nạp một lần cho mọi đoạn
+_worker_detector: LicensePlateDetector | None = None
+
+
+@dataclass
+class ChunkTask:
+    """
+    Một đoạn video cho worker. Worker giải mã [start, stop) nhưng chỉ tính
+    lượt đếm trong [own_start, own_end); phần đầu để tracker "khởi động",
+    phần sau 'end' trùng với đoạn kế tiếp để nối track.
+    """
+
+    path: str
+    index: int
+    start: int
+    end: int
+    stop: int
+    own_start: int
+    own_end: int
+    conf_threshold: float
+    stream_config: dict[str, Any]
+    output_dir: str
+
+
+@dataclass
+class ChunkResult:
+    index: int
+    start: int
+    end: int
+    frames: int
+    elapsed: float
+    # Ảnh tốt nhất của từng track: id -> thông tin xe (ảnh đã ghi ra đĩa)
+    detections: dict[int, dict[str, Any]] = field(default_factory=dict)
+    counts: dict[tuple[str, str, str], int] = field(default_factory=dict)
+    # Frame đầu/cuối và loại xe của mỗi track (theo chỉ số frame của cả file)
+    spans: dict[int, tuple[int, int]] = field(default_factory=dict)
+    labels: dict[int, str] = field(default_factory=dict)
+    # Box của track trên các frame trùng với đoạn trước (head) và đoạn sau (tail)
+    head: dict[int, dict[int, tuple[float, ...]]] = field(default_factory=dict)
+    tail: dict[int, dict[int, tuple[float, ...]]] = field(default_factory=dict)
+
+
+@dataclass
+class BatchResult:
+    source: str
+    frames: int
+    video_fps: float
+    elapsed: float
+    chunks: int
+    workers: int
+    vehicles: list[dict[str, Any]]
+    counts: dict[str, int]
+
+    @property
+    def fps(self) -> float:
+        return self.frames / self.elapsed if self.elapsed > 0 else 0.0
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "source": self.source,
+            "frames": self.frames,
+            "video_fps": self.video_fps,
+            "elapsed": round(self.elapsed, 2),
+            "fps": round(self.fps, 2),
+            "chunks": self.chunks,
+            "workers": self.workers,
+            "counts": self.counts,
+            "vehicles": self.vehicles,
+        }
+
+
+def find_keyframes(path: str, fps: float) -> list[int]:
+    """
+    Chỉ số các keyframe theo ffprobe (chỉ đọc keyframe nên chạy nhanh).
+    Trả về danh sách rỗng nếu máy không có ffprobe.
+    """
+    ffprobe = shutil.which("ffprobe")
+    if ffprobe is None:
+        return []
+    cmd = [
+        ffprobe,
+        "-v",
+        "error",
+        "-select_streams",
+        "v:0",
+        "-skip_frame",
+        "nokey",
+        "-show_entries",
+        "frame=pts_time",
+        "-of",
+        "csv=p=0",
+        path,
+    ]
+    try:
+        output = subprocess.run(
+            cmd, capture_output=True, text=True, check=True, timeout=600
+        ).stdout
+    except (OSError, subprocess.SubprocessError) as e:
+        logger.warning(f"Không đọc được keyframe bằng ffprobe: {e}")
+        return []
+
+    keyframes: set[int] = set()
+    for line in output.split():
+        try:
+            keyframes.add(round(float(line.strip(",")) * fps))
+        except ValueError:
+            continue
+    return sorted(keyframes)
+
+
+def plan_chunks(
+    total: int, count: int, keyframes: list[int], min_length: int
+) -> list[tuple[int, int]]:
+    """
+    Chia [0, total) thành khoảng 'count' đoạn đều nhau, ranh giới dời về
+    keyframe gần nhất để worker tua tới đó mà không phải giải mã lại từ xa.
+    """
+    keys = np.asarray(keyframes, dtype=np.int64)
+    bounds = [0]
+    for i in range(1, count):
+        target = round(i * total / count)
+        if len(keys):
+            target = int(keys[np.argmin(np.abs(keys - target))])
+        if target - bounds[-1] >= min_length and total - target >= min_length:
+            bounds.append(target)
+    bounds.append(total)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def _init_worker(model_name: str | None, threads: int) -> None:
+    global _worker_detector
+    # Chia đều lõi CPU cho các worker thay vì để mỗi worker dùng hết
+    cv2.setNumThreads(threads)
+    detector = (
+        LicensePlateDetector(model_name) if model_name else LicensePlateDetector()
+    )
+    detector.set_profile(
+        RuntimeProfile(imgsz=detector.profile.imgsz, threads=threads, streams=1)
+    )
+    _worker_detector = detector
+
+
+def process_chunk(task: ChunkTask) -> ChunkResult:
+    """Chạy detector + tracker trên một đoạn, trả về kết quả để gộp"""
+    detector = _worker_detector
+    assert detector is not None, "Worker chưa được khởi tạo"
+    config = task.stream_config
+    detector.set_tiling(TilingConfig.from_dict(config.get("tiling", {})))
+    # Mỗi đoạn bắt đầu với tracker trống, ID track chỉ có nghĩa trong đoạn
+    detector.reset_tracker()
+    detector.reset_tracks(
+        TrackRegistry.from_dict(
+            config.get("tracks", {}), ReIDIndex.from_dict(config.get("reid", {}))
+        )
+    )
+    counting = CountingConfig.from_dict(config.get("counting", {}))
+    counter = ZoneCounter(counting) if counting.enabled else None
+
+    result = ChunkResult(task.index, task.start, task.end, 0, 0.0)
+    counts: defaultdict[tuple[str, str, str], int] = defaultdict(int)
+
+    cap = cv2.VideoCapture(task.path)
+    if not cap.isOpened():
+        raise ValueError(f"Không thể mở video: {task.path}")
+    started = time.perf_counter()
+    try:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, task.start)
+        frame_index = task.start
+        while frame_index < task.stop:
+            success, frame = cap.read()
+            if not success:
+                break
+            _, detections = detector.process_frame(
+                frame, task.conf_threshold, False, False
+            )
+            for det in detections:
+                result.detections[det["id"]] = _save_crop(det, task)
+            tracks = detector.last_tracks
+            if counter is not None:
+                events = counter.update(tracks, frame.shape)
+                if task.own_start <= frame_index < task.own_end:
+                    for event in events:
+                        counts[event] += 1
+
+            overlap_head = task.index > 0 and frame_index < task.own_start
+            overlap_tail = frame_index >= task.end
+            for i, track_id in enumerate(tracks.ids.tolist()):
+                first, _ = result.spans.get(track_id, (frame_index, frame_index))
+                result.spans[track_id] = (first, frame_index)
+                result.labels.setdefault(track_id, tracks.labels[i])
+                if overlap_head or overlap_tail:
+                    side = result.head if overlap_head else result.tail
+                    side.setdefault(track_id, {})[frame_index] = tuple(
+                        tracks.boxes[i].tolist()
+                    )
+            frame_index += 1
+        for det in detector.tracks.flush():
+            result.detections[det["id"]] = _save_crop(det, task)
+    finally:
+        cap.release()
+
+    result.frames = frame_index - task.start
+    result.elapsed = time.perf_counter() - started
+    result.counts = dict(counts)
+    return result
+
+
+def _save_crop(det: dict[str, Any], task: ChunkTask) -> dict[str, Any]:
+    """Ghi ảnh cắt ra file tạm của đoạn, chỉ gửi thông tin nhẹ về tiến trình chính"""
+    path = os.path.join(task.output_dir, f"chunk{task.index}_{det['id']}.jpg")
+    cv2.imwrite(path, det["image"])
+    x1, y1, x2, y2 = det["box"]
+    area = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    return {
+        "label": det["label"],
+        "conf": det["conf"],
+        "box": det["box"],
+        "frames": det["frames"],
+        "image": path,
+        "score": float(np.sqrt(area) * det["conf"]),
+    }
+
+
+def _box_iou(a: npt.NDArray[Any], b: npt.NDArray[Any]) -> npt.NDArray[Any]:
+    """IoU từng cặp box tương ứng của hai mảng (N, 4)"""
+    ix1 = np.maximum(a[:, 0], b[:, 0])
+    iy1 = np.maximum(a[:, 1], b[:, 1])
+    ix2 = np.minimum(a[:, 2], b[:, 2])
+    iy2 = np.minimum(a[:, 3], b[:, 3])
+    inter = np.clip(ix2 - ix1, 0, None) * np.clip(iy2 - iy1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    iou: npt.NDArray[Any] = inter / np.maximum(area_a + area_b - inter, 1e-6)
+    return iou
+
+
+def stitch_tracks(
+    before: ChunkResult, after: ChunkResult, min_iou: float = 0.5
+) -> list[tuple[int, int]]:
+    """
+    Ghép track cuối đoạn trước với track đầu đoạn sau: hai worker cùng thấy
+    các frame trùng nhau, nên cùng một xe có box gần như trùng khít.
+    """
+    candidates: list[tuple[float, int, int]] = []
+    for a, tail in before.tail.items():
+        for b, head in after.head.items():
+            if before.labels[a] != after.labels[b]:
+                continue
+            common = sorted(tail.keys() & head.keys())
+            if not common:
+                continue
+            iou = _box_iou(
+                np.asarray([tail[f] for f in common]),
+                np.asarray([head[f] for f in common]),
+            )
+            score = float(iou.mean())
+            if score >= min_iou:
+                candidates.append((score, a, b))
+
+    # Ghép tham lam theo IoU giảm dần, mỗi track chỉ dùng một lần
+    pairs: list[tuple[int, int]] = []
+    used_a: set[int] = set()
+    used_b: set[int] = set()
+    for _, a, b in sorted(candidates, reverse=True):
+        if a not in used_a and b not in used_b:
+            used_a.add(a)
+            used_b.add(b)
+            pairs.append((a, b))
+    return pairs
+
+
+def merge_results(
+    results: list[ChunkResult], video_fps: float, output_dir: str
+) -> tuple[list[dict[str, Any]], dict[tuple[str, str, str], int]]:
+    """Gộp các đoạn: nối track qua ranh giới, mỗi xe giữ một ảnh tốt nhất"""
+    results = sorted(results, key=lambda r: r.index)
+    parent: dict[tuple[int, int], tuple[int, int]] = {}
+
+    def find(key: tuple[int, int]) -> tuple[int, int]:
+        while parent.get(key, key) != key:
+            key = parent[key]
+        return key
+
+    for before, after in zip(results, results[1:]):
+        for a, b in stitch_tracks(before, after):
+            parent[find((after.index, b))] = find((before.index, a))
+
+    groups: dict[tuple[int, int], list[tuple[int, int]]] = defaultdict(list)
+    for result in results:
+        for track_id in result.spans:
+            groups[find((result.index, track_id))].append((result.index, track_id))
+
+    by_index = {r.index: r for r in results}
+    vehicles: list[dict[str, Any]] = []
+    for members in groups.values():
+        spans = [by_index[c].spans[t] for c, t in members]
+        candidates = [
+            by_index[c].detections[t] for c, t in members if t in by_index[c].detections
+        ]
+        if not candidates:
+            continue
+        best = max(candidates, key=lambda d: d["score"])
+        for det in candidates:
+            if det is not best:
+                os.remove(det["image"])
+        vehicles.append(
+            {
+                "id": 0,
+                "label": best["label"],
+                "conf": round(best["conf"], 4),
+                "box": [round(v, 1) for v in best["box"]],
+                "frames": sum(d["frames"] for d in candidates),
+                "first_seen": round(min(s[0] for s in spans) / video_fps, 2),
+                "last_seen": round(max(s[1] for s in spans) / video_fps, 2),
+                "image": best["image"],
+            }
+        )
+
+    vehicles.sort(key=lambda v: v["first_seen"])
+    for vehicle_id, vehicle in enumerate(vehicles, start=1):
+        vehicle["id"] = vehicle_id
+        seen = time.strftime("%H-%M-%S", time.gmtime(vehicle["first_seen"]))
+        filename = f"{vehicle['label']}_{vehicle_id}_{seen}.jpg"
+        path = os.path.join(output_dir, filename)
+        os.replace(vehicle["image"], path)
+        vehicle["image"] = path
+
+    counts: defaultdict[tuple[str, str, str], int] = defaultdict(int)
+    for result in results:
+        for key, count in result.counts.items():
+            counts[key] += count
+    return vehicles, dict(counts)
+
+
+def batch_process(
+    path: str,
+    workers: int,
+    threads: int = 0,
+    model_name: str | None = None,
+    conf_threshold: float = 0.5,
+    overlap: int = 45,
+    chunks_per_worker: int = 2,
+    output_dir: str | None = None,
+) -> BatchResult:
+    """
+    Xử lý một file video nhanh hơn thời gian thực: chia thành các đoạn theo
+    keyframe, chạy song song trên nhiều tiến trình rồi gộp kết quả.
+    """
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        raise ValueError(f"Không thể mở video: {path}")
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    video_fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+    cap.release()
+    if total <= 0:
+        raise ValueError(f"Không xác định được số frame của video: {path}")
+
+    output_dir = output_dir or os.path.join(BATCH_DIR, stream_key(path))
+    os.makedirs(output_dir, exist_ok=True)
+    threads = threads or max(1, (os.cpu_count() or 1) // workers)
+
+    keyframes = find_keyframes(path, video_fps)
+    if not keyframes:
+        print("[!] Không có ffprobe, chia đoạn theo số frame (tua chậm hơn)")
+    chunks = plan_chunks(total, workers * chunks_per_worker, keyframes, 4 * overlap)
+    stream_config = load_stream_config(path)
+    tasks = [
+        ChunkTask(
+            path=path,
+            index=i,
+            start=start,
+            end=end,
+            stop=min(total, end + overlap),
+            own_start=start + overlap if i > 0 else start,
+            own_end=end + overlap if i < len(chunks) - 1 else total,
+            conf_threshold=conf_threshold,
+            stream_config=stream_config,
+            output_dir=output_dir,
+        )
+        for i, (start, end) in enumerate(chunks)
+    ]
+    print(
+        f"[*] Batch {path}: {total} frame, {len(tasks)} đoạn, "
+        f"{workers} worker x {threads} luồng"
+    )
+
+    started = time.perf_counter()
+    results: list[ChunkResult] = []
+    # "spawn" để mỗi worker tự khởi tạo torch/OpenVINO thay vì kế thừa qua fork
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(model_name, threads),
+    ) as executor:
+        futures = [executor.submit(process_chunk, task) for task in tasks]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            chunk_fps = result.frames / result.elapsed if result.elapsed > 0 else 0.0
+            print(
+                f"    Đoạn {result.index + 1}/{len(tasks)}: {result.frames} frame, "
+                f"{chunk_fps:.1f} FPS"
+            )
+    elapsed = time.perf_counter() - started
+
+    vehicles, counts = merge_results(results, video_fps, output_dir)
+    summary = {
+        f"{name} {direction} {label}": n
+        for (name, direction, label), n in sorted(counts.items())
+    }
+    if not summary:
+        # Không cấu hình vạch/vùng đếm: mỗi xe đếm một lần theo loại
+        for vehicle in vehicles:
+            summary[vehicle["label"]] = summary.get(vehicle["label"], 0) + 1
+
+    batch = BatchResult(
+        source=path,
+        frames=total,
+        video_fps=video_fps,
+        elapsed=elapsed,
+        chunks=len(tasks),
+        workers=workers,
+        vehicles=vehicles,
+        counts=summary,
+    )
+    result_path = os.path.join(output_dir, "result.json")
+    with open(result_path, "w", encoding="utf-8") as f:
+        json.dump(batch.to_dict(), f, ensure_ascii=False, indent=2)
+
+    print(
+        f"[+] {len(vehicles)} xe, {batch.fps:.1f} FPS "
+        f"({batch.fps / video_fps:.1f}x thời gian thực) trong {elapsed:.1f}s"
+    )
+    print(f"[+] Đã lưu kết quả vào {result_path}")
+    return batch
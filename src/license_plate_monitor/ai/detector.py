@@ -1,86 +1,259 @@
-from collections import deque
+import time
 from typing import Any
 
+import numpy as np
 import numpy.typing as npt
 import torch
+import yaml
 from ultralytics import YOLO
+from ultralytics.engine.results import Boxes, Results
+from ultralytics.trackers.byte_tracker import BYTETracker
+from ultralytics.utils import IterableSimpleNamespace
+from ultralytics.utils.checks import check_yaml
 
+from license_plate_monitor.ai.runtime import (
+    DEFAULT_PROFILE_PATH,
+    RuntimeProfile,
+    active_model_name,
+    apply_thread_count,
+    configure_openvino,
+)
+from license_plate_monitor.ai.tiling import (
+    TilingConfig,
+    make_tiles,
+    merge_tile_detections,
+)
+from license_plate_monitor.ai.tracks import FrameTracks, TrackRegistry
 
-class LicensePlateDetector:
-    def __init__(self, model_name: str = r"models\yolo26n-trained_int8_openvino_model"):
-        self.model = YOLO(model_name, task="detect")
-        self.last_tracked_ids: deque[int] = deque(maxlen=1000)
 
-    def process_frame(
+class LicensePlateDetector:
+    def __init__(
         self,
-        frame: npt.NDArray[Any],
-        conf_threshold: float,
-        show_labels: bool,
-        show_boxes: bool,
-    ) -> tuple[npt.NDArray[Any], list[dict[str, Any]]]:
+        model_name: str | None = None,
+        profile_path: str | None = DEFAULT_PROFILE_PATH,
+    ):
+        # Mặc định dùng mô hình đã đăng ký trong models/active_model.json
+        self.model_name = model_name or active_model_name()
+        self.model = YOLO(self.model_name, task="detect")
+        # Trạng thái từng track, phát ra một ảnh cắt tốt nhất cho mỗi xe
+        self.tracks = TrackRegistry()
+        self.last_tracks = FrameTracks.empty()
+        # Thông số imgsz/threads/streams, lấy từ kết quả autotune nếu có
+        self.profile = RuntimeProfile.load(profile_path)
+        self._runtime_applied = False
+        # Chế độ suy luận theo ô/ROI cho camera độ phân giải cao
+        self.tiling = TilingConfig()
+        self._tile_tracker: BYTETracker | None = None
+        self._batch_supported = True
+        # Thời gian (giây) từng bước của lần process_frame gần nhất
+        self.timings = {"inference": 0.0, "postprocess": 0.0, "annotate": 0.0}
+
+    def set_profile(self, profile: RuntimeProfile) -> None:
         """
-        Xử lý frame và trả về ảnh đã vẽ cùng danh sách các đối tượng mới phát hiện.
+        Đổi thông số chạy. Nếu predictor đã có thì biên dịch lại ngay, để lần
+        suy luận kế tiếp (có thể là batch) không chạy trên bản biên dịch cũ.
         """
+        self.profile = profile
+        self._runtime_applied = False
+        if getattr(self.model, "predictor", None) is not None:
+            self._apply_runtime()
+
+    def _apply_runtime(self) -> None:
+        """Áp dụng số luồng/stream sau khi ultralytics đã khởi tạo predictor"""
+        self._runtime_applied = True
+        apply_thread_count(self.profile.threads)
+        predictor = getattr(self.model, "predictor", None)
+        if predictor is None:
+            return
+        configure_openvino(
+            predictor.model,
+            self.model_name,
+            self.profile.threads,
+            self.profile.streams,
+        )
+
+    def reset_tracks(self, registry: TrackRegistry | None = None) -> None:
+        """Bắt đầu lại trạng thái track (khi chuyển sang nguồn video khác)"""
+        self.tracks = registry if registry is not None else TrackRegistry()
+        self.last_tracks = FrameTracks.empty()
+
+    def reset_tracker(self) -> None:
+        """Xóa trạng thái ByteTrack để xử lý một đoạn video mới từ đầu"""
+        predictor = getattr(self.model, "predictor", None)
+        for tracker in getattr(predictor, "trackers", None) or []:
+            tracker.reset()
+        self._tile_tracker = None
+
+    def set_tiling(self, config: TilingConfig) -> None:
+        """Đổi chế độ suy luận theo ô, tracker riêng sẽ được tạo lại từ đầu"""
+        self.tiling = config
+        self._tile_tracker = None
+
+    def _track(self, frame: npt.NDArray[Any], conf_threshold: float) -> Any:
+        """Phát hiện + tracking, trả về Results của ultralytics hoặc None"""
+        if self.tiling.enabled:
+            return self._track_tiled(frame, conf_threshold)
+
         results = self.model.track(
             frame,
             persist=True,
             tracker="bytetrack.yaml",
-            imgsz=800,
+            imgsz=self.profile.imgsz,
             conf=conf_threshold,
             verbose=False,
         )
+        if not self._runtime_applied:
+            self._apply_runtime()
+        return next(iter(results), None)
 
-        if not results or results[0].boxes is None or results[0].boxes.id is None:
-            return frame, []
+    def _predict_tiles(
+        self, crops: list[npt.NDArray[Any]], conf_threshold: float
+    ) -> list[npt.NDArray[Any]]:
+        """Suy luận tất cả các ô trong một lần gọi (batch) nếu mô hình hỗ trợ"""
+        results: list[Results | torch.Tensor] = []
+        # Predictor vừa được tạo ở lần gọi này còn dùng bản biên dịch mặc định:
+        # biên dịch lại theo profile (THROUGHPUT tự tách batch) rồi thử thêm lần nữa
+        retry = not self._runtime_applied
+        while self._batch_supported:
+            try:
+                results = list(
+                    self.model.predict(
+                        crops,
+                        imgsz=self.profile.imgsz,
+                        conf=conf_threshold,
+                        verbose=False,
+                    )
+                )
+                break
+            except Exception as e:
+                if retry and getattr(self.model, "predictor", None) is not None:
+                    retry = False
+                    self._apply_runtime()
+                    continue
+                # Mô hình xuất với batch cố định = 1, chuyển sang chạy từng ô
+                print(f"[!] Mô hình không hỗ trợ batch, chạy tuần tự từng ô: {e}")
+                self._batch_supported = False
+        if not self._batch_supported:
+            for crop in crops:
+                results.extend(
+                    self.model.predict(
+                        crop,
+                        imgsz=self.profile.imgsz,
+                        conf=conf_threshold,
+                        verbose=False,
+                    )
+                )
+        if not self._runtime_applied:
+            self._apply_runtime()
 
-        res = results[0]
-        annotated_frame = res.plot(labels=show_labels, boxes=show_boxes)
-        new_detections = []
+        outputs: list[npt.NDArray[Any]] = []
+        for res in results:
+            if isinstance(res, Results) and res.boxes is not None:
+                data = res.boxes.data
+            else:
+                data = np.empty((0, 6))
+            if isinstance(data, torch.Tensor):
+                data = data.cpu().numpy()
+            outputs.append(np.asarray(data, dtype=np.float32))
+        return outputs
 
-        ids_raw = res.boxes.id if res.boxes is not None else None
+    def _track_tiled(self, frame: npt.NDArray[Any], conf_threshold: float) -> Any:
+        """Suy luận trên ROI/lưới ô, gộp box bằng NMS rồi mới đưa vào ByteTrack"""
+        tiles = make_tiles(frame.shape, self.tiling, self.profile.imgsz)
+        crops = [frame[y1:y2, x1:x2] for x1, y1, x2, y2 in tiles]
+        per_tile = self._predict_tiles(crops, conf_threshold)
+        dets = merge_tile_detections(per_tile, tiles, frame.shape, self.tiling.nms_iou)
 
-        if ids_raw is None:
-            return annotated_frame, []
+        if self._tile_tracker is None:
+            # Các hàm này của ultralytics chưa có chú thích kiểu
+            path = check_yaml("bytetrack.yaml")  # type: ignore[no-untyped-call]
+            with open(path, encoding="utf-8") as f:
+                cfg = IterableSimpleNamespace(**yaml.safe_load(f))
+            self._tile_tracker = BYTETracker(args=cfg)  # type: ignore[no-untyped-call]
 
-        # Chuyển IDs sang list Python tùy theo thiết bị chạy (CPU/GPU)
-        if isinstance(ids_raw, torch.Tensor):
-            ids = ids_raw.cpu().numpy().astype(int).tolist()
-        else:
-            ids = ids_raw.astype(int).tolist()
+        # ByteTrack của ultralytics nhận Boxes (numpy) và trả về
+        # mảng (N, 8): x1, y1, x2, y2, id, conf, cls, chỉ số box gốc
+        tracks = self._tile_tracker.update(Boxes(dets, frame.shape[:2]), frame)
+        if len(tracks) == 0:
+            return None
 
-        for i, obj_id in enumerate(ids):
-            if res.boxes is None:
-                continue
+        return Results(
+            frame,
+            path="",
+            names=self.model.names,
+            boxes=torch.as_tensor(tracks[:, :-1], dtype=torch.float32),
+        )
 
-            if obj_id not in self.last_tracked_ids:
-                box = res.boxes[i]
+    def process_frame(
+        self,
+        frame: npt.NDArray[Any],
+        conf_threshold: float,
+        show_labels: bool,
+        show_boxes: bool,
+        timestamp: float = 0.0,
+    ) -> tuple[npt.NDArray[Any], list[dict[str, Any]]]:
+        """
+        Xử lý frame và trả về ảnh đã vẽ cùng danh sách các xe đã kết thúc track,
+        mỗi xe kèm ảnh cắt tốt nhất trong suốt quá trình theo dõi.
+        'timestamp' (giây) được ghi lại làm thời điểm thấy xe và có ảnh tốt nhất.
+        """
+        start = time.perf_counter()
+        res = self._track(frame, conf_threshold)
+        inferred = time.perf_counter()
+        self.last_tracks = FrameTracks.from_results(res)
 
-                # Cắt ảnh đối tượng
-                coords = box.xyxy[0].cpu().tolist()
-                x1, y1, x2, y2 = coords
-                h, w = frame.shape[:2]
+        # Luôn cập nhật registry kể cả khi không có box nào, để track hết hạn
+        new_detections = self.tracks.update(frame, self.last_tracks, timestamp)
+        # Các bước sau (đếm, quỹ đạo, OCR) dùng ID đã gộp qua ReID
+        self.last_tracks.ids = self.tracks.canonical(self.last_tracks.ids)
+        processed = time.perf_counter()
+        self.timings["inference"] = inferred - start
+        self.timings["postprocess"] = processed - inferred
+        self.timings["annotate"] = 0.0
 
-                # Chỉ chấp nhận nếu box nằm hoàn toàn bên trong khung hình
-                margin = 25  # cách lề 'margin' pixel
-                if (
-                    x1 > margin
-                    and y1 > margin
-                    and x2 < (w - margin)
-                    and y2 < (h - margin)
-                ):
-                    self.last_tracked_ids.append(obj_id)
+        # Không vẽ gì thì khỏi tốn thời gian sao chép frame (chế độ batch)
+        if len(self.last_tracks) == 0 or not (show_labels or show_boxes):
+            return frame, new_detections
 
-                    crop = self.crop_box(frame, coords)
+        annotated_frame = res.plot(labels=show_labels, boxes=show_boxes)
+        self.timings["annotate"] = time.perf_counter() - processed
+        return annotated_frame, new_detections
 
-                    if crop.size > 0:
-                        label = res.names[int(box.cls[0])]
-                        conf = float(box.conf[0])
+    def detect(
+        self, frame: npt.NDArray[Any], conf_threshold: float
+    ) -> npt.NDArray[Any]:
+        """
+        Chỉ phát hiện (không tracking), trả về mảng (N, 6): x1, y1, x2, y2, conf, cls.
+        """
+        results = self.model.predict(
+            frame, imgsz=self.profile.imgsz, conf=conf_threshold, verbose=False
+        )
+        if not self._runtime_applied:
+            self._apply_runtime()
 
-                        new_detections.append(
-                            {"id": obj_id, "label": label, "conf": conf, "image": crop}
-                        )
+        result = next(iter(results), None)
+        if not isinstance(result, Results) or result.boxes is None:
+            return np.empty((0, 6), dtype=np.float32)
 
-        return annotated_frame, new_detections
+        data = result.boxes.data
+        if isinstance(data, torch.Tensor):
+            data = data.cpu().numpy()
+        return np.asarray(data, dtype=np.float32)[:, :6]
+
+    def detect_batch(
+        self, frames: list[npt.NDArray[Any]], conf_threshold: float
+    ) -> list[npt.NDArray[Any]]:
+        """
+        Phát hiện trên nhiều frame trong một lần gọi. Với OpenVINO ở chế độ
+        THROUGHPUT, ultralytics đẩy các ảnh của batch vào hàng đợi bất đồng bộ
+        nên các stream mới thực sự chạy song song.
+        """
+        return [out[:, :6] for out in self._predict_tiles(frames, conf_threshold)]
+
+    @property
+    def batch_supported(self) -> bool:
+        """False nếu mô hình đã từ chối batch > 1 (xuất với batch cố định)"""
+        return self._batch_supported
 
     def crop_box(
         self,
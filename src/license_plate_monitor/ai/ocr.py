@@ -0,0 +1,255 @@
+import logging
+import queue
+import re
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+import cv2
+import numpy as np
+import numpy.typing as npt
+import torch
+from ultralytics import YOLO
+from ultralytics.engine.results import Results
+
+logger = logging.getLogger(__name__)
+
+# Ký tự hợp lệ trên biển số (chữ in hoa, số, gạch ngang, dấu chấm)
+PLATE_ALLOWLIST = "ABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789-."
+
+# Callback nhận (biển số, độ tin cậy); chuỗi rỗng nghĩa là không đọc được
+OCRCallback = Callable[[str, float], None]
+
+# Chiều cao tối đa khi đưa các ảnh trong batch về cùng kích thước
+MAX_BATCH_HEIGHT = 640
+
+
+def normalize_plate(text: str) -> str:
+    """Chuẩn hóa chuỗi OCR: in hoa, bỏ khoảng trắng và ký tự lạ"""
+    return re.sub(r"[^A-Z0-9.\-]", "", text.upper())
+
+
+def pad_to_common_size(
+    images: list[npt.NDArray[Any]], max_height: int = MAX_BATCH_HEIGHT
+) -> list[npt.NDArray[Any]]:
+    """
+    Đưa các ảnh về cùng chiều cao (trung vị, giữ tỉ lệ) rồi đệm nền đen bên phải
+    cho cùng chiều rộng, vì readtext_batched chỉ nhận ảnh cùng kích thước.
+    """
+    height = min(max_height, int(np.median([image.shape[0] for image in images])))
+    scaled: list[npt.NDArray[Any]] = []
+    for image in images:
+        h, w = image.shape[:2]
+        width = max(1, round(w * height / h))
+        interpolation = cv2.INTER_AREA if h > height else cv2.INTER_LINEAR
+        scaled.append(cv2.resize(image, (width, height), interpolation=interpolation))
+
+    width = max(image.shape[1] for image in scaled)
+    return [
+        cv2.copyMakeBorder(
+            image, 0, 0, 0, width - image.shape[1], cv2.BORDER_CONSTANT, value=0
+        )
+        for image in scaled
+    ]
+
+
+@dataclass
+class OCRConfig:
+    """Cấu hình bước định vị và đọc biển số"""
+
+    # Mô hình YOLO phát hiện biển số trong ảnh xe (None = đọc trên cả ảnh xe)
+    plate_model: str | None = None
+    languages: tuple[str, ...] = ("en",)
+    workers: int = 1
+    batch_size: int = 8
+    # Thời gian tối đa chờ gom đủ batch (giây)
+    max_wait: float = 0.05
+    max_queue: int = 256
+    gpu: bool = False
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "OCRConfig":
+        """Factory method để tạo OCRConfig từ mục "ocr" của cấu hình luồng."""
+        return cls(
+            plate_model=data.get("plate_model"),
+            languages=tuple(data.get("languages", ("en",))),
+            workers=int(data.get("workers", 1)),
+            batch_size=int(data.get("batch_size", 8)),
+            max_wait=float(data.get("max_wait", 0.05)),
+            max_queue=int(data.get("max_queue", 256)),
+            gpu=bool(data.get("gpu", False)),
+        )
+
+
+class PlateRecognizer:
+    """Định vị biển số trong ảnh xe rồi đọc ký tự, xử lý theo batch"""
+
+    def __init__(self, config: OCRConfig):
+        try:
+            import easyocr
+        except ImportError as e:
+            raise ImportError(
+                "Cần cài đặt gói 'easyocr' để đọc biển số: uv pip install -e .[ocr]"
+            ) from e
+
+        self.reader = easyocr.Reader(list(config.languages), gpu=config.gpu)
+        self.plate_model = (
+            YOLO(config.plate_model, task="detect") if config.plate_model else None
+        )
+
+    def locate(self, crops: list[npt.NDArray[Any]]) -> list[npt.NDArray[Any]]:
+        """Cắt vùng biển số có độ tin cậy cao nhất trong mỗi ảnh xe"""
+        if self.plate_model is None:
+            return crops
+
+        results = self.plate_model.predict(crops, verbose=False)
+        plates: list[npt.NDArray[Any]] = []
+        for crop, res in zip(crops, results):
+            if not isinstance(res, Results) or res.boxes is None or not len(res.boxes):
+                plates.append(crop)
+                continue
+            data = res.boxes.data
+            if isinstance(data, torch.Tensor):
+                data = data.cpu().numpy()
+            x1, y1, x2, y2 = np.asarray(data)[int(np.argmax(data[:, 4])), :4]
+            plate = crop[int(y1) : int(y2), int(x1) : int(x2)]
+            plates.append(plate if plate.size > 0 else crop)
+        return plates
+
+    def recognize(self, crops: list[npt.NDArray[Any]]) -> list[tuple[str, float]]:
+        """Đọc biển số cho một batch ảnh xe, trả về (biển số, độ tin cậy)"""
+        if not crops:
+            return []
+
+        plates = pad_to_common_size(self.locate(crops))
+        height, width = plates[0].shape[:2]
+        batches = self.reader.readtext_batched(
+            plates,
+            n_width=width,
+            n_height=height,
+            allowlist=PLATE_ALLOWLIST,
+            detail=1,
+        )
+
+        reads: list[tuple[str, float]] = []
+        for lines in batches:
+            if not lines:
+                reads.append(("", 0.0))
+                continue
+            # Biển 2 dòng: ghép theo thứ tự từ trên xuống, trái sang phải
+            lines = sorted(lines, key=lambda r: (r[0][0][1], r[0][0][0]))
+            text = normalize_plate("".join(r[1] for r in lines))
+            conf = float(np.mean([r[2] for r in lines]))
+            reads.append((text, conf if text else 0.0))
+        return reads
+
+
+class PlateOCRPool:
+    """
+    Nhóm worker đọc biển số chạy song song với luồng nhận diện.
+    Mỗi worker gom ảnh của nhiều xe thành một batch trước khi gọi OCR.
+    """
+
+    def __init__(
+        self,
+        config: OCRConfig,
+        recognizer_factory: Callable[[OCRConfig], PlateRecognizer] = PlateRecognizer,
+    ):
+        self.config = config
+        self._queue: queue.Queue[tuple[npt.NDArray[Any], OCRCallback] | None] = (
+            queue.Queue(maxsize=config.max_queue)
+        )
+        self._workers: list[threading.Thread] = []
+        self._closed = False
+        self._drop = False
+
+        for i in range(max(1, config.workers)):
+            worker = threading.Thread(
+                target=self._run,
+                args=(recognizer_factory,),
+                name=f"plate-ocr-{i}",
+                daemon=True,
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def submit(self, crop: npt.NDArray[Any], callback: OCRCallback) -> bool:
+        """
+        Đưa ảnh vào hàng đợi, không bao giờ chặn luồng gọi.
+        Nếu hàng đợi đầy, callback được gọi ngay với kết quả rỗng.
+        """
+        if self._closed:
+            callback("", 0.0)
+            return False
+        try:
+            self._queue.put_nowait((crop, callback))
+            return True
+        except queue.Full:
+            callback("", 0.0)
+            return False
+
+    def _next_batch(self) -> list[tuple[npt.NDArray[Any], OCRCallback]] | None:
+        """Chờ ảnh đầu tiên rồi gom thêm trong tối đa max_wait giây"""
+        first = self._queue.get()
+        if first is None:
+            return None
+
+        batch = [first]
+        deadline = time.monotonic() + self.config.max_wait
+        while len(batch) < self.config.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Trả lại tín hiệu dừng cho vòng lặp kế tiếp
+                self._queue.put(None)
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self, recognizer_factory: Callable[[OCRConfig], PlateRecognizer]) -> None:
+        try:
+            recognizer = recognizer_factory(self.config)
+        except Exception as e:
+            print(f"[!] Không khởi tạo được OCR, bỏ qua đọc biển số: {e}")
+            recognizer = None
+
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            if recognizer is None or self._drop:
+                reads = [("", 0.0)] * len(batch)
+            else:
+                try:
+                    reads = recognizer.recognize([crop for crop, _ in batch])
+                except Exception as e:
+                    logger.error(f"Lỗi OCR: {e}")
+                    reads = [("", 0.0)] * len(batch)
+
+            for (_, callback), (text, conf) in zip(batch, reads):
+                try:
+                    callback(text, conf)
+                except Exception as e:
+                    logger.error(f"Lỗi xử lý kết quả OCR: {e}")
+
+    def close(self, drain: bool = True, timeout: float = 10.0) -> None:
+        """
+        Dừng các worker. drain=True xử lý nốt ảnh trong hàng đợi,
+        drain=False trả kết quả rỗng cho phần còn lại.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._drop = not drain
+        for _ in self._workers:
+            self._queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout)
@@ -0,0 +1,136 @@
+import threading
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass
+class PlateVote:
+    """Các lần đọc biển số của một track và kết quả bầu chọn hiện tại"""
+
+    reads: list[tuple[str, float]] = field(default_factory=list)
+    pending: int = 0
+    # Điểm ảnh cắt của lần gửi OCR gần nhất, chỉ gửi lại khi ảnh tốt hơn hẳn
+    last_score: float = 0.0
+    text: str = ""
+    conf: float = 0.0
+    # Số lần cập nhật liên tiếp mà kết quả bầu chọn không đổi
+    streak: int = 0
+    final: bool = False
+
+
+def vote_characters(reads: list[tuple[str, float]]) -> tuple[str, float]:
+    """
+    Bầu chọn từng ký tự theo độ tin cậy trên các lần đọc cùng độ dài phổ biến nhất.
+    Trả về (biển số, độ tin cậy trung bình của ký tự thắng).
+    """
+    reads = [(text, conf) for text, conf in reads if text and conf > 0]
+    if not reads:
+        return "", 0.0
+
+    # Chọn độ dài có tổng độ tin cậy cao nhất, bỏ các lần đọc thiếu/thừa ký tự
+    length_weight: defaultdict[int, float] = defaultdict(float)
+    for text, conf in reads:
+        length_weight[len(text)] += conf
+    length = max(length_weight.items(), key=lambda kv: kv[1])[0]
+    aligned = [(text, conf) for text, conf in reads if len(text) == length]
+
+    chars: list[str] = []
+    support: list[float] = []
+    total = sum(conf for _, conf in aligned)
+    for i in range(length):
+        weights: defaultdict[str, float] = defaultdict(float)
+        for text, conf in aligned:
+            weights[text[i]] += conf
+        char, weight = max(weights.items(), key=lambda kv: kv[1])
+        chars.append(char)
+        support.append(weight / total)
+
+    mean_conf = total / len(aligned)
+    return "".join(chars), mean_conf * sum(support) / length
+
+
+class PlateVoteCache:
+    """
+    Gộp kết quả OCR của nhiều frame theo track ID.
+    Dừng gửi OCR khi kết quả đã ổn định hoặc đủ số lần đọc tối đa,
+    nên chi phí nhận dạng cho mỗi xe là một hằng số nhỏ.
+    """
+
+    def __init__(
+        self,
+        max_reads: int = 5,
+        stable_reads: int = 2,
+        min_improvement: float = 1.15,
+        max_tracks: int = 1024,
+    ):
+        self.max_reads = max_reads
+        # Số lần cập nhật liên tiếp cho cùng kết quả để coi là ổn định
+        self.stable_reads = stable_reads
+        self.min_improvement = min_improvement
+        self.max_tracks = max_tracks
+        self._votes: OrderedDict[int, PlateVote] = OrderedDict()
+        # Luồng video gọi mọi hàm; khóa giữ cache an toàn nếu dùng từ luồng khác
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "PlateVoteCache":
+        """Factory method để tạo PlateVoteCache từ mục "ocr" của cấu hình luồng."""
+        return cls(
+            max_reads=int(data.get("max_reads", 5)),
+            stable_reads=int(data.get("stable_reads", 2)),
+            min_improvement=float(data.get("min_improvement", 1.15)),
+        )
+
+    def request_read(self, track_id: int, score: float) -> bool:
+        """
+        True nếu nên gửi ảnh có điểm 'score' đi OCR cho track này,
+        đồng thời đánh dấu một lần đọc đang chờ.
+        """
+        with self._lock:
+            vote = self._votes.get(track_id)
+            if vote is None:
+                vote = PlateVote()
+                self._votes[track_id] = vote
+                while len(self._votes) > self.max_tracks:
+                    self._votes.popitem(last=False)
+            if vote.final or len(vote.reads) + vote.pending >= self.max_reads:
+                return False
+            if score < vote.last_score * self.min_improvement:
+                return False
+            vote.last_score = score
+            vote.pending += 1
+            return True
+
+    def add_read(self, track_id: int, text: str, conf: float) -> None:
+        """Thêm một lần đọc và bầu chọn lại (bỏ qua nếu track đã kết thúc)"""
+        with self._lock:
+            vote = self._votes.get(track_id)
+            if vote is None:
+                return
+            vote.pending = max(0, vote.pending - 1)
+            if vote.final:
+                return
+
+            vote.reads.append((text, conf))
+            previous = vote.text
+            vote.text, vote.conf = vote_characters(vote.reads)
+            vote.streak = vote.streak + 1 if vote.text and vote.text == previous else 1
+
+            stable = bool(vote.text) and vote.streak >= self.stable_reads
+            if stable or len(vote.reads) >= self.max_reads:
+                vote.final = True
+
+    def pending(self, track_id: int) -> int:
+        """Số lần đọc đã gửi OCR nhưng chưa có kết quả"""
+        with self._lock:
+            vote = self._votes.get(track_id)
+            return vote.pending if vote is not None else 0
+
+    def finish(self, track_id: int) -> tuple[str, float] | None:
+        """Track kết thúc: trả về kết quả đã bầu (nếu có) và xóa khỏi cache"""
+        with self._lock:
+            vote = self._votes.pop(track_id, None)
+        if vote is None or not vote.reads:
+            return None
+        return vote.text, vote.conf
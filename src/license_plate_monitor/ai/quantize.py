@@ -0,0 +1,390 @@
+import json
+import os
+import shutil
+import time
+from collections import Counter
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+import cv2
+import numpy as np
+import numpy.typing as npt
+import yaml
+from ultralytics import YOLO
+from ultralytics.data.utils import IMG_FORMATS, check_det_dataset
+from ultralytics.engine.results import Results
+
+from license_plate_monitor.ai.runtime import (
+    DEFAULT_PROFILE_PATH,
+    RuntimeProfile,
+    register_active_model,
+)
+from license_plate_monitor.config import stream_key
+from license_plate_monitor.utils.recording import ReplayCapture, ReplayConfig
+
+QUANTIZED_DIR = os.path.join("models", "quantized")
+# Cứ 5 khối 10 frame liên tiếp thì giữ 1 khối làm tập đánh giá, để tập đánh giá
+# trải đều cả clip mà không lẫn các frame gần giống với tập hiệu chỉnh
+HOLDOUT_BLOCK = 10
+HOLDOUT_EVERY = 5
+
+
+@dataclass
+class SampledFrame:
+    path: str
+    source: str
+    # Thời điểm của frame trong nguồn (giây)
+    position: float
+
+
+@dataclass
+class VariantReport:
+    """Kết quả đo một bản mô hình trên tập đánh giá"""
+
+    name: str
+    path: str
+    fps: float = 0.0
+    p50_ms: float = 0.0
+    p95_ms: float = 0.0
+    map50: float = 0.0
+    map50_95: float = 0.0
+
+
+@dataclass
+class QuantizeReport:
+    weights: str
+    imgsz: int
+    calibration_images: int
+    holdout_images: int
+    # True nếu nhãn tập đánh giá do mô hình FP32 gốc sinh ra (không có nhãn thật)
+    pseudo_labels: bool
+    variants: list[VariantReport] = field(default_factory=list)
+    registered: bool = False
+
+    def variant(self, name: str) -> VariantReport:
+        return next(v for v in self.variants if v.name == name)
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def _thumbnail(frame: npt.NDArray[Any]) -> npt.NDArray[np.float32]:
+    gray = cv2.cvtColor(cv2.resize(frame, (64, 36)), cv2.COLOR_BGR2GRAY)
+    return gray.astype(np.float32)
+
+
+def sample_frames(
+    sources: list[str],
+    output_dir: str,
+    interval: float = 2.0,
+    min_change: float = 4.0,
+    max_frames: int = 600,
+) -> list[SampledFrame]:
+    """
+    Lấy frame đại diện từ các bản ghi/file video: tối đa một frame mỗi
+    'interval' giây, bỏ frame gần như không đổi so với frame vừa lấy (cảnh
+    tĩnh), rồi rút đều còn 'max_frames' frame.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    samples: list[SampledFrame] = []
+    for source in sources:
+        key = stream_key(source)
+        capture = ReplayCapture(source, ReplayConfig(speed=0.0))
+        last_position = float("-inf")
+        last_thumb: npt.NDArray[np.float32] | None = None
+        count = 0
+        try:
+            while True:
+                success, frame = capture.read()
+                if not success or frame is None:
+                    capture.reconnect()
+                    if not capture.isOpened():
+                        break
+                    continue
+                if capture.position - last_position < interval:
+                    continue
+                thumb = _thumbnail(frame)
+                if (
+                    last_thumb is not None
+                    and float(np.abs(thumb - last_thumb).mean()) < min_change
+                ):
+                    continue
+                last_position, last_thumb = capture.position, thumb
+                path = os.path.join(output_dir, f"{key}_{capture.position:09.2f}.jpg")
+                cv2.imwrite(path, frame)
+                samples.append(SampledFrame(path, source, capture.position))
+                count += 1
+        finally:
+            capture.release()
+        print(f"[*] {source}: lấy {count} frame")
+
+    if len(samples) > max_frames:
+        keep = set(np.linspace(0, len(samples) - 1, max_frames).astype(int).tolist())
+        for i, sample in enumerate(samples):
+            if i not in keep:
+                os.remove(sample.path)
+        samples = [s for i, s in enumerate(samples) if i in keep]
+    return samples
+
+
+def split_holdout(
+    samples: list[SampledFrame],
+) -> tuple[list[SampledFrame], list[SampledFrame]]:
+    """Chia (tập hiệu chỉnh, tập đánh giá) theo khối frame liên tiếp của mỗi nguồn"""
+    calibration: list[SampledFrame] = []
+    holdout: list[SampledFrame] = []
+    totals = Counter(s.source for s in samples)
+    index: Counter[str] = Counter()
+    for sample in samples:
+        i = index[sample.source]
+        index[sample.source] += 1
+        # Nguồn ít frame thì khối nhỏ lại để vẫn có đủ ảnh đánh giá
+        block = max(1, min(HOLDOUT_BLOCK, totals[sample.source] // 50))
+        if (i // block) % HOLDOUT_EVERY == HOLDOUT_EVERY - 1:
+            holdout.append(sample)
+        else:
+            calibration.append(sample)
+    if not holdout and len(calibration) > 1:
+        holdout.append(calibration.pop())
+    return calibration, holdout
+
+
+def write_pseudo_labels(
+    teacher: YOLO,
+    images: list[str],
+    labels_dir: str,
+    imgsz: int,
+    conf_threshold: float,
+) -> None:
+    """Ghi nhãn định dạng YOLO cho các ảnh bằng dự đoán của mô hình gốc"""
+    os.makedirs(labels_dir, exist_ok=True)
+    for image in images:
+        results = teacher.predict(
+            image, imgsz=imgsz, conf=conf_threshold, verbose=False
+        )
+        result = next(iter(results), None)
+        lines: list[str] = []
+        if isinstance(result, Results) and result.boxes is not None:
+            boxes = result.boxes
+            for cls, xywhn in zip(boxes.cls.tolist(), boxes.xywhn.tolist()):
+                x, y, w, h = xywhn
+                lines.append(f"{int(cls)} {x:.6f} {y:.6f} {w:.6f} {h:.6f}")
+        name = f"{Path(image).stem}.txt"
+        with open(os.path.join(labels_dir, name), "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+
+
+def build_dataset(
+    weights: str,
+    sources: list[str],
+    dataset_dir: str,
+    imgsz: int,
+    max_frames: int = 600,
+    interval: float = 2.0,
+    label_conf: float = 0.25,
+) -> str:
+    """
+    Tạo dataset từ cảnh quay của mình: ảnh hiệu chỉnh (split 'train') và tập
+    đánh giá (split 'val') được gán nhãn bằng mô hình FP32. Trả về data.yaml.
+    """
+    samples = sample_frames(
+        sources,
+        os.path.join(dataset_dir, "frames"),
+        interval=interval,
+        max_frames=max_frames,
+    )
+    calibration, holdout = split_holdout(samples)
+    if not calibration or not holdout:
+        raise ValueError("Không đủ frame để hiệu chỉnh, cần clip dài hoặc đa dạng hơn.")
+
+    for split, items in (("calib", calibration), ("val", holdout)):
+        split_dir = os.path.join(dataset_dir, "images", split)
+        os.makedirs(split_dir, exist_ok=True)
+        for sample in items:
+            shutil.move(sample.path, os.path.join(split_dir, Path(sample.path).name))
+    shutil.rmtree(os.path.join(dataset_dir, "frames"), ignore_errors=True)
+
+    teacher = YOLO(weights, task="detect")
+    val_dir = os.path.join(dataset_dir, "images", "val")
+    write_pseudo_labels(
+        teacher,
+        sorted(str(p) for p in Path(val_dir).iterdir()),
+        os.path.join(dataset_dir, "labels", "val"),
+        imgsz,
+        label_conf,
+    )
+
+    data_path = os.path.join(dataset_dir, "data.yaml")
+    with open(data_path, "w", encoding="utf-8") as f:
+        yaml.safe_dump(
+            {
+                "path": os.path.abspath(dataset_dir),
+                "train": "images/calib",
+                "val": "images/val",
+                "names": dict(teacher.names),
+            },
+            f,
+            allow_unicode=True,
+        )
+    print(
+        f"[*] Dataset: {len(calibration)} ảnh hiệu chỉnh, "
+        f"{len(holdout)} ảnh đánh giá -> {data_path}"
+    )
+    return data_path
+
+
+def export_openvino(
+    weights: str, output_dir: str, imgsz: int, data: str | None = None
+) -> str:
+    """
+    Xuất OpenVINO IR: FP32 nếu không có 'data', INT8 (hiệu chỉnh NNCF trên
+    split 'train' của data) nếu có. Trả về thư mục mô hình trong output_dir.
+    """
+    options: dict[str, Any] = {"format": "openvino", "imgsz": imgsz, "batch": 1}
+    if data is not None:
+        options.update(quantize=8, data=data, split="train", fraction=1.0)
+    exported = Path(str(YOLO(weights, task="detect").export(**options)))
+    target = Path(output_dir) / exported.name
+    if target.exists():
+        shutil.rmtree(target)
+    shutil.move(str(exported), target)
+    return str(target)
+
+
+def _split_images(data: str, split: str) -> list[str]:
+    dataset = check_det_dataset(data)
+    folders = dataset[split] if isinstance(dataset[split], list) else [dataset[split]]
+    images: list[str] = []
+    for folder in folders:
+        images += [
+            str(p)
+            for p in sorted(Path(folder).rglob("*"))
+            if p.suffix[1:].lower() in IMG_FORMATS
+        ]
+    return images
+
+
+def evaluate_variant(
+    name: str,
+    model_path: str,
+    data: str,
+    imgsz: int,
+    conf_threshold: float = 0.5,
+    warmup: int = 5,
+) -> VariantReport:
+    """Đo tốc độ (batch 1, như luồng video) và mAP trên split 'val' của data"""
+    report = VariantReport(name, model_path)
+    model = YOLO(model_path, task="detect")
+    frames = [cv2.imread(p) for p in _split_images(data, "val")]
+    frames = [f for f in frames if f is not None]
+    if not frames:
+        raise ValueError(f"Tập đánh giá không có ảnh: {data}")
+
+    for frame in frames[:warmup]:
+        model.predict(frame, imgsz=imgsz, conf=conf_threshold, verbose=False)
+    latencies: list[float] = []
+    for frame in frames:
+        start = time.perf_counter()
+        model.predict(frame, imgsz=imgsz, conf=conf_threshold, verbose=False)
+        latencies.append(time.perf_counter() - start)
+    report.fps = len(latencies) / sum(latencies)
+    report.p50_ms = float(np.percentile(latencies, 50) * 1000)
+    report.p95_ms = float(np.percentile(latencies, 95) * 1000)
+
+    metrics = model.val(
+        data=data, split="val", imgsz=imgsz, batch=1, plots=False, verbose=False
+    )
+    report.map50 = float(metrics.box.map50)
+    report.map50_95 = float(metrics.box.map)
+    return report
+
+
+def print_report(report: QuantizeReport) -> None:
+    label = "nhãn từ FP32" if report.pseudo_labels else "nhãn thật"
+    print(f"[*] So sánh trên {report.holdout_images} ảnh đánh giá ({label}):")
+    print(f"    {'':6} {'FPS':>7} {'p50 ms':>8} {'p95 ms':>8} {'mAP50':>7} {'mAP':>7}")
+    for v in report.variants:
+        print(
+            f"    {v.name:6} {v.fps:7.1f} {v.p50_ms:8.1f} {v.p95_ms:8.1f} "
+            f"{v.map50:7.3f} {v.map50_95:7.3f}"
+        )
+
+
+def quantize_model(
+    weights: str,
+    sources: list[str],
+    data: str | None = None,
+    imgsz: int | None = None,
+    output_dir: str | None = None,
+    max_frames: int = 600,
+    interval: float = 2.0,
+    label_conf: float = 0.25,
+    max_map_drop: float = 0.02,
+    register: bool = True,
+) -> QuantizeReport:
+    """
+    Hiệu chỉnh INT8 mô hình 'weights' (.pt) trên cảnh quay của mình, xuất
+    OpenVINO IR FP32 và INT8, so sánh hai bản trên tập đánh giá riêng rồi đăng
+    ký bản INT8 làm mô hình của detector nếu mAP50-95 không giảm quá
+    'max_map_drop'.
+    """
+    imgsz = imgsz or RuntimeProfile.load(DEFAULT_PROFILE_PATH).imgsz
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    output_dir = output_dir or os.path.join(
+        QUANTIZED_DIR, f"{Path(weights).stem}_{stamp}"
+    )
+    os.makedirs(output_dir, exist_ok=True)
+
+    pseudo_labels = data is None
+    if data is None:
+        if not sources:
+            raise ValueError("Cần ít nhất một bản ghi/clip hoặc một dataset có nhãn.")
+        data = build_dataset(
+            weights,
+            sources,
+            os.path.join(output_dir, "dataset"),
+            imgsz,
+            max_frames=max_frames,
+            interval=interval,
+            label_conf=label_conf,
+        )
+
+    print("[*] Đang xuất OpenVINO FP32...")
+    fp32_path = export_openvino(weights, output_dir, imgsz)
+    print("[*] Đang hiệu chỉnh và xuất OpenVINO INT8...")
+    int8_path = export_openvino(weights, output_dir, imgsz, data)
+
+    report = QuantizeReport(
+        weights=weights,
+        imgsz=imgsz,
+        calibration_images=len(_split_images(data, "train")),
+        holdout_images=len(_split_images(data, "val")),
+        pseudo_labels=pseudo_labels,
+    )
+    for name, path in (("fp32", fp32_path), ("int8", int8_path)):
+        report.variants.append(evaluate_variant(name, path, data, imgsz))
+    print_report(report)
+
+    drop = report.variant("fp32").map50_95 - report.variant("int8").map50_95
+    if drop > max_map_drop:
+        print(
+            f"[!] INT8 giảm mAP {drop:.3f} (> {max_map_drop}), "
+            "giữ nguyên mô hình hiện tại."
+        )
+    elif register:
+        register_active_model(
+            int8_path,
+            {
+                "fp32_model": fp32_path,
+                "created_at": datetime.now().isoformat(timespec="seconds"),
+                "report": os.path.join(output_dir, "report.json"),
+            },
+        )
+        report.registered = True
+        print(f"[+] Detector sẽ dùng mô hình {int8_path}")
+
+    with open(os.path.join(output_dir, "report.json"), "w", encoding="utf-8") as f:
+        json.dump(report.to_dict(), f, ensure_ascii=False, indent=2)
+    return report
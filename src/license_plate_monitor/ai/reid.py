@@ -0,0 +1,156 @@
+from dataclasses import dataclass
+from typing import Any
+
+import cv2
+import numpy as np
+import numpy.typing as npt
+
+# Số bin Hue x Saturation; bỏ kênh Value để ít phụ thuộc độ sáng
+HIST_BINS = (16, 4)
+EMBEDDING_SIZE = HIST_BINS[0] * HIST_BINS[1]
+
+
+def appearance_embedding(crop: npt.NDArray[Any], size: int = 32) -> npt.NDArray[Any]:
+    """
+    Vector đặc trưng màu sắc của ảnh xe: histogram HS đã chuẩn hóa rồi lấy căn,
+    nên tích vô hướng hai vector là hệ số Bhattacharyya (1 = giống hệt).
+    """
+    small = cv2.resize(crop, (size, size), interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+    hist = cv2.calcHist([hsv], [0, 1], None, list(HIST_BINS), [0, 180, 0, 256])
+    hist = hist.ravel()
+    total = float(hist.sum())
+    if total <= 0:
+        return np.zeros(EMBEDDING_SIZE, dtype=np.float32)
+    embedding: npt.NDArray[np.float32] = np.sqrt(hist / total).astype(np.float32)
+    return embedding
+
+
+def box_size(box: tuple[float, float, float, float]) -> float:
+    """Kích thước box (căn diện tích, pixel) để loại ứng viên lớn/nhỏ hơn hẳn"""
+    x1, y1, x2, y2 = box
+    return float(np.sqrt(max(0.0, x2 - x1) * max(0.0, y2 - y1)))
+
+
+@dataclass
+class ReIDMatch:
+    track_id: int
+    similarity: float
+
+
+class ReIDIndex:
+    """
+    Index nhỏ các track vừa kết thúc để nhận lại xe sau khi bị che khuất
+    hoặc ByteTrack đổi ID. Dữ liệu nằm trong mảng cấp phát sẵn, mục quá
+    'window_frames' bị loại, tra cứu là một phép nhân ma trận - vector.
+    """
+
+    def __init__(
+        self,
+        window_frames: int = 150,
+        threshold: float = 0.85,
+        max_jump: float = 40.0,
+        capacity: int = 256,
+        max_radius: float = 200.0,
+        max_scale: float = 1.5,
+    ):
+        # Khoảng frame tối đa giữa lúc mất dấu và lúc xuất hiện lại
+        self.window_frames = window_frames
+        # Hệ số Bhattacharyya tối thiểu để coi là cùng một xe
+        self.threshold = threshold
+        # Quãng đường tối đa (pixel) xe có thể đi được trong mỗi frame mất dấu
+        self.max_jump = max_jump
+        # Giới hạn quãng đường trên dù mất dấu bao lâu (pixel)
+        self.max_radius = max_radius
+        # Tỉ lệ kích thước box tối đa giữa hai lần thấy (xe không đổi cỡ đột ngột)
+        self.max_scale = max_scale
+        self.capacity = capacity
+
+        self._embeddings = np.zeros((capacity, EMBEDDING_SIZE), dtype=np.float32)
+        self._centers = np.zeros((capacity, 2), dtype=np.float32)
+        self._sizes = np.zeros(capacity, dtype=np.float32)
+        self._end_frame = np.full(capacity, -1, dtype=np.int64)
+        self._ids = np.full(capacity, -1, dtype=np.int64)
+        # Loại xe lưu dạng mã số để lọc bằng một phép so sánh mảng
+        self._labels = np.full(capacity, -1, dtype=np.int64)
+        self._label_codes: dict[str, int] = {}
+        self._next = 0
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ReIDIndex | None":
+        """Factory method để tạo ReIDIndex từ mục "reid" (None nếu không bật)."""
+        # Mặc định tắt: histogram màu khó phân biệt các xe trắng/đen/xám cùng cỡ
+        if not data.get("enabled", False):
+            return None
+        return cls(
+            window_frames=int(data.get("window_frames", 150)),
+            threshold=float(data.get("threshold", 0.85)),
+            max_jump=float(data.get("max_jump", 40.0)),
+            capacity=int(data.get("capacity", 256)),
+            max_radius=float(data.get("max_radius", 200.0)),
+            max_scale=float(data.get("max_scale", 1.5)),
+        )
+
+    def add(
+        self,
+        track_id: int,
+        label: str,
+        embedding: npt.NDArray[Any],
+        center: tuple[float, float],
+        size: float,
+        end_frame: int,
+    ) -> None:
+        """Thêm track vừa kết thúc, ghi đè mục cũ nhất khi đầy"""
+        slot = self._next
+        self._next = (self._next + 1) % self.capacity
+        self._embeddings[slot] = embedding
+        self._centers[slot] = center
+        self._sizes[slot] = size
+        self._end_frame[slot] = end_frame
+        self._ids[slot] = track_id
+        self._labels[slot] = self._label_codes.setdefault(label, len(self._label_codes))
+
+    def gate(
+        self,
+        centers: npt.NDArray[Any],
+        sizes: npt.NDArray[Any],
+        gaps: npt.NDArray[Any],
+        center: Any,
+        size: float,
+    ) -> npt.NDArray[np.bool_]:
+        """
+        Ứng viên phải ở đủ gần vị trí mới so với số frame đã mất dấu
+        (không quá max_radius) và có kích thước box tương đương.
+        """
+        distance = np.linalg.norm(
+            centers - np.asarray(center, dtype=np.float32), axis=1
+        )
+        radius = np.minimum(self.max_jump * np.maximum(gaps, 1), self.max_radius)
+        ratio = np.maximum(sizes, size) / np.maximum(np.minimum(sizes, size), 1.0)
+        passed: npt.NDArray[np.bool_] = (distance <= radius) & (ratio <= self.max_scale)
+        return passed
+
+    def match(
+        self,
+        label: str,
+        embedding: npt.NDArray[Any],
+        center: tuple[float, float],
+        size: float,
+        frame_index: int,
+    ) -> ReIDMatch | None:
+        """Tìm track đã kết thúc giống nhất; mục khớp bị lấy ra khỏi index"""
+        gaps = frame_index - self._end_frame
+        valid = (self._end_frame >= 0) & (gaps <= self.window_frames)
+        if not valid.any():
+            return None
+        valid &= self._labels == self._label_codes.get(label, -2)
+        valid &= self.gate(self._centers, self._sizes, gaps, center, size)
+        if not valid.any():
+            return None
+
+        similarity = np.where(valid, self._embeddings @ embedding, -1.0)
+        best = int(np.argmax(similarity))
+        if similarity[best] < self.threshold:
+            return None
+        self._end_frame[best] = -1
+        return ReIDMatch(int(self._ids[best]), float(similarity[best]))
@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+import cv2
+import torch
+
+logger = logging.getLogger(__name__)
+
+# File cấu hình do lệnh autotune sinh ra, detector tự nạp khi khởi động
+DEFAULT_PROFILE_PATH = os.path.join("models", "runtime_profile.json")
+# Mô hình có sẵn, dùng khi chưa đăng ký mô hình nào bằng lệnh quantize
+DEFAULT_MODEL_NAME = r"models\yolo26n-trained_int8_openvino_model"
+# Mô hình detector đang dùng, do lệnh quantize ghi sau khi hiệu chỉnh INT8
+ACTIVE_MODEL_PATH = os.path.join("models", "active_model.json")
+
+
+@dataclass
+class RuntimeProfile:
+    """Thông số chạy mô hình: kích thước ảnh đầu vào, số luồng CPU, số stream"""
+
+    imgsz: int = 800
+    # 0 nghĩa là để thư viện tự chọn
+    threads: int = 0
+    streams: int = 0
+    # Kết quả đo của lần autotune đã sinh ra profile này (chỉ để tham khảo)
+    metrics: dict[str, float] = field(default_factory=dict)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "RuntimeProfile":
+        """Factory method để tạo RuntimeProfile từ dict đã lưu."""
+        return cls(
+            imgsz=int(data.get("imgsz", 800)),
+            threads=int(data.get("threads", 0)),
+            streams=int(data.get("streams", 0)),
+            metrics={k: float(v) for k, v in data.get("metrics", {}).items()},
+        )
+
+    @classmethod
+    def load(cls, path: str | None) -> "RuntimeProfile":
+        """Nạp profile từ file, trả về giá trị mặc định nếu chưa từng autotune"""
+        if not path or not os.path.exists(path):
+            return cls()
+        try:
+            with open(path, encoding="utf-8") as f:
+                profile = cls.from_dict(json.load(f))
+            logger.info(f"Đã nạp runtime profile: {path} ({profile})")
+            return profile
+        except (OSError, ValueError) as e:
+            logger.warning(f"Không đọc được runtime profile {path}: {e}")
+            return cls()
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f, indent=2)
+
+    def __str__(self) -> str:
+        return f"imgsz={self.imgsz}, threads={self.threads}, streams={self.streams}"
+
+
+def active_model_name(path: str = ACTIVE_MODEL_PATH) -> str:
+    """Đường dẫn mô hình đã đăng ký, hoặc mô hình mặc định nếu chưa có"""
+    if not os.path.exists(path):
+        return DEFAULT_MODEL_NAME
+    try:
+        with open(path, encoding="utf-8") as f:
+            model = str(json.load(f)["model"])
+    except (OSError, ValueError, KeyError) as e:
+        logger.warning(f"Không đọc được {path}: {e}")
+        return DEFAULT_MODEL_NAME
+    if not os.path.exists(model):
+        logger.warning(f"Mô hình đã đăng ký không tồn tại: {model}")
+        return DEFAULT_MODEL_NAME
+    return model
+
+
+def register_active_model(
+    model: str, details: dict[str, Any], path: str = ACTIVE_MODEL_PATH
+) -> None:
+    """Đặt 'model' làm mô hình mặc định của detector"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"model": model, **details}, f, ensure_ascii=False, indent=2)
+    logger.info(f"Đã đăng ký mô hình {model}")
+
+
+def apply_thread_count(threads: int) -> None:
+    """Giới hạn số luồng CPU cho PyTorch và OpenCV (0 = giữ mặc định)"""
+    if threads > 0:
+        torch.set_num_threads(threads)
+        cv2.setNumThreads(threads)
+
+
+def configure_openvino(
+    backend: Any, model_path: str, threads: int, streams: int
+) -> bool:
+    """
+    Biên dịch lại mô hình OpenVINO của ultralytics với số luồng và stream mong muốn.
+
+    Trả về False nếu backend không phải OpenVINO hoặc không cần cấu hình lại.
+    """
+    if not hasattr(backend, "ov_compiled_model") or (threads <= 0 and streams <= 0):
+        return False
+
+    try:
+        import openvino as ov
+    except ImportError:
+        return False
+
+    path = Path(model_path)
+    xml_path = path if path.suffix == ".xml" else next(path.glob("*.xml"), None)
+    if xml_path is None:
+        logger.warning(f"Không tìm thấy file .xml trong {model_path}")
+        return False
+
+    # Nhiều stream chỉ có lợi khi chạy batch bất đồng bộ (chế độ THROUGHPUT)
+    mode = "THROUGHPUT" if streams > 1 else "LATENCY"
+    config: dict[str, Any] = {"PERFORMANCE_HINT": mode}
+    if threads > 0:
+        config["INFERENCE_NUM_THREADS"] = threads
+    if streams > 0:
+        config["NUM_STREAMS"] = streams
+
+    core = ov.Core()
+    ov_model = core.read_model(
+        model=str(xml_path), weights=xml_path.with_suffix(".bin")
+    )
+    backend.ov_compiled_model = core.compile_model(
+        ov_model, device_name="CPU", config=config
+    )
+    backend.inference_mode = mode
+    return True
@@ -0,0 +1,234 @@
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+
+@dataclass
+class ScheduleConfig:
+    """Mức ưu tiên và tốc độ suy luận tối thiểu của một luồng"""
+
+    # Số lớn hơn được ưu tiên hơn khi máy quá tải
+    priority: int = 0
+    # Số frame/giây được suy luận luôn được đảm bảo trước (0 = không đảm bảo)
+    min_fps: float = 0.0
+    # Chờ tối đa bấy lâu (giây) cho một lượt suy luận, quá hạn thì bỏ frame
+    max_wait: float = 0.1
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ScheduleConfig":
+        """Factory method để tạo ScheduleConfig từ mục "schedule" của cấu hình."""
+        return cls(
+            priority=int(data.get("priority", 0)),
+            min_fps=max(0.0, float(data.get("min_fps", 0.0))),
+            max_wait=max(0.0, float(data.get("max_wait", 0.1))),
+        )
+
+
+@dataclass
+class ScheduleReport:
+    stream: str
+    priority: int
+    min_fps: float
+    # Tốc độ suy luận thực tế và tốc độ luồng yêu cầu trong cửa sổ gần nhất
+    fps: float
+    requested_fps: float
+    granted: int
+    shed: int
+    mean_wait_ms: float
+    # Tỉ lệ các cửa sổ đã qua mà luồng đạt min_fps (None nếu chưa có cửa sổ nào)
+    met_ratio: float | None
+
+
+@dataclass
+class _StreamState:
+    config: ScheduleConfig
+    registered: float
+    grants: deque[float] = field(default_factory=deque)
+    requests: deque[float] = field(default_factory=deque)
+    last_grant: float = 0.0
+    waiting: int = 0
+    granted: int = 0
+    shed: int = 0
+    wait_total: float = 0.0
+    # Cửa sổ đánh giá hiện tại: (bắt đầu, số yêu cầu, số lượt được cấp)
+    bucket_start: float = 0.0
+    bucket_requests: int = 0
+    bucket_granted: int = 0
+    windows: int = 0
+    windows_met: int = 0
+
+
+class InferenceScheduler:
+    """
+    Cấp lượt suy luận cho các luồng video dùng chung CPU. Mỗi lần chỉ có
+    'slots' lượt chạy cùng lúc; khi có lượt trống, luồng đang thiếu min_fps
+    được cấp trước (ưu tiên cao trước), sau đó tới các luồng còn lại theo
+    ưu tiên rồi theo lượt cấp cũ nhất. Luồng ưu tiên thấp vì thế chờ lâu nhất
+    và bị bỏ frame trước khi máy quá tải. Mỗi luồng phải có detector riêng:
+    hai lượt chạy cùng lúc không được dùng chung một mô hình/tracker.
+    """
+
+    def __init__(self, slots: int = 1, window: float = 5.0):
+        self.slots = max(1, slots)
+        self.window = window
+        self._free = self.slots
+        self._streams: dict[str, _StreamState] = {}
+        self._cond = threading.Condition()
+
+    def register(self, stream: str, config: ScheduleConfig) -> None:
+        now = time.monotonic()
+        with self._cond:
+            self._streams[stream] = _StreamState(config, now, bucket_start=now)
+
+    def unregister(self, stream: str) -> None:
+        with self._cond:
+            self._streams.pop(stream, None)
+            self._cond.notify_all()
+
+    def _trim(self, times: deque[float], now: float) -> None:
+        """Bỏ các mốc thời gian đã ra khỏi cửa sổ gần nhất"""
+        horizon = now - self.window
+        while times and times[0] < horizon:
+            times.popleft()
+
+    def _fps(self, times: deque[float], state: _StreamState, now: float) -> float:
+        self._trim(times, now)
+        # Tính trên ít nhất một giây để luồng vừa đăng ký không báo tốc độ ảo
+        elapsed = min(self.window, max(1.0, now - state.registered))
+        return len(times) / elapsed
+
+    def _roll_window(self, state: _StreamState, now: float) -> None:
+        """Chốt cửa sổ đánh giá đã hết: đạt nếu thiếu không quá một frame"""
+        if now - state.bucket_start < self.window:
+            return
+        if state.config.min_fps > 0 and state.bucket_requests:
+            target = min(state.config.min_fps * self.window, state.bucket_requests)
+            state.windows += 1
+            if state.bucket_granted + 1 >= target:
+                state.windows_met += 1
+        state.bucket_start = now
+        state.bucket_requests = 0
+        state.bucket_granted = 0
+
+    def _pick(self, now: float) -> _StreamState | None:
+        """Luồng đang chờ được cấp lượt kế tiếp"""
+        best: _StreamState | None = None
+        best_key: tuple[bool, int, float] | None = None
+        for state in self._streams.values():
+            if not state.waiting:
+                continue
+            behind = self._fps(state.grants, state, now) < state.config.min_fps
+            key = (behind, state.config.priority, -state.last_grant)
+            if best_key is None or key > best_key:
+                best, best_key = state, key
+        return best
+
+    def acquire(self, stream: str, timeout: float | None = None) -> bool:
+        """
+        Chờ tới lượt suy luận của 'stream'. Trả về False nếu quá 'timeout'
+        (None = chờ mãi): frame này bị bỏ để nhường cho luồng quan trọng hơn.
+        """
+        start = time.monotonic()
+        with self._cond:
+            state = self._streams.get(stream)
+            if state is None:
+                # Luồng chưa đăng ký dùng cấu hình mặc định
+                state = _StreamState(ScheduleConfig(), start, bucket_start=start)
+                self._streams[stream] = state
+            # Cắt ngay tại đây: report() có thể không bao giờ được gọi
+            self._trim(state.requests, start)
+            state.requests.append(start)
+            state.bucket_requests += 1
+            state.waiting += 1
+            deadline = None if timeout is None else start + timeout
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self._free > 0 and self._pick(now) is state:
+                        self._free -= 1
+                        state.grants.append(now)
+                        state.last_grant = now
+                        state.granted += 1
+                        state.bucket_granted += 1
+                        state.wait_total += now - start
+                        self._roll_window(state, now)
+                        return True
+                    if deadline is not None and now >= deadline:
+                        state.shed += 1
+                        self._roll_window(state, now)
+                        return False
+                    self._cond.wait(None if deadline is None else deadline - now)
+            finally:
+                state.waiting -= 1
+                # Lượt trống có thể thuộc về luồng khác đang chờ
+                self._cond.notify_all()
+
+    def release(self) -> None:
+        with self._cond:
+            self._free = min(self.slots, self._free + 1)
+            self._cond.notify_all()
+
+    def report(self) -> list[ScheduleReport]:
+        now = time.monotonic()
+        reports: list[ScheduleReport] = []
+        with self._cond:
+            for stream, state in self._streams.items():
+                self._roll_window(state, now)
+                reports.append(
+                    ScheduleReport(
+                        stream=stream,
+                        priority=state.config.priority,
+                        min_fps=state.config.min_fps,
+                        fps=self._fps(state.grants, state, now),
+                        requested_fps=self._fps(state.requests, state, now),
+                        granted=state.granted,
+                        shed=state.shed,
+                        mean_wait_ms=(
+                            state.wait_total / state.granted * 1000
+                            if state.granted
+                            else 0.0
+                        ),
+                        met_ratio=(
+                            state.windows_met / state.windows if state.windows else None
+                        ),
+                    )
+                )
+        return sorted(reports, key=lambda r: -r.priority)
+
+    def render_metrics(self) -> list[str]:
+        """Các dòng Prometheus cho /metrics"""
+        reports = self.report()
+        metrics = (
+            ("fps", "gauge", "Inference rate granted to each stream.", "fps"),
+            ("min_fps", "gauge", "Guaranteed inference rate.", "min_fps"),
+            ("shed_total", "counter", "Frames skipped to free capacity.", "shed"),
+            ("guarantee_ratio", "gauge", "Windows meeting min_fps.", "met_ratio"),
+        )
+        lines: list[str] = []
+        for name, kind, help_text, attr in metrics:
+            lines += [
+                f"# HELP lpm_schedule_{name} {help_text}",
+                f"# TYPE lpm_schedule_{name} {kind}",
+            ]
+            for report in reports:
+                value = getattr(report, attr)
+                if value is not None:
+                    lines.append(
+                        f'lpm_schedule_{name}{{stream="{report.stream}"}} {value:g}'
+                    )
+        return lines
+
+
+def format_schedule(report: ScheduleReport) -> str:
+    """Chuỗi ngắn cho thanh trạng thái: "8.0/10 fps (96%), bỏ 12" """
+    text = f"{report.fps:.1f}"
+    if report.min_fps > 0:
+        text += f"/{report.min_fps:g}"
+    text += " fps"
+    if report.met_ratio is not None:
+        text += f" ({report.met_ratio:.0%})"
+    if report.shed:
+        text += f", bỏ {report.shed}"
+    return text
@@ -0,0 +1,146 @@
+from dataclasses import dataclass, field
+from typing import Any, cast
+
+import numpy as np
+import numpy.typing as npt
+
+Rect = tuple[int, int, int, int]
+
+
+@dataclass
+class TilingConfig:
+    """Cấu hình suy luận theo vùng quan tâm (ROI) hoặc lưới ô chồng lấn"""
+
+    # "off": cả khung hình, "roi": chỉ các vùng cấu hình, "grid": lưới ô
+    mode: str = "off"
+    rois: list[Rect] = field(default_factory=list)
+    # Kích thước cạnh ô theo pixel gốc (0 = bằng imgsz của mô hình)
+    tile_size: int = 0
+    overlap: float = 0.2
+    # Chạy thêm một lượt cả khung hình (thu nhỏ) để bắt xe lớn ở gần
+    include_full_frame: bool = True
+    nms_iou: float = 0.5
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "TilingConfig":
+        """Factory method để tạo TilingConfig từ mục "tiling" của cấu hình luồng."""
+        return cls(
+            mode=str(data.get("mode", "off")).lower(),
+            rois=[
+                cast(Rect, tuple(int(v) for v in r[:4])) for r in data.get("rois", [])
+            ],
+            tile_size=int(data.get("tile_size", 0)),
+            overlap=float(data.get("overlap", 0.2)),
+            include_full_frame=bool(data.get("include_full_frame", True)),
+            nms_iou=float(data.get("nms_iou", 0.5)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode in ("roi", "grid")
+
+
+def _axis_starts(length: int, tile: int, step: int) -> list[int]:
+    """Vị trí bắt đầu các ô trên một trục, ô cuối được kéo sát mép ảnh"""
+    if length <= tile:
+        return [0]
+    starts = list(range(0, length - tile, step))
+    starts.append(length - tile)
+    return starts
+
+
+def make_tiles(
+    frame_shape: tuple[int, ...], config: TilingConfig, default_size: int
+) -> list[Rect]:
+    """Sinh danh sách vùng cắt (x1, y1, x2, y2) trong tọa độ khung hình"""
+    h, w = frame_shape[:2]
+    tiles: list[Rect] = []
+
+    if config.mode == "roi":
+        for x1, y1, x2, y2 in config.rois:
+            x1, y1 = max(0, x1), max(0, y1)
+            x2, y2 = min(w, x2), min(h, y2)
+            if x2 > x1 and y2 > y1:
+                tiles.append((x1, y1, x2, y2))
+    elif config.mode == "grid":
+        size = config.tile_size or default_size
+        step = max(1, int(size * (1 - config.overlap)))
+        for y in _axis_starts(h, size, step):
+            for x in _axis_starts(w, size, step):
+                tiles.append((x, y, min(w, x + size), min(h, y + size)))
+
+    if config.include_full_frame or not tiles:
+        tiles.append((0, 0, w, h))
+    return tiles
+
+
+def nms(
+    boxes: npt.NDArray[Any], scores: npt.NDArray[Any], iou_threshold: float
+) -> npt.NDArray[np.intp]:
+    """Non-maximum suppression tham lam, trả về chỉ số các box được giữ lại"""
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+    order = np.argsort(-scores)
+    keep: list[int] = []
+
+    while order.size > 0:
+        i = int(order[0])
+        keep.append(i)
+        rest = order[1:]
+        ix1 = np.maximum(x1[i], x1[rest])
+        iy1 = np.maximum(y1[i], y1[rest])
+        ix2 = np.minimum(x2[i], x2[rest])
+        iy2 = np.minimum(y2[i], y2[rest])
+        inter = np.maximum(ix2 - ix1, 0) * np.maximum(iy2 - iy1, 0)
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-6)
+        order = rest[iou < iou_threshold]
+
+    return np.asarray(keep, dtype=np.intp)
+
+
+def merge_tile_detections(
+    per_tile: list[npt.NDArray[Any]],
+    tiles: list[Rect],
+    frame_shape: tuple[int, ...],
+    iou_threshold: float,
+    edge_margin: int = 2,
+) -> npt.NDArray[np.float32]:
+    """
+    Đưa box (x1, y1, x2, y2, conf, cls) của từng ô về tọa độ khung hình rồi
+    gộp bằng NMS theo từng lớp.
+    """
+    h, w = frame_shape[:2]
+    merged: list[npt.NDArray[Any]] = []
+    priorities: list[npt.NDArray[Any]] = []
+
+    for dets, (tx1, ty1, tx2, ty2) in zip(per_tile, tiles):
+        if len(dets) == 0:
+            continue
+        dets = dets[:, :6].astype(np.float32, copy=True)
+
+        # Box chạm mép trong của ô thường bị cắt dở, ưu tiên bản đầy đủ ở ô bên cạnh
+        cut = np.zeros(len(dets), dtype=bool)
+        if tx1 > 0:
+            cut |= dets[:, 0] <= edge_margin
+        if ty1 > 0:
+            cut |= dets[:, 1] <= edge_margin
+        if tx2 < w:
+            cut |= dets[:, 2] >= (tx2 - tx1) - edge_margin
+        if ty2 < h:
+            cut |= dets[:, 3] >= (ty2 - ty1) - edge_margin
+
+        dets[:, [0, 2]] += tx1
+        dets[:, [1, 3]] += ty1
+        merged.append(dets)
+        priorities.append(np.where(cut, dets[:, 4] * 0.5, dets[:, 4]))
+
+    if not merged:
+        return np.empty((0, 6), dtype=np.float32)
+
+    all_dets = np.concatenate(merged)
+    all_priority = np.concatenate(priorities)
+
+    # Dịch box theo lớp để NMS một lần mà không gộp nhầm khác lớp
+    offsets = all_dets[:, 5:6] * (max(h, w) + 1)
+    keep = nms(all_dets[:, :4] + offsets, all_priority, iou_threshold)
+    return all_dets[keep]
@@ -0,0 +1,401 @@
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any
+
+import cv2
+import numpy as np
+import numpy.typing as npt
+import torch
+
+from license_plate_monitor.ai.reid import ReIDIndex, appearance_embedding, box_size
+
+
+@dataclass
+class FrameTracks:
+    """Các đối tượng đang được track trong một frame, dạng mảng numpy"""
+
+    ids: npt.NDArray[np.int64]
+    boxes: npt.NDArray[np.float32]  # (N, 4) x1, y1, x2, y2
+    confs: npt.NDArray[np.float32]
+    classes: npt.NDArray[np.int64]
+    labels: list[str]
+
+    @classmethod
+    def empty(cls) -> "FrameTracks":
+        return cls(
+            ids=np.empty(0, dtype=np.int64),
+            boxes=np.empty((0, 4), dtype=np.float32),
+            confs=np.empty(0, dtype=np.float32),
+            classes=np.empty(0, dtype=np.int64),
+            labels=[],
+        )
+
+    @classmethod
+    def from_results(cls, res: Any) -> "FrameTracks":
+        """Factory method để tạo FrameTracks từ Results của ultralytics."""
+        if res is None or res.boxes is None or res.boxes.id is None:
+            return cls.empty()
+
+        def to_numpy(value: Any) -> npt.NDArray[Any]:
+            # Chuyển tensor về numpy tùy theo thiết bị chạy (CPU/GPU)
+            if isinstance(value, torch.Tensor):
+                return value.cpu().numpy()
+            return np.asarray(value)
+
+        classes = to_numpy(res.boxes.cls).astype(np.int64)
+        return cls(
+            ids=to_numpy(res.boxes.id).astype(np.int64),
+            boxes=to_numpy(res.boxes.xyxy).astype(np.float32),
+            confs=to_numpy(res.boxes.conf).astype(np.float32),
+            classes=classes,
+            labels=[res.names[int(c)] for c in classes],
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+@dataclass
+class TrackState:
+    """Trạng thái của một track qua nhiều frame và ảnh cắt tốt nhất đến hiện tại"""
+
+    track_id: int
+    label: str
+    first_frame: int
+    last_frame: int
+    # Thời điểm (giây, theo luồng) lần đầu thấy xe và lúc có ảnh cắt tốt nhất
+    first_time: float = 0.0
+    best_time: float = 0.0
+    hits: int = 0
+    best_score: float = 0.0
+    # Chỉ số rẻ (diện tích * conf) dùng để bỏ qua sớm các ứng viên kém
+    best_proxy: float = 0.0
+    best_conf: float = 0.0
+    best_box: tuple[float, float, float, float] = (0.0, 0.0, 0.0, 0.0)
+    best_crop: npt.NDArray[Any] | None = field(default=None, repr=False)
+    emitted: bool = False
+    # Tâm, kích thước box ở lần thấy cuối và đặc trưng màu (tính lười) cho ReID
+    last_center: tuple[float, float] = (0.0, 0.0)
+    last_size: float = 0.0
+    embedding: npt.NDArray[Any] | None = field(default=None, repr=False)
+
+    def to_detection(self) -> dict[str, Any]:
+        return {
+            "id": self.track_id,
+            "label": self.label,
+            "conf": self.best_conf,
+            "image": self.best_crop,
+            "box": self.best_box,
+            "frames": self.hits,
+            "first_time": self.first_time,
+            "best_time": self.best_time,
+        }
+
+
+def sharpness(crop: npt.NDArray[Any], size: int = 64) -> float:
+    """Độ nét ước lượng bằng phương sai Laplacian trên ảnh xám thu nhỏ"""
+    h, w = crop.shape[:2]
+    scale = size / max(h, w)
+    if scale < 1:
+        crop = cv2.resize(
+            crop,
+            (max(1, int(w * scale)), max(1, int(h * scale))),
+            interpolation=cv2.INTER_AREA,
+        )
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    return float(cv2.Laplacian(gray, cv2.CV_32F).var())
+
+
+class TrackRegistry:
+    """
+    Lưu trạng thái từng track với giới hạn số lượng và thời gian sống (TTL).
+    Mỗi track chỉ phát ra một ảnh cắt tốt nhất khi kết thúc hoặc quá hạn.
+    """
+
+    def __init__(
+        self,
+        ttl_frames: int = 30,
+        max_age_frames: int = 900,
+        max_tracks: int = 512,
+        margin: int = 25,
+        reid: ReIDIndex | None = None,
+        max_aliases: int = 4096,
+    ):
+        # Số frame không thấy lại trước khi coi track đã kết thúc
+        self.ttl_frames = ttl_frames
+        # Track sống quá lâu (xe đỗ) sẽ được phát ra sớm, không chờ kết thúc
+        self.max_age_frames = max_age_frames
+        self.max_tracks = max_tracks
+        # Chỉ nhận ảnh cắt khi box cách lề khung hình ít nhất 'margin' pixel
+        self.margin = margin
+        self.frame_index = 0
+        # Thời điểm của frame hiện tại do nơi gọi truyền vào
+        self.timestamp = 0.0
+        self._tracks: OrderedDict[int, TrackState] = OrderedDict()
+        # Các track vừa có ảnh cắt tốt hơn trong frame hiện tại (dùng cho OCR)
+        self.improved: list[int] = []
+        # Nhận lại xe sau khi đổi ID: ID mới của ByteTrack -> ID track gốc
+        self.reid = reid
+        self.aliases: OrderedDict[int, int] = OrderedDict()
+        self.max_aliases = max_aliases
+        # Trạng thái các track đã kết thúc còn trong index ReID, để nối tiếp lại
+        self._retired: OrderedDict[int, TrackState] = OrderedDict()
+        # Số track mới đã được gộp vào track cũ (để theo dõi hiệu quả ReID)
+        self.merged = 0
+
+    @classmethod
+    def from_dict(
+        cls, data: dict[str, Any], reid: ReIDIndex | None = None
+    ) -> "TrackRegistry":
+        """Factory method để tạo TrackRegistry từ mục "tracks" của cấu hình luồng."""
+        return cls(
+            ttl_frames=int(data.get("ttl_frames", 30)),
+            max_age_frames=int(data.get("max_age_frames", 900)),
+            max_tracks=int(data.get("max_tracks", 512)),
+            margin=int(data.get("margin", 25)),
+            reid=reid,
+        )
+
+    def canonical(self, ids: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+        """Đổi ID của ByteTrack sang ID track gốc đã được gộp"""
+        if not self.aliases:
+            return ids
+        return np.fromiter(
+            (self.aliases.get(i, i) for i in ids.tolist()),
+            dtype=np.int64,
+            count=len(ids),
+        )
+
+    def __len__(self) -> int:
+        return len(self._tracks)
+
+    def get(self, track_id: int) -> TrackState | None:
+        return self._tracks.get(track_id)
+
+    def update(
+        self, frame: npt.NDArray[Any], tracks: FrameTracks, timestamp: float = 0.0
+    ) -> list[dict[str, Any]]:
+        """Cập nhật với các track của frame hiện tại, trả về các track đã xong"""
+        self.frame_index += 1
+        self.timestamp = timestamp
+        self.improved = []
+        h, w = frame.shape[:2]
+        ids = self.canonical(tracks.ids).tolist()
+        present = set(ids)
+
+        for i, track_id in enumerate(ids):
+            x1, y1, x2, y2 = tracks.boxes[i].tolist()
+            state = self._tracks.get(track_id)
+            if state is None and self.reid is not None:
+                state = self._reidentify(
+                    track_id, frame, (x1, y1, x2, y2), tracks.labels[i], present
+                )
+            if state is None:
+                state = TrackState(
+                    track_id,
+                    tracks.labels[i],
+                    self.frame_index,
+                    self.frame_index,
+                    first_time=timestamp,
+                )
+                self._tracks[track_id] = state
+            else:
+                self._tracks.move_to_end(state.track_id)
+            state.last_frame = self.frame_index
+            state.last_center = ((x1 + x2) / 2, (y1 + y2) / 2)
+            state.last_size = box_size((x1, y1, x2, y2))
+
+            if state.emitted:
+                continue
+
+            # Chỉ chấp nhận nếu box nằm hoàn toàn bên trong khung hình
+            m = self.margin
+            if not (x1 > m and y1 > m and x2 < (w - m) and y2 < (h - m)):
+                continue
+            state.hits += 1
+            self._consider_crop(state, frame, (x1, y1, x2, y2), float(tracks.confs[i]))
+
+        return self._collect_finished()
+
+    def _embedding(self, state: TrackState) -> npt.NDArray[Any] | None:
+        if state.embedding is None and state.best_crop is not None:
+            state.embedding = appearance_embedding(state.best_crop)
+        return state.embedding
+
+    def _reidentify(
+        self,
+        track_id: int,
+        frame: npt.NDArray[Any],
+        box: tuple[float, float, float, float],
+        label: str,
+        present: set[int],
+    ) -> TrackState | None:
+        """
+        So khớp track mới với track đang mất dấu hoặc vừa kết thúc. Khi khớp,
+        ID mới được gộp vào track cũ; track đã kết thúc được nối tiếp lại
+        ở trạng thái đã phát (không đếm và lưu lần nữa).
+        """
+        assert self.reid is not None
+        x1, y1, x2, y2 = box
+        crop = frame[
+            max(0, int(y1)) : min(frame.shape[0], int(y2)),
+            max(0, int(x1)) : min(frame.shape[1], int(x2)),
+        ]
+        if crop.size == 0:
+            return None
+        embedding = appearance_embedding(crop)
+        center = ((x1 + x2) / 2, (y1 + y2) / 2)
+        size = box_size(box)
+
+        lost = [
+            s
+            for s in self._tracks.values()
+            if s.track_id not in present
+            and s.label == label
+            and self.frame_index - s.last_frame <= self.reid.window_frames
+        ]
+        candidates = [(s, e) for s in lost if (e := self._embedding(s)) is not None]
+        if candidates:
+            states = [s for s, _ in candidates]
+            embeddings = np.stack([e for _, e in candidates])
+            centers = np.asarray([s.last_center for s in states], dtype=np.float32)
+            sizes = np.asarray([s.last_size for s in states], dtype=np.float32)
+            gaps = np.asarray([self.frame_index - s.last_frame for s in states])
+            similarity = np.where(
+                self.reid.gate(centers, sizes, gaps, center, size),
+                embeddings @ embedding,
+                -1.0,
+            )
+            best = int(np.argmax(similarity))
+            if similarity[best] >= self.reid.threshold:
+                state = states[best]
+                self._merge(track_id, state, present)
+                return state
+
+        match = self.reid.match(label, embedding, center, size, self.frame_index)
+        if match is None:
+            return None
+        retired = self._retired.pop(match.track_id, None)
+        if retired is None:
+            retired = TrackState(
+                match.track_id,
+                label,
+                self.frame_index,
+                self.frame_index,
+                first_time=self.timestamp,
+                emitted=True,
+                embedding=embedding,
+            )
+        # Nối tiếp track đã phát với ID gốc, không đếm và lưu lần nữa
+        self._tracks[retired.track_id] = retired
+        self._merge(track_id, retired, present)
+        return retired
+
+    def _merge(self, track_id: int, state: TrackState, present: set[int]) -> None:
+        """Ghi nhận ID mới của ByteTrack là bí danh của track 'state'"""
+        self.aliases[track_id] = state.track_id
+        while len(self.aliases) > self.max_aliases:
+            self.aliases.popitem(last=False)
+        present.add(state.track_id)
+        self.merged += 1
+
+    def _retire(self, state: TrackState) -> None:
+        """Đưa track đã kết thúc vào index ReID, giữ trạng thái để nối tiếp"""
+        if self.reid is None:
+            return
+        embedding = self._embedding(state)
+        if embedding is None:
+            return
+        self.reid.add(
+            state.track_id,
+            state.label,
+            embedding,
+            state.last_center,
+            state.last_size,
+            state.last_frame,
+        )
+        # Ảnh cắt đã được phát, không cần giữ trong bộ nhớ
+        state.best_crop = None
+        self._retired[state.track_id] = state
+        while len(self._retired) > self.reid.capacity:
+            self._retired.popitem(last=False)
+
+    def _consider_crop(
+        self,
+        state: TrackState,
+        frame: npt.NDArray[Any],
+        box: tuple[float, float, float, float],
+        conf: float,
+    ) -> None:
+        """Chấm điểm ảnh cắt theo kích thước, độ nét, độ tin cậy và giữ bản tốt nhất"""
+        x1, y1, x2, y2 = box
+        area = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+        proxy = area * conf
+        # Độ nét không thể bù cho ảnh nhỏ hơn hẳn, khỏi cần tính
+        if state.best_crop is not None and proxy < 0.8 * state.best_proxy:
+            return
+
+        crop = frame[
+            max(0, int(y1)) : min(frame.shape[0], int(y2)),
+            max(0, int(x1)) : min(frame.shape[1], int(x2)),
+        ]
+        if crop.size == 0:
+            return
+
+        # Laplacian bão hòa dần để độ nét không lấn át kích thước
+        sharp = sharpness(crop)
+        score = np.sqrt(area) * conf * (sharp / (sharp + 100.0))
+        if score > state.best_score:
+            state.best_score = float(score)
+            state.best_proxy = proxy
+            state.best_conf = conf
+            state.best_box = box
+            state.best_time = self.timestamp
+            # Sao chép để không giữ tham chiếu tới cả frame
+            state.best_crop = crop.copy()
+            state.embedding = None
+            self.improved.append(state.track_id)
+
+    def _collect_finished(self) -> list[dict[str, Any]]:
+        finished: list[dict[str, Any]] = []
+        expire_before = self.frame_index - self.ttl_frames
+
+        # OrderedDict được sắp theo lần thấy cuối, track cũ nhất nằm đầu
+        while self._tracks:
+            track_id, state = next(iter(self._tracks.items()))
+            if (
+                state.last_frame > expire_before
+                and len(self._tracks) <= self.max_tracks
+            ):
+                break
+            del self._tracks[track_id]
+            if not state.emitted and state.best_crop is not None:
+                finished.append(state.to_detection())
+                state.emitted = True
+            self._retire(state)
+
+        # Track sống quá lâu: phát ra ngay nhưng vẫn giữ để không phát lại
+        for state in self._tracks.values():
+            age = self.frame_index - state.first_frame
+            if (
+                not state.emitted
+                and state.best_crop is not None
+                and age >= self.max_age_frames
+            ):
+                finished.append(state.to_detection())
+                state.emitted = True
+                if self.reid is not None:
+                    self._embedding(state)
+                state.best_crop = None
+
+        return finished
+
+    def flush(self) -> list[dict[str, Any]]:
+        """Kết thúc mọi track còn lại (khi nguồn video kết thúc)"""
+        finished = [
+            state.to_detection()
+            for state in self._tracks.values()
+            if not state.emitted and state.best_crop is not None
+        ]
+        self._tracks.clear()
+        return finished
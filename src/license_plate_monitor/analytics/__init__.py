@@ -0,0 +1,19 @@
+from .counting import CountingConfig, ZoneCounter
+from .heatmap import DensityHeatmap, HeatmapConfig
+from .timeseries import TimeSeriesStore, TrafficSeries
+from .trajectory import GroundCalibration, TrajectoryStore
+from .watchlist import Watchlist, WatchlistIndex, WatchlistMatch
+
+__all__ = [
+    "CountingConfig",
+    "DensityHeatmap",
+    "GroundCalibration",
+    "HeatmapConfig",
+    "TimeSeriesStore",
+    "TrafficSeries",
+    "TrajectoryStore",
+    "Watchlist",
+    "WatchlistIndex",
+    "WatchlistMatch",
+    "ZoneCounter",
+]
@@ -0,0 +1,270 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any
+
+import cv2
+import numpy as np
+import numpy.typing as npt
+
+from license_plate_monitor.ai.tracks import FrameTracks
+from license_plate_monitor.analytics.trajectory import anchor_points
+
+Point = tuple[float, float]
+
+# Trạng thái track lưu dạng bitmask, mỗi vạch/vùng chiếm một bit
+MAX_SHAPES = 32
+
+
+@dataclass
+class CountingLine:
+    """
+    Vạch đếm A -> B. Với vạch vẽ từ trái sang phải, directions[0] là chiều
+    đi xuống (từ phía trên vạch sang phía dưới), directions[1] là chiều ngược lại.
+    """
+
+    name: str
+    start: Point
+    end: Point
+    directions: tuple[str, str] = ("in", "out")
+
+
+@dataclass
+class CountingZone:
+    """Vùng đa giác, đếm số lượt xe đi vào/ra và số xe đang ở trong vùng"""
+
+    name: str
+    points: list[Point]
+
+
+@dataclass
+class CountingConfig:
+    lines: list[CountingLine] = field(default_factory=list)
+    zones: list[CountingZone] = field(default_factory=list)
+    # Điểm đại diện của box: "bottom" (tâm cạnh dưới, sát mặt đường) hoặc "center"
+    anchor: str = "bottom"
+    # Số frame giữ vị trí của track đã mất dấu, để vẫn đếm khi track xuất hiện lại
+    ttl_frames: int = 30
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "CountingConfig":
+        """Factory method để tạo CountingConfig từ mục "counting" của cấu hình luồng."""
+        lines = [
+            CountingLine(
+                name=str(item.get("name", f"line{i}")),
+                start=(float(item["points"][0][0]), float(item["points"][0][1])),
+                end=(float(item["points"][1][0]), float(item["points"][1][1])),
+                directions=(
+                    str(item.get("directions", ("in", "out"))[0]),
+                    str(item.get("directions", ("in", "out"))[1]),
+                ),
+            )
+            for i, item in enumerate(data.get("lines", []))
+        ]
+        zones = [
+            CountingZone(
+                name=str(item.get("name", f"zone{i}")),
+                points=[(float(x), float(y)) for x, y in item["points"]],
+            )
+            for i, item in enumerate(data.get("zones", []))
+        ]
+        return cls(
+            lines=lines,
+            zones=zones,
+            anchor=str(data.get("anchor", "bottom")),
+            ttl_frames=int(data.get("ttl_frames", 30)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.lines or self.zones)
+
+
+def _cross(
+    ax: npt.NDArray[Any],
+    ay: npt.NDArray[Any],
+    bx: npt.NDArray[Any],
+    by: npt.NDArray[Any],
+) -> npt.NDArray[Any]:
+    cross: npt.NDArray[Any] = ax * by - ay * bx
+    return cross
+
+
+def segment_crossings(
+    starts: npt.NDArray[np.float32],
+    ends: npt.NDArray[np.float32],
+    lines: npt.NDArray[np.float32],
+) -> tuple[npt.NDArray[np.bool_], npt.NDArray[np.bool_]]:
+    """
+    Kiểm tra giao cắt giữa N đoạn di chuyển (start -> end) và L vạch (L, 4).
+    Trả về (crossed, forward) dạng (N, L); forward = đi theo directions[0].
+    """
+    px, py = starts[:, 0:1], starts[:, 1:2]
+    qx, qy = ends[:, 0:1], ends[:, 1:2]
+    ax, ay, bx, by = lines[:, 0], lines[:, 1], lines[:, 2], lines[:, 3]
+
+    # Phía của điểm đầu/cuối so với vạch (điểm nằm trên vạch tính là phía dương)
+    side_p = _cross(bx - ax, by - ay, px - ax, py - ay) >= 0
+    side_q = _cross(bx - ax, by - ay, qx - ax, qy - ay) >= 0
+    # Hai đầu vạch phải nằm khác phía so với đoạn di chuyển
+    d_a = _cross(qx - px, qy - py, ax - px, ay - py)
+    d_b = _cross(qx - px, qy - py, bx - px, by - py)
+
+    crossed = (side_p != side_q) & (d_a * d_b <= 0)
+    return crossed, crossed & side_q
+
+
+class ZoneCounter:
+    """
+    Đếm xe qua vạch và vào/ra vùng theo chiều và theo loại xe.
+    Trạng thái mọi track giữ trong các mảng numpy sắp theo ID, nên mỗi frame
+    chỉ tốn vài phép toán vector dù có hàng trăm track.
+    """
+
+    def __init__(self, config: CountingConfig):
+        if len(config.lines) > MAX_SHAPES or len(config.zones) > MAX_SHAPES:
+            raise ValueError(f"Tối đa {MAX_SHAPES} vạch và {MAX_SHAPES} vùng mỗi luồng")
+        self.config = config
+        self._lines = np.asarray(
+            [(*line.start, *line.end) for line in config.lines], dtype=np.float32
+        ).reshape(-1, 4)
+        # Ảnh bitmask vùng theo kích thước frame, dựng ở frame đầu tiên
+        self._zone_mask: npt.NDArray[np.uint32] | None = None
+        self.frame_index = 0
+
+        # Trạng thái track, sắp tăng dần theo ID
+        self._ids = np.empty(0, dtype=np.int64)
+        self._points = np.empty((0, 2), dtype=np.float32)
+        self._inside = np.empty(0, dtype=np.uint32)
+        self._crossed = np.empty(0, dtype=np.uint32)
+        self._last_seen = np.empty(0, dtype=np.int64)
+
+        # (tên vạch/vùng, chiều, loại xe) -> số lượt
+        self.counts: defaultdict[tuple[str, str, str], int] = defaultdict(int)
+        # Số xe đang ở trong từng vùng
+        self.occupancy: dict[str, int] = {zone.name: 0 for zone in config.zones}
+
+    def _build_zone_mask(self, frame_shape: tuple[int, ...]) -> npt.NDArray[np.uint32]:
+        h, w = frame_shape[:2]
+        mask = np.zeros((h, w), dtype=np.uint32)
+        for i, zone in enumerate(self.config.zones):
+            layer = np.zeros((h, w), dtype=np.uint8)
+            polygon = np.asarray(zone.points, dtype=np.int32).reshape(-1, 1, 2)
+            cv2.fillPoly(layer, [polygon], 1)
+            mask |= layer.astype(np.uint32) << np.uint32(i)
+        return mask
+
+    def update(
+        self, tracks: FrameTracks, frame_shape: tuple[int, ...]
+    ) -> list[tuple[str, str, str]]:
+        """Cập nhật với các track của frame hiện tại, trả về các lượt đếm mới"""
+        self.frame_index += 1
+        events: list[tuple[str, str, str]] = []
+        ids = tracks.ids
+        points = anchor_points(tracks.boxes, self.config.anchor)
+
+        # Ghép với trạng thái cũ bằng tìm kiếm nhị phân trên mảng ID đã sắp
+        known = np.zeros(len(ids), dtype=bool)
+        pos = np.zeros(len(ids), dtype=np.intp)
+        if len(self._ids):
+            pos = np.minimum(np.searchsorted(self._ids, ids), len(self._ids) - 1)
+            known = self._ids[pos] == ids
+        prev_index = pos[known]
+
+        crossed = np.zeros(len(ids), dtype=np.uint32)
+        crossed[known] = self._crossed[prev_index]
+        if len(self._lines) and known.any():
+            hit, forward = segment_crossings(
+                self._points[prev_index], points[known], self._lines
+            )
+            # Mỗi track chỉ được đếm một lần trên mỗi vạch
+            bits = np.uint32(1) << np.arange(len(self._lines), dtype=np.uint32)
+            hit &= (crossed[known][:, None] & bits) == 0
+            rows, cols = np.nonzero(hit)
+            known_rows = np.flatnonzero(known)
+            for r, c in zip(rows.tolist(), cols.tolist()):
+                line = self.config.lines[c]
+                direction = line.directions[0 if forward[r, c] else 1]
+                events.append((line.name, direction, tracks.labels[known_rows[r]]))
+            crossed[known] |= np.bitwise_or.reduce(
+                np.where(hit, bits, np.uint32(0)), axis=1
+            ).astype(np.uint32)
+
+        inside = np.zeros(len(ids), dtype=np.uint32)
+        if self.config.zones:
+            if self._zone_mask is None or self._zone_mask.shape != frame_shape[:2]:
+                self._zone_mask = self._build_zone_mask(frame_shape)
+            h, w = self._zone_mask.shape
+            xs = np.clip(points[:, 0].astype(np.int64), 0, w - 1)
+            ys = np.clip(points[:, 1].astype(np.int64), 0, h - 1)
+            inside = self._zone_mask[ys, xs]
+
+            # Track mới xuất hiện không sinh lượt vào/ra, tránh đếm trùng khi đổi ID
+            previous = inside.copy()
+            previous[known] = self._inside[prev_index]
+            entered = inside & ~previous
+            exited = previous & ~inside
+            for i in np.flatnonzero(entered | exited).tolist():
+                for z, zone in enumerate(self.config.zones):
+                    bit = np.uint32(1 << z)
+                    if entered[i] & bit:
+                        events.append((zone.name, "in", tracks.labels[i]))
+                    elif exited[i] & bit:
+                        events.append((zone.name, "out", tracks.labels[i]))
+
+            for z, zone in enumerate(self.config.zones):
+                self.occupancy[zone.name] = int(
+                    np.count_nonzero(inside & np.uint32(1 << z))
+                )
+
+        self._merge_state(ids, known, prev_index, points, inside, crossed)
+        for event in events:
+            self.counts[event] += 1
+        return events
+
+    def _merge_state(
+        self,
+        ids: npt.NDArray[np.int64],
+        known: npt.NDArray[np.bool_],
+        prev_index: npt.NDArray[np.intp],
+        points: npt.NDArray[np.float32],
+        inside: npt.NDArray[np.uint32],
+        crossed: npt.NDArray[np.uint32],
+    ) -> None:
+        """Giữ lại track cũ chưa quá TTL, thay trạng thái của track đang thấy"""
+        keep = np.ones(len(self._ids), dtype=bool)
+        keep[prev_index] = False
+        keep &= self._last_seen > self.frame_index - self.config.ttl_frames
+
+        merged_ids = np.concatenate([self._ids[keep], ids])
+        order = np.argsort(merged_ids, kind="stable")
+        self._ids = merged_ids[order]
+        self._points = np.concatenate([self._points[keep], points])[order]
+        self._inside = np.concatenate([self._inside[keep], inside])[order]
+        self._crossed = np.concatenate([self._crossed[keep], crossed])[order]
+        self._last_seen = np.concatenate(
+            [
+                self._last_seen[keep],
+                np.full(len(ids), self.frame_index, dtype=np.int64),
+            ]
+        )[order]
+
+    def summary(self) -> dict[str, int]:
+        """Số lượt dạng phẳng {"<vạch/vùng> <chiều> <loại xe>": n} để hiển thị"""
+        return {
+            f"{name} {direction} {label}": count
+            for (name, direction, label), count in sorted(self.counts.items())
+        }
+
+    def draw(self, frame: npt.NDArray[Any]) -> npt.NDArray[Any]:
+        """Vẽ các vạch và vùng đếm lên frame"""
+        for zone in self.config.zones:
+            polygon = np.asarray(zone.points, dtype=np.int32).reshape(-1, 1, 2)
+            cv2.polylines(frame, [polygon], True, (255, 200, 0), 2)
+        for line in self.config.lines:
+            start = (int(line.start[0]), int(line.start[1]))
+            end = (int(line.end[0]), int(line.end[1]))
+            cv2.line(frame, start, end, (0, 255, 255), 2)
+            cv2.putText(
+                frame, line.name, start, cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 255, 255), 2
+            )
+        return frame
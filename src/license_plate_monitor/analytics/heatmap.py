@@ -0,0 +1,176 @@
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import cv2
+import numpy as np
+import numpy.typing as npt
+
+logger = logging.getLogger(__name__)
+
+HEATMAPS_DIR = os.path.join("detections", "heatmaps")
+# Chỉ tính phần dưới của box (sát mặt đường), phần trên thường là nền phía sau xe
+FOOTPRINT = 1 / 3
+
+
+@dataclass
+class HeatmapConfig:
+    """Cấu hình bản đồ mật độ xe của một luồng"""
+
+    enabled: bool = True
+    # Số ô theo chiều ngang, chiều dọc theo tỉ lệ khung hình
+    grid_width: int = 160
+    # Sau 'half_life' giây không có xe, mật độ của ô giảm còn một nửa
+    half_life: float = 600.0
+    # Độ đậm khi chồng lên video
+    opacity: float = 0.45
+    # Chu kỳ lưu xuống đĩa (giây)
+    save_interval: float = 60.0
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "HeatmapConfig":
+        """Factory method để tạo HeatmapConfig từ mục "heatmap" của cấu hình luồng."""
+        return cls(
+            enabled=bool(data.get("enabled", True)),
+            grid_width=max(8, int(data.get("grid_width", 160))),
+            half_life=max(1.0, float(data.get("half_life", 600.0))),
+            opacity=min(1.0, max(0.0, float(data.get("opacity", 0.45)))),
+            save_interval=float(data.get("save_interval", 60.0)),
+        )
+
+
+class DensityHeatmap:
+    """
+    Tích lũy số giây có xe chiếm chỗ trên lưới thu nhỏ của khung hình, suy
+    giảm theo hàm mũ. Mỗi frame chỉ tốn vài phép toán trên cả lưới: các box
+    được cộng vào bằng mảng sai phân và cộng dồn hai chiều, không lặp theo box
+    hay theo pixel. Xe dừng lâu ở đâu thì ô đó càng đậm.
+    """
+
+    def __init__(self, config: HeatmapConfig, stream_name: str):
+        self.config = config
+        self.path = os.path.join(HEATMAPS_DIR, f"{stream_name}.npz")
+        self._grid: npt.NDArray[np.float32] | None = None
+        self._frame_size: tuple[int, int] | None = None
+        self._last_time: float | None = None
+        self._last_save = time.monotonic()
+        # Luồng video ghi, giao diện đọc để vẽ
+        self._lock = threading.Lock()
+
+    def _ensure_grid(self, frame_shape: tuple[int, ...]) -> npt.NDArray[np.float32]:
+        h, w = frame_shape[:2]
+        if self._grid is None or self._frame_size != (w, h):
+            grid_h = max(1, round(self.config.grid_width * h / w))
+            self._grid = np.zeros((grid_h, self.config.grid_width), np.float32)
+            self._frame_size = (w, h)
+        return self._grid
+
+    def update(
+        self,
+        boxes: npt.NDArray[np.float32],
+        frame_shape: tuple[int, ...],
+        timestamp: float,
+    ) -> None:
+        """Suy giảm cả lưới rồi cộng thời gian của frame vào các ô có xe"""
+        # Bỏ qua bước nhảy thời gian lớn (mất kết nối, video phát lại từ đầu)
+        dt = 0.0 if self._last_time is None else timestamp - self._last_time
+        dt = min(max(dt, 0.0), 1.0)
+        self._last_time = timestamp
+
+        with self._lock:
+            grid = self._ensure_grid(frame_shape)
+            if dt > 0:
+                grid *= np.float32(0.5 ** (dt / self.config.half_life))
+                if len(boxes):
+                    self._accumulate(grid, boxes, dt)
+
+        if time.monotonic() - self._last_save >= self.config.save_interval:
+            self.save()
+
+    def _accumulate(
+        self,
+        grid: npt.NDArray[np.float32],
+        boxes: npt.NDArray[np.float32],
+        dt: float,
+    ) -> None:
+        gh, gw = grid.shape
+        w, h = self._frame_size or (1, 1)
+        # Đổi box sang tọa độ ô: (x1, y1) làm tròn xuống, (x2, y2) làm tròn lên
+        cells = boxes[:, :4] * np.array([gw / w, gh / h, gw / w, gh / h], np.float32)
+        cells[:, 1] = cells[:, 3] - (cells[:, 3] - cells[:, 1]) * FOOTPRINT
+        cells[:, 2:] = np.ceil(cells[:, 2:])
+        limits = np.array([gw, gh, gw, gh], np.float32)
+        x1, y1, x2, y2 = np.minimum(np.maximum(cells, 0), limits).astype(np.int64).T
+        valid = (x2 > x1) & (y2 > y1)
+        x1, x2, y1, y2 = x1[valid], x2[valid], y1[valid], y2[valid]
+
+        # Mảng sai phân 2D: +dt ở góc trên trái, -dt ở hai góc kề, +dt góc đối
+        stride = gw + 1
+        corners = np.concatenate(
+            [y1 * stride + x1, y1 * stride + x2, y2 * stride + x1, y2 * stride + x2]
+        )
+        n = len(x1)
+        weights = np.repeat(np.array([dt, -dt, -dt, dt]), n)
+        diff = np.bincount(corners, weights, minlength=(gh + 1) * stride)
+        diff = diff.reshape(gh + 1, stride)[:gh, :gw].astype(np.float32)
+        # Ảnh tích phân của OpenCV chính là cộng dồn theo cả hai chiều
+        grid += cv2.integral(diff, sdepth=cv2.CV_32F)[1:, 1:]
+
+    def render(self) -> npt.NDArray[np.uint8] | None:
+        """
+        Ảnh RGBA kích thước lưới để giao diện phóng to và chồng lên video.
+        Ô không có xe trong suốt; màu được chuẩn hóa theo phân vị 99.
+        """
+        with self._lock:
+            if self._grid is None:
+                return None
+            grid = self._grid.copy()
+        peak = float(np.percentile(grid[grid > 0], 99)) if grid.any() else 0.0
+        if peak <= 0:
+            return None
+        level = np.clip(grid / peak, 0.0, 1.0)
+        colors = cv2.applyColorMap((level * 255).astype(np.uint8), cv2.COLORMAP_JET)
+        rgba: npt.NDArray[np.uint8] = cv2.cvtColor(colors, cv2.COLOR_BGR2RGBA)
+        # Độ trong suốt tăng dần theo mật độ để vùng ít xe không che video
+        rgba[..., 3] = (np.sqrt(level) * 255 * self.config.opacity).astype(np.uint8)
+        return rgba
+
+    def save(self) -> None:
+        with self._lock:
+            if self._grid is None or self._frame_size is None:
+                return
+            grid = self._grid.copy()
+            frame_size = np.asarray(self._frame_size)
+        self._last_save = time.monotonic()
+        try:
+            os.makedirs(HEATMAPS_DIR, exist_ok=True)
+            # np.savez tự thêm đuôi .npz nếu thiếu, nên file tạm cũng phải có đuôi
+            tmp_path = f"{self.path[:-4]}.tmp.npz"
+            np.savez(tmp_path, grid=grid, frame_size=frame_size, saved_at=time.time())
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Không lưu được heatmap {self.path}: {e}")
+
+    def load(self) -> bool:
+        """Khôi phục lưới đã lưu, suy giảm theo thời gian đã trôi qua từ lúc lưu"""
+        if not os.path.exists(self.path):
+            return False
+        try:
+            with np.load(self.path) as data:
+                grid = data["grid"].astype(np.float32)
+                w, h = (int(v) for v in data["frame_size"])
+                saved_at = float(data["saved_at"])
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Không đọc được heatmap {self.path}: {e}")
+            return False
+        if grid.shape[1] != self.config.grid_width:
+            return False
+        elapsed = max(0.0, time.time() - saved_at)
+        grid *= np.float32(0.5 ** (elapsed / self.config.half_life))
+        with self._lock:
+            self._grid = grid
+            self._frame_size = (w, h)
+        return True
@@ -0,0 +1,148 @@
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+# (độ phân giải theo giây, số ô giữ lại): 1 giờ theo giây, 2 ngày theo phút,
+# 1 năm theo giờ
+DEFAULT_TIERS: tuple[tuple[int, int], ...] = ((1, 3600), (60, 2880), (3600, 8784))
+# Nhãn của cột cuối, gom các loại xe xuất hiện sau khi đã hết cột
+OTHER_LABEL = "other"
+
+
+class RingTier:
+    """
+    Mảng vòng đếm theo khung thời gian cố định 'resolution' giây.
+    Ô được xóa lười khi ghi đè, nhờ ghi nhớ khung thời gian đang chiếm mỗi ô.
+    """
+
+    def __init__(self, resolution: int, length: int, max_classes: int):
+        self.resolution = resolution
+        self.length = length
+        self.counts = np.zeros((length, max_classes), dtype=np.int32)
+        # Khung thời gian tuyệt đối (t // resolution) mà mỗi ô đang lưu
+        self.slots = np.full(length, -1, dtype=np.int64)
+
+    def add(self, timestamp: float, column: int, amount: int) -> None:
+        slot = int(timestamp // self.resolution)
+        row = slot % self.length
+        if self.slots[row] != slot:
+            self.counts[row] = 0
+            self.slots[row] = slot
+        self.counts[row, column] += amount
+
+    def query(self, first_slot: int, last_slot: int) -> npt.NDArray[np.int32]:
+        """Số đếm (last_slot - first_slot + 1, max_classes), ô đã bị ghi đè = 0"""
+        wanted = np.arange(first_slot, last_slot + 1, dtype=np.int64)
+        rows = wanted % self.length
+        valid = self.slots[rows] == wanted
+        return np.where(valid[:, None], self.counts[rows], 0)
+
+    def covers(self, first_slot: int) -> bool:
+        """Khung 'first_slot' còn nằm trong phần lịch sử mà tầng này giữ"""
+        newest = int(self.slots.max())
+        return first_slot > newest - self.length
+
+
+@dataclass
+class SeriesWindow:
+    """Kết quả truy vấn: thời điểm bắt đầu mỗi khung và số đếm theo loại xe"""
+
+    resolution: int
+    times: npt.NDArray[np.int64]
+    labels: list[str]
+    counts: npt.NDArray[np.int32]
+
+
+class TrafficSeries:
+    """
+    Chuỗi thời gian số xe theo loại cho một luồng. Mỗi lượt đếm được cộng vào
+    mọi tầng (giây, phút, giờ) cùng lúc, nên tầng thô hơn luôn là bản
+    lấy mẫu thưa của tầng mịn hơn mà không cần gộp định kỳ. Cột cuối được
+    dành cho OTHER_LABEL: loại xe thứ 'max_classes' trở đi đều đếm vào đó.
+    """
+
+    def __init__(
+        self,
+        tiers: tuple[tuple[int, int], ...] = DEFAULT_TIERS,
+        max_classes: int = 8,
+    ):
+        self.tiers = [RingTier(res, length, max_classes) for res, length in tiers]
+        self.max_classes = max_classes
+        self.labels: list[str] = []
+        self._columns: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def add(self, label: str, timestamp: float, amount: int = 1) -> None:
+        with self._lock:
+            column = self._columns.get(label)
+            if column is None:
+                other = self.max_classes - 1
+                if len(self.labels) >= other:
+                    # Hết cột: gộp vào cột "other" để bộ nhớ không tăng
+                    column = other
+                    if len(self.labels) == other:
+                        self.labels.append(OTHER_LABEL)
+                else:
+                    column = len(self.labels)
+                    self.labels.append(label)
+                self._columns[label] = column
+            for tier in self.tiers:
+                tier.add(timestamp, column, amount)
+
+    def query(
+        self, start: float, end: float, resolution: int | None = None
+    ) -> SeriesWindow:
+        """
+        Số đếm trong [start, end]. Mặc định chọn tầng mịn nhất còn giữ 'start';
+        truyền 'resolution' để chọn tầng cụ thể.
+        """
+        with self._lock:
+            tier = self._pick_tier(start, resolution)
+            first = int(start // tier.resolution)
+            last = int(end // tier.resolution)
+            counts = tier.query(first, last)[:, : len(self.labels)]
+            labels = list(self.labels)
+        times = np.arange(first, last + 1, dtype=np.int64) * tier.resolution
+        return SeriesWindow(tier.resolution, times, labels, counts)
+
+    def _pick_tier(self, start: float, resolution: int | None) -> RingTier:
+        if resolution is not None:
+            for tier in self.tiers:
+                if tier.resolution == resolution:
+                    return tier
+            raise ValueError(f"Không có tầng độ phân giải {resolution}s")
+        for tier in self.tiers:
+            if tier.covers(int(start // tier.resolution)):
+                return tier
+        return self.tiers[-1]
+
+
+class TimeSeriesStore:
+    """Tập chuỗi thời gian theo luồng, dùng chung giữa luồng video và giao diện"""
+
+    def __init__(
+        self,
+        tiers: tuple[tuple[int, int], ...] = DEFAULT_TIERS,
+        max_classes: int = 8,
+    ):
+        self.tiers = tiers
+        self.max_classes = max_classes
+        self._series: dict[str, TrafficSeries] = {}
+        self._lock = threading.Lock()
+
+    def series(self, stream: str) -> TrafficSeries:
+        with self._lock:
+            series = self._series.get(stream)
+            if series is None:
+                series = TrafficSeries(self.tiers, self.max_classes)
+                self._series[stream] = series
+            return series
+
+    def streams(self) -> list[str]:
+        with self._lock:
+            return sorted(self._series)
+
+    def add(self, stream: str, label: str, timestamp: float, amount: int = 1) -> None:
+        self.series(stream).add(label, timestamp, amount)
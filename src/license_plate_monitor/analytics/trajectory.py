@@ -0,0 +1,204 @@
+from dataclasses import dataclass
+from typing import Any
+
+import cv2
+import numpy as np
+import numpy.typing as npt
+
+
+def anchor_points(
+    boxes: npt.NDArray[np.float32], anchor: str = "bottom"
+) -> npt.NDArray[np.float32]:
+    """Điểm đại diện của box: "bottom" (tâm cạnh dưới, sát mặt đường) hoặc "center" """
+    x = (boxes[:, 0] + boxes[:, 2]) / 2
+    y: npt.NDArray[np.floating[Any]]
+    if anchor == "center":
+        y = (boxes[:, 1] + boxes[:, 3]) / 2
+    else:
+        y = boxes[:, 3]
+    return np.stack([x, y], axis=1).astype(np.float32)
+
+
+@dataclass
+class GroundCalibration:
+    """Phép chiếu homography từ pixel sang mặt đường (đơn vị mét)"""
+
+    homography: npt.NDArray[np.float64]
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "GroundCalibration | None":
+        """Factory method để tạo GroundCalibration từ mục "calibration" của cấu hình."""
+        if "homography" in data:
+            matrix = np.asarray(data["homography"], dtype=np.float64).reshape(3, 3)
+            return cls(matrix)
+        if "image_points" in data and "world_points" in data:
+            src = np.asarray(data["image_points"], dtype=np.float64).reshape(-1, 2)
+            dst = np.asarray(data["world_points"], dtype=np.float64).reshape(-1, 2)
+            if len(src) < 4 or len(src) != len(dst):
+                raise ValueError("Cần ít nhất 4 cặp điểm ảnh/mặt đường để hiệu chỉnh")
+            found, _ = cv2.findHomography(src, dst)
+            if found is None:
+                raise ValueError("Không tính được homography từ các điểm đã cho")
+            return cls(np.asarray(found, dtype=np.float64))
+        return None
+
+    def project(self, points: npt.NDArray[Any]) -> npt.NDArray[np.float64]:
+        """Chiếu (..., 2) điểm ảnh sang tọa độ mặt đường (..., 2)"""
+        pts = np.asarray(points, dtype=np.float64)
+        h = pts @ self.homography[:, :2].T + self.homography[:, 2]
+        return h[..., :2] / h[..., 2:3]
+
+
+class TrajectoryStore:
+    """
+    Lưu quỹ đạo (t, cx, cy) của các track đang hoạt động trong mảng cấp phát sẵn.
+    Mỗi track chiếm một slot với vòng đệm cố định 'length' mẫu; slot của track
+    đã mất dấu quá 'ttl_frames' được trả lại để dùng cho track mới.
+    """
+
+    def __init__(
+        self,
+        capacity: int = 1024,
+        length: int = 32,
+        ttl_frames: int = 60,
+        speed_window: float = 1.0,
+    ):
+        self.capacity = capacity
+        self.length = length
+        self.ttl_frames = ttl_frames
+        # Khoảng thời gian (giây) dùng để ước lượng vận tốc
+        self.speed_window = speed_window
+        self.frame_index = 0
+
+        self._t = np.zeros((capacity, length), dtype=np.float64)
+        self._xy = np.zeros((capacity, length, 2), dtype=np.float32)
+        self._head = np.zeros(capacity, dtype=np.int64)
+        self._count = np.zeros(capacity, dtype=np.int64)
+        self._last_seen = np.full(capacity, -1, dtype=np.int64)
+        # Vận tốc gần nhất (km/h) của mỗi slot, NaN khi chưa đủ dữ liệu
+        self._speed = np.full(capacity, np.nan, dtype=np.float64)
+        self._slots: dict[int, int] = {}
+        # Track ID đang sở hữu mỗi slot
+        self._owner = np.full(capacity, -1, dtype=np.int64)
+        self._free = list(range(capacity - 1, -1, -1))
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "TrajectoryStore":
+        """Factory method để tạo TrajectoryStore từ mục "trajectory" của cấu hình."""
+        return cls(
+            capacity=int(data.get("capacity", 1024)),
+            length=int(data.get("length", 32)),
+            ttl_frames=int(data.get("ttl_frames", 60)),
+            speed_window=float(data.get("speed_window", 1.0)),
+        )
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def _release_stale(self) -> None:
+        stale = np.flatnonzero(
+            (self._last_seen >= 0)
+            & (self._last_seen <= self.frame_index - self.ttl_frames)
+        )
+        if not len(stale):
+            return
+        for track_id in self._owner[stale].tolist():
+            del self._slots[track_id]
+        self._owner[stale] = -1
+        self._last_seen[stale] = -1
+        self._free.extend(stale.tolist())
+
+    def _slot_for(self, track_id: int) -> int:
+        """Slot của track, -1 nếu mọi slot đều đang dùng cho frame hiện tại"""
+        slot = self._slots.get(track_id)
+        if slot is not None:
+            # Đánh dấu ngay để slot của frame hiện tại không bị thu hồi
+            self._last_seen[slot] = self.frame_index
+            return slot
+        if not self._free:
+            # Hết slot: thu hồi slot lâu không thấy nhất, trừ slot đã gán ở frame này
+            slot = int(np.argmin(self._last_seen))
+            if self._last_seen[slot] >= self.frame_index:
+                return -1
+            del self._slots[int(self._owner[slot])]
+        else:
+            slot = self._free.pop()
+        self._slots[track_id] = slot
+        self._owner[slot] = track_id
+        self._last_seen[slot] = self.frame_index
+        self._head[slot] = 0
+        self._count[slot] = 0
+        self._speed[slot] = np.nan
+        return slot
+
+    def update(
+        self,
+        ids: npt.NDArray[np.int64],
+        points: npt.NDArray[np.float32],
+        timestamp: float,
+        calibration: GroundCalibration | None = None,
+    ) -> None:
+        """Thêm một mẫu cho mỗi track của frame hiện tại, cập nhật vận tốc"""
+        self.frame_index += 1
+        self._release_stale()
+        if not len(ids):
+            return
+
+        slots = np.fromiter(
+            (self._slot_for(tid) for tid in ids.tolist()),
+            dtype=np.int64,
+            count=len(ids),
+        )
+        # Nhiều track hơn số slot: các track không còn slot bị bỏ qua ở frame này
+        placed = slots >= 0
+        if not placed.all():
+            slots, points = slots[placed], points[placed]
+        heads = self._head[slots]
+        self._t[slots, heads] = timestamp
+        self._xy[slots, heads] = points
+        self._head[slots] = (heads + 1) % self.length
+        self._count[slots] = np.minimum(self._count[slots] + 1, self.length)
+
+        if calibration is not None:
+            self._update_speed(slots, timestamp, calibration)
+
+    def _update_speed(
+        self,
+        slots: npt.NDArray[np.int64],
+        timestamp: float,
+        calibration: GroundCalibration,
+    ) -> None:
+        """Vận tốc theo quãng đường trên mặt đường từ mẫu cũ nhất trong cửa sổ"""
+        t = self._t[slots]
+        # Vị trí của mỗi mẫu trong vòng đệm theo thứ tự ghi (0 = cũ nhất)
+        age = (np.arange(self.length) - self._head[slots, None]) % self.length
+        valid = age >= self.length - self._count[slots, None]
+        in_window = valid & (t >= timestamp - self.speed_window)
+        # Mẫu cũ nhất trong cửa sổ (mẫu mới nhất luôn nằm trong cửa sổ)
+        oldest = np.argmin(np.where(in_window, t, np.inf), axis=1)
+        newest = (self._head[slots] - 1) % self.length
+
+        dt = timestamp - t[np.arange(len(slots)), oldest]
+        start = calibration.project(self._xy[slots, oldest])
+        end = calibration.project(self._xy[slots, newest])
+        distance = np.linalg.norm(end - start, axis=1)
+        # Cần ít nhất nửa cửa sổ để tránh nhiễu ở những frame đầu
+        enough = dt >= self.speed_window / 2
+        speed = np.where(enough, distance / np.maximum(dt, 1e-6) * 3.6, np.nan)
+        self._speed[slots] = np.where(enough, speed, self._speed[slots])
+
+    def trajectory(self, track_id: int) -> npt.NDArray[np.float64]:
+        """Các mẫu (t, cx, cy) của track theo thứ tự thời gian"""
+        slot = self._slots.get(track_id)
+        if slot is None:
+            return np.empty((0, 3), dtype=np.float64)
+        count = int(self._count[slot])
+        order = (int(self._head[slot]) - count + np.arange(count)) % self.length
+        return np.column_stack([self._t[slot, order], self._xy[slot, order]])
+
+    def speed(self, track_id: int) -> float | None:
+        """Vận tốc gần nhất (km/h) của track, None nếu chưa ước lượng được"""
+        slot = self._slots.get(track_id)
+        if slot is None or np.isnan(self._speed[slot]):
+            return None
+        return float(self._speed[slot])
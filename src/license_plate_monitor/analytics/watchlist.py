@@ -0,0 +1,226 @@
+import csv
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+logger = logging.getLogger(__name__)
+
+WATCHLIST_DIR = os.path.join("config", "watchlists")
+
+# Các ký tự OCR hay nhầm được quy về cùng một ký tự đại diện
+CONFUSABLE = str.maketrans(
+    {
+        "O": "0",
+        "D": "0",
+        "Q": "0",
+        "I": "1",
+        "L": "1",
+        "J": "1",
+        "Z": "2",
+        "S": "5",
+        "G": "6",
+        "T": "7",
+        "B": "8",
+    }
+)
+
+
+def plate_key(plate: str) -> str:
+    """Khóa so khớp: bỏ dấu phân cách, in hoa và gộp các ký tự dễ nhầm"""
+    cleaned = "".join(ch for ch in plate.upper() if ch.isalnum())
+    return cleaned.translate(CONFUSABLE)
+
+
+def _deletions(key: str) -> list[str]:
+    return [key[:i] + key[i + 1 :] for i in range(len(key))]
+
+
+def _hash(value: str) -> int:
+    # hash() của chuỗi chỉ ổn định trong một tiến trình, đủ vì index dựng lại khi nạp
+    return hash(value) & 0xFFFFFFFFFFFFFFFF
+
+
+def within_one_edit(a: str, b: str) -> int | None:
+    """Khoảng cách Levenshtein nếu <= 1, ngược lại None"""
+    if a == b:
+        return 0
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return None
+    if la > lb:
+        a, b, la, lb = b, a, lb, la
+    i = 0
+    while i < la and a[i] == b[i]:
+        i += 1
+    # Thay 1 ký tự (cùng độ dài) hoặc chèn 1 ký tự vào chuỗi ngắn hơn
+    rest = a[i + 1 :] if la == lb else a[i:]
+    return 1 if rest == b[i + 1 :] else None
+
+
+@dataclass(frozen=True)
+class WatchlistEntry:
+    plate: str
+    list_name: str
+    note: str = ""
+
+
+@dataclass(frozen=True)
+class WatchlistMatch:
+    entry: WatchlistEntry
+    distance: int
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "plate": self.entry.plate,
+            "list": self.entry.list_name,
+            "note": self.entry.note,
+            "distance": self.distance,
+        }
+
+
+class WatchlistIndex:
+    """
+    Index tra cứu gần đúng cho danh sách lớn (100k+ biển số).
+    Khóa đã gộp ký tự dễ nhầm được tra bằng dict; sai khác thêm một ký tự
+    được tra qua index các biến thể xóa 1 ký tự, lưu dạng mảng hash đã sắp xếp.
+    """
+
+    def __init__(self, entries: list[WatchlistEntry]):
+        self.entries = entries
+        self.keys = [plate_key(e.plate) for e in entries]
+        self.exact: dict[str, list[int]] = {}
+        for i, key in enumerate(self.keys):
+            self.exact.setdefault(key, []).append(i)
+
+        hashes: list[int] = []
+        ids: list[int] = []
+        for i, key in enumerate(self.keys):
+            for variant in [key, *_deletions(key)]:
+                hashes.append(_hash(variant))
+                ids.append(i)
+
+        order = np.argsort(np.asarray(hashes, dtype=np.uint64), kind="stable")
+        self._hashes: npt.NDArray[np.uint64] = np.asarray(hashes, dtype=np.uint64)[
+            order
+        ]
+        self._ids: npt.NDArray[np.int32] = np.asarray(ids, dtype=np.int32)[order]
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, plate: str, max_distance: int = 1) -> list[WatchlistMatch]:
+        """Tìm các biển số trong danh sách cách 'plate' tối đa max_distance ký tự"""
+        key = plate_key(plate)
+        if not key:
+            return []
+
+        matches = {i: 0 for i in self.exact.get(key, [])}
+        if max_distance >= 1 and len(self._hashes):
+            # Hai chuỗi cách nhau 1 ký tự luôn có chung một biến thể xóa (hoặc khóa)
+            probes = np.asarray(
+                [_hash(v) for v in [key, *_deletions(key)]], dtype=np.uint64
+            )
+            left = np.searchsorted(self._hashes, probes, side="left")
+            right = np.searchsorted(self._hashes, probes, side="right")
+            for lo, hi in zip(left.tolist(), right.tolist()):
+                for i in self._ids[lo:hi].tolist():
+                    if i in matches:
+                        continue
+                    distance = within_one_edit(key, self.keys[i])
+                    if distance is not None:
+                        matches[i] = distance
+
+        return sorted(
+            (WatchlistMatch(self.entries[i], d) for i, d in matches.items()),
+            key=lambda m: m.distance,
+        )
+
+
+def load_entries(directory: str) -> list[WatchlistEntry]:
+    """Đọc mọi file .csv/.txt trong thư mục, mỗi dòng: biển số[,ghi chú]"""
+    entries: list[WatchlistEntry] = []
+    if not os.path.isdir(directory):
+        return entries
+
+    for name in sorted(os.listdir(directory)):
+        stem, ext = os.path.splitext(name)
+        if ext.lower() not in (".csv", ".txt"):
+            continue
+        with open(os.path.join(directory, name), encoding="utf-8", newline="") as f:
+            for row in csv.reader(f):
+                if not row or not row[0].strip() or row[0].startswith("#"):
+                    continue
+                note = row[1].strip() if len(row) > 1 else ""
+                entries.append(WatchlistEntry(row[0].strip(), stem, note))
+    return entries
+
+
+class Watchlist:
+    """
+    Quản lý danh sách theo dõi trong một thư mục, tự nạp lại khi file thay đổi.
+    Index mới được dựng ở luồng nền rồi mới thay thế, không chặn tra cứu.
+    """
+
+    def __init__(self, directory: str = WATCHLIST_DIR, poll_interval: float = 5.0):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self._index = WatchlistIndex([])
+        self._signature: tuple[tuple[str, float, int], ...] = ()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _current_signature(self) -> tuple[tuple[str, float, int], ...]:
+        if not os.path.isdir(self.directory):
+            return ()
+        signature = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file():
+                stat = entry.stat()
+                signature.append((entry.name, stat.st_mtime, stat.st_size))
+        return tuple(sorted(signature))
+
+    def reload(self) -> None:
+        """Dựng lại index từ các file và thay thế index cũ"""
+        start = time.perf_counter()
+        signature = self._current_signature()
+        index = WatchlistIndex(load_entries(self.directory))
+        # Gán tham chiếu là thao tác nguyên tử, luồng tra cứu luôn thấy index đầy đủ
+        self._index = index
+        self._signature = signature
+        elapsed = time.perf_counter() - start
+        logger.info(f"Đã nạp {len(index)} biển số theo dõi ({elapsed:.2f}s)")
+
+    def start(self) -> None:
+        """Nạp lần đầu và theo dõi thay đổi ở luồng nền"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(
+            target=self._watch, name="watchlist-reload", daemon=True
+        )
+        self._thread.start()
+
+    def _watch(self) -> None:
+        first = True
+        while not self._stop.is_set():
+            try:
+                if first or self._current_signature() != self._signature:
+                    self.reload()
+                first = False
+            except Exception as e:
+                logger.error(f"Lỗi nạp danh sách theo dõi: {e}")
+            self._stop.wait(self.poll_interval)
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def lookup(self, plate: str, max_distance: int = 1) -> list[WatchlistMatch]:
+        return self._index.lookup(plate, max_distance)
@@ -0,0 +1,44 @@
+import json
+import logging
+import os
+import re
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+# File cấu hình theo từng luồng video, dạng:
+# {"default": {...}, "streams": {"<đường dẫn/URL nguồn>": {...}}}
+STREAMS_CONFIG_PATH = os.path.join("config", "streams.json")
+
+
+def stream_key(source: str) -> str:
+    """Chuyển đường dẫn/URL nguồn thành tên ngắn gọn dùng cho thư mục, nhãn"""
+    key = re.sub(r"^[a-z]+://", "", source.strip().lower())
+    key = re.sub(r"[^a-z0-9]+", "_", key).strip("_")
+    return key[-64:] or "default"
+
+
+def load_stream_config(source: str, path: str = STREAMS_CONFIG_PATH) -> dict[str, Any]:
+    """
+    Lấy cấu hình của một nguồn, các mục của nguồn ghi đè lên mục "default".
+    Trả về dict rỗng nếu chưa có file cấu hình.
+    """
+    if not os.path.exists(path):
+        return {}
+
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Không đọc được cấu hình luồng {path}: {e}")
+        return {}
+
+    config: dict[str, Any] = dict(data.get("default", {}))
+    streams = data.get("streams", {})
+    override = streams.get(source) or streams.get(stream_key(source)) or {}
+    for section, value in override.items():
+        if isinstance(value, dict) and isinstance(config.get(section), dict):
+            config[section] = {**config[section], **value}
+        else:
+            config[section] = value
+    return config
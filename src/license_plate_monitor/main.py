@@ -1,3 +1,4 @@
+import argparse
 import logging
 import os
 import sys
@@ -7,7 +8,13 @@ from types import TracebackType
 from PyQt6.QtGui import QIcon
 from PyQt6.QtWidgets import QApplication
 
+from license_plate_monitor.perf.metrics import DEFAULT_METRICS_PORT
+from license_plate_monitor.perf.profiler import (
+    DEFAULT_PROFILE_SECONDS,
+    SamplingProfiler,
+)
 from license_plate_monitor.ui.gui_app import MainWindow
+from license_plate_monitor.utils.events import EVENT_FORMATS
 
 
 # Hàm này sẽ bắt mọi lỗi chưa được xử lý và in ra terminal
@@ -24,13 +31,302 @@ def excepthook(
 sys.excepthook = excepthook
 
 
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="license-plate-app", description="License Plate Monitor System"
+    )
+    parser.add_argument(
+        "--metrics-port",
+        type=int,
+        default=DEFAULT_METRICS_PORT,
+        help="Cổng HTTP cục bộ cho /metrics (0 = tắt)",
+    )
+    parser.add_argument(
+        "--profile",
+        type=float,
+        nargs="?",
+        const=DEFAULT_PROFILE_SECONDS,
+        default=0.0,
+        metavar="SECONDS",
+        help="Lấy mẫu hiệu năng mọi luồng trong SECONDS giây kể từ lúc khởi động",
+    )
+    parser.add_argument(
+        "--events",
+        metavar="ADDRESS",
+        help="Phát sự kiện nhận diện qua socket cục bộ"
+        " (vd: unix:/tmp/lpm-events.sock, tcp:127.0.0.1:8765)",
+    )
+    parser.add_argument(
+        "--events-format",
+        choices=EVENT_FORMATS,
+        default="ndjson",
+        help="ndjson: JSON mỗi dòng, binary: khung có độ dài + loại sự kiện",
+    )
+    subparsers = parser.add_subparsers(dest="command")
+
+    cpu_count = os.cpu_count() or 4
+    autotune_parser = subparsers.add_parser(
+        "autotune", help="Dò thông số imgsz/threads/streams tốt nhất cho máy hiện tại"
+    )
+    autotune_parser.add_argument("clip", help="Đường dẫn clip mẫu để chạy lại")
+    autotune_parser.add_argument(
+        "--imgsz", type=int, nargs="+", default=[640, 800, 960, 1280]
+    )
+    autotune_parser.add_argument(
+        "--threads",
+        type=int,
+        nargs="+",
+        default=sorted({max(1, cpu_count // 4), max(1, cpu_count // 2), cpu_count}),
+    )
+    autotune_parser.add_argument("--streams", type=int, nargs="+", default=[1, 2])
+    autotune_parser.add_argument("--model", default=None, help="Đường dẫn mô hình")
+    autotune_parser.add_argument("--conf", type=float, default=0.5)
+    autotune_parser.add_argument("--frames", type=int, default=150)
+    autotune_parser.add_argument("--min-recall", type=float, default=0.95)
+    autotune_parser.add_argument("--output", default=None, help="File profile đầu ra")
+
+    batch_parser = subparsers.add_parser(
+        "batch", help="Xử lý nhanh file video bằng nhiều tiến trình song song"
+    )
+    batch_parser.add_argument("video", help="Đường dẫn file video")
+    batch_parser.add_argument(
+        "--workers", type=int, default=max(1, cpu_count // 2), help="Số tiến trình"
+    )
+    batch_parser.add_argument(
+        "--threads", type=int, default=0, help="Số luồng CPU mỗi worker (0 = chia đều)"
+    )
+    batch_parser.add_argument("--model", default=None, help="Đường dẫn mô hình")
+    batch_parser.add_argument("--conf", type=float, default=0.5)
+    batch_parser.add_argument(
+        "--overlap", type=int, default=45, help="Số frame trùng giữa hai đoạn"
+    )
+    batch_parser.add_argument("--output", default=None, help="Thư mục kết quả")
+
+    bench_parser = subparsers.add_parser(
+        "bench", help="Đo hiệu năng pipeline và so sánh với baseline"
+    )
+    bench_parser.add_argument(
+        "clips", nargs="*", help="Các clip đã ghi (ngoài clip giả lập)"
+    )
+    bench_parser.add_argument("--model", default=None, help="Đường dẫn mô hình")
+    bench_parser.add_argument("--frames", type=int, default=300)
+    bench_parser.add_argument("--warmup", type=int, default=20)
+    bench_parser.add_argument("--width", type=int, default=1280)
+    bench_parser.add_argument("--height", type=int, default=720)
+    bench_parser.add_argument("--conf", type=float, default=0.5)
+    bench_parser.add_argument("--output", default=None, help="File kết quả JSON")
+    bench_parser.add_argument("--baseline", default=None, help="File baseline JSON")
+    bench_parser.add_argument(
+        "--save-baseline", action="store_true", help="Lưu kết quả làm baseline mới"
+    )
+    bench_parser.add_argument(
+        "--tolerance", type=float, default=0.1, help="Mức chậm đi cho phép (0.1 = 10%%)"
+    )
+
+    record_parser = subparsers.add_parser(
+        "record", help="Ghi luồng nén gốc ra đĩa để phát lại bằng nguồn Replay"
+    )
+    record_parser.add_argument("source", help="URL RTSP/HTTP/YouTube cần ghi")
+    record_parser.add_argument(
+        "--duration", type=float, default=600.0, help="Thời gian ghi (giây)"
+    )
+    record_parser.add_argument(
+        "--resolution", default="best", help="Độ phân giải với nguồn YouTube"
+    )
+    record_parser.add_argument("--output", default=None, help="Thư mục bản ghi")
+
+    quantize_parser = subparsers.add_parser(
+        "quantize", help="Hiệu chỉnh INT8 mô hình trên cảnh quay của mình"
+    )
+    quantize_parser.add_argument("weights", help="Mô hình FP32 gốc (.pt)")
+    quantize_parser.add_argument(
+        "sources", nargs="*", help="Bản ghi (.json) hoặc file video để lấy frame"
+    )
+    quantize_parser.add_argument(
+        "--data", default=None, help="Dataset có nhãn (data.yaml) thay cho sources"
+    )
+    quantize_parser.add_argument(
+        "--imgsz", type=int, default=None, help="Mặc định theo runtime profile"
+    )
+    quantize_parser.add_argument("--frames", type=int, default=600)
+    quantize_parser.add_argument(
+        "--interval", type=float, default=2.0, help="Khoảng cách tối thiểu (giây)"
+    )
+    quantize_parser.add_argument(
+        "--label-conf", type=float, default=0.25, help="Ngưỡng khi tự gán nhãn"
+    )
+    quantize_parser.add_argument(
+        "--max-map-drop", type=float, default=0.02, help="mAP50-95 được phép giảm"
+    )
+    quantize_parser.add_argument(
+        "--no-register", action="store_true", help="Không đổi mô hình của detector"
+    )
+    quantize_parser.add_argument("--output", default=None, help="Thư mục kết quả")
+
+    monitor_parser = subparsers.add_parser(
+        "monitor", help="Theo dõi nhiều nguồn cùng lúc, không cần giao diện"
+    )
+    monitor_parser.add_argument(
+        "sources",
+        nargs="+",
+        help="File video, bản ghi (.json), URL RTSP/YouTube hoặc số webcam",
+    )
+    monitor_parser.add_argument("--conf", type=float, default=0.5)
+    monitor_parser.add_argument("--ocr", action="store_true", help="Đọc biển số")
+    monitor_parser.add_argument(
+        "--no-save", action="store_true", help="Không lưu ảnh xe ra detections/"
+    )
+    monitor_parser.add_argument(
+        "--duration",
+        type=float,
+        default=0.0,
+        help="Thời gian chạy (giây), 0 = tới khi nhấn Ctrl+C",
+    )
+
+    return parser
+
+
+def run_autotune(args: argparse.Namespace) -> None:
+    # Import muộn để lệnh GUI không phải nạp thêm module không cần thiết
+    from license_plate_monitor.ai.autotune import autotune
+    from license_plate_monitor.ai.runtime import DEFAULT_PROFILE_PATH
+
+    autotune(
+        args.clip,
+        imgsz_grid=args.imgsz,
+        thread_grid=args.threads,
+        stream_grid=args.streams,
+        output_path=args.output or DEFAULT_PROFILE_PATH,
+        model_name=args.model,
+        conf_threshold=args.conf,
+        max_frames=args.frames,
+        min_recall=args.min_recall,
+    )
+
+
+def run_batch(args: argparse.Namespace) -> None:
+    from license_plate_monitor.ai.batch import batch_process
+
+    batch_process(
+        args.video,
+        workers=args.workers,
+        threads=args.threads,
+        model_name=args.model,
+        conf_threshold=args.conf,
+        overlap=args.overlap,
+        output_dir=args.output,
+    )
+
+
+def run_bench(args: argparse.Namespace) -> None:
+    from license_plate_monitor.perf.bench import (
+        DEFAULT_BASELINE_PATH,
+        DEFAULT_RESULTS_PATH,
+        run_benchmarks,
+    )
+
+    regressions = run_benchmarks(
+        args.clips,
+        model_name=args.model,
+        frames=args.frames,
+        warmup=args.warmup,
+        width=args.width,
+        height=args.height,
+        conf_threshold=args.conf,
+        output_path=args.output or DEFAULT_RESULTS_PATH,
+        baseline_path=args.baseline or DEFAULT_BASELINE_PATH,
+        save_baseline=args.save_baseline,
+        tolerance=args.tolerance,
+    )
+    # Mã thoát khác 0 để CI đánh dấu lần chạy bị chậm đi
+    if regressions:
+        sys.exit(1)
+
+
 def main() -> None:
     logging.basicConfig(
         level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s"
     )
 
+    args = build_parser().parse_args()
+    profiler = None
+    if args.profile > 0:
+        profiler = SamplingProfiler(duration=args.profile)
+        profiler.start()
+    try:
+        run_command(args)
+    finally:
+        # Lệnh kết thúc trước hạn thì vẫn ghi lại những mẫu đã lấy được
+        if profiler is not None:
+            profiler.stop()
+            profiler.join()
+
+
+def run_record(args: argparse.Namespace) -> None:
+    from license_plate_monitor.utils.recording import RECORDINGS_DIR, StreamRecorder
+
+    recorder = StreamRecorder(
+        args.source,
+        output_dir=args.output or RECORDINGS_DIR,
+        resolution=args.resolution,
+    )
+    recorder.run(args.duration)
+
+
+def run_quantize(args: argparse.Namespace) -> None:
+    from license_plate_monitor.ai.quantize import quantize_model
+
+    quantize_model(
+        args.weights,
+        args.sources,
+        data=args.data,
+        imgsz=args.imgsz,
+        output_dir=args.output,
+        max_frames=args.frames,
+        interval=args.interval,
+        label_conf=args.label_conf,
+        max_map_drop=args.max_map_drop,
+        register=not args.no_register,
+    )
+
+
+def run_monitor(args: argparse.Namespace) -> None:
+    from license_plate_monitor.ui.monitor import monitor_streams
+
+    monitor_streams(
+        args.sources,
+        conf_threshold=args.conf,
+        auto_save=not args.no_save,
+        ocr_enabled=args.ocr,
+        duration=args.duration,
+        metrics_port=args.metrics_port,
+        events_address=args.events,
+        events_format=args.events_format,
+    )
+
+
+def run_command(args: argparse.Namespace) -> None:
+    if args.command == "autotune":
+        run_autotune(args)
+        return
+    if args.command == "batch":
+        run_batch(args)
+        return
+    if args.command == "bench":
+        run_bench(args)
+        return
+    if args.command == "record":
+        run_record(args)
+        return
+    if args.command == "quantize":
+        run_quantize(args)
+        return
+    if args.command == "monitor":
+        run_monitor(args)
+        return
+
     # Khởi tạo ứng dụng PyQt6
-    app = QApplication(sys.argv)
+    app = QApplication(sys.argv[:1])
 
     current_dir = os.path.dirname(os.path.abspath(__file__))
     icon_path = os.path.join(current_dir, "ui", "assets", "icons", "app-icon.png")
@@ -38,7 +334,11 @@ def main() -> None:
     app.setWindowIcon(QIcon(icon_path))
 
     # Khởi tạo cửa sổ chính
-    window = MainWindow()
+    window = MainWindow(
+        metrics_port=args.metrics_port,
+        events_address=args.events,
+        events_format=args.events_format,
+    )
     window.show()
 
     # Chạy vòng lặp sự kiện của ứng dụng
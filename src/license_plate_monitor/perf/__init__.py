@@ -0,0 +1,13 @@
+from .bench import BenchResult, StageTimer, run_benchmarks, synthetic_clip
+from .metrics import MetricsRegistry, MetricsServer
+from .profiler import SamplingProfiler
+
+__all__ = [
+    "BenchResult",
+    "MetricsRegistry",
+    "MetricsServer",
+    "SamplingProfiler",
+    "StageTimer",
+    "run_benchmarks",
+    "synthetic_clip",
+]
@@ -0,0 +1,456 @@
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from functools import partial
+from importlib import metadata
+from typing import Any
+
+import cv2
+import numpy as np
+import numpy.typing as npt
+
+from license_plate_monitor.ai.autotune import load_clip
+from license_plate_monitor.ai.detector import LicensePlateDetector
+from license_plate_monitor.utils.recording import (
+    RECORDING_SUFFIX,
+    ReplayCapture,
+    load_recording,
+)
+
+DEFAULT_RESULTS_PATH = os.path.join("benchmarks", "latest.json")
+DEFAULT_BASELINE_PATH = os.path.join("benchmarks", "baseline.json")
+# Chênh lệch p95 nhỏ hơn mức này (ms) không tính là chậm đi
+MIN_DELTA_MS = 0.5
+
+
+def synthetic_clip(
+    frames: int,
+    width: int = 1280,
+    height: int = 720,
+    vehicles: int = 12,
+    seed: int = 0,
+) -> list[npt.NDArray[np.uint8]]:
+    """
+    Clip giả lập cố định theo 'seed': nền đường có nhiễu nhẹ và các khối
+    màu chạy ngang qua khung hình với vận tốc khác nhau.
+    """
+    rng = np.random.default_rng(seed)
+    background = np.full((height, width, 3), 90, dtype=np.uint8)
+    background += rng.integers(0, 20, size=background.shape, dtype=np.uint8)
+    for lane in range(1, 4):
+        y = lane * height // 4
+        cv2.line(background, (0, y), (width, y), (220, 220, 220), 3)
+
+    sizes = rng.integers(80, 220, size=(vehicles, 2))
+    lanes = rng.integers(0, 4, size=vehicles)
+    speeds = rng.uniform(4, 14, size=vehicles)
+    offsets = rng.uniform(0, width * 2, size=vehicles)
+    colors = rng.integers(0, 255, size=(vehicles, 3))
+
+    clip: list[npt.NDArray[np.uint8]] = []
+    for f in range(frames):
+        frame = background.copy()
+        for v in range(vehicles):
+            w, h = int(sizes[v, 0]), int(sizes[v, 1]) // 2
+            x = int((offsets[v] + speeds[v] * f) % (width + w)) - w
+            y = int(lanes[v] * height // 4 + height // 8 - h // 2)
+            color = tuple(int(c) for c in colors[v])
+            cv2.rectangle(frame, (x, y), (x + w, y + h), color, -1)
+            cv2.rectangle(frame, (x + w // 4, y + h // 4), (x + w // 2, y + h), 0, -1)
+        clip.append(frame)
+    return clip
+
+
+def write_clip(frames: list[npt.NDArray[np.uint8]], path: str, fps: float) -> None:
+    h, w = frames[0].shape[:2]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter.fourcc(*"mp4v"), fps, (w, h))
+    try:
+        for frame in frames:
+            writer.write(frame)
+    finally:
+        writer.release()
+
+
+def peak_memory_mb() -> float:
+    """Mức RAM cao nhất (RSS) của tiến trình từ lúc khởi động, đơn vị MB"""
+    try:
+        import resource
+    except ImportError:
+        return _peak_memory_windows()
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux trả về KB, macOS trả về byte
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _peak_memory_windows() -> float:
+    import ctypes
+    from ctypes import wintypes
+
+    class Counters(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = Counters()
+    counters.cb = ctypes.sizeof(Counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()  # type: ignore[attr-defined]
+    ctypes.windll.psapi.GetProcessMemoryInfo(  # type: ignore[attr-defined]
+        process, ctypes.byref(counters), counters.cb
+    )
+    return float(counters.PeakWorkingSetSize) / (1024 * 1024)
+
+
+class StageTimer:
+    """Đo thời gian từng bước bằng cách bọc phương thức của đối tượng đang chạy"""
+
+    def __init__(self) -> None:
+        self.samples: defaultdict[str, list[float]] = defaultdict(list)
+        self._wrapped: list[tuple[Any, str]] = []
+
+    def wrap(self, obj: Any, name: str, stage: str) -> None:
+        func = getattr(obj, name)
+        samples = self.samples[stage]
+        self._wrapped.append((obj, name))
+
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+
+        setattr(obj, name, timed)
+
+    def unwrap(self) -> None:
+        """Trả lại phương thức gốc (của lớp) cho các đối tượng đã bọc"""
+        for obj, name in reversed(self._wrapped):
+            obj.__dict__.pop(name, None)
+        self._wrapped.clear()
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.samples[stage].append(seconds)
+
+    def reset(self) -> None:
+        """Bỏ các mẫu của giai đoạn khởi động"""
+        for samples in self.samples.values():
+            samples.clear()
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Phân vị độ trễ (ms) của từng bước"""
+        stats: dict[str, dict[str, float]] = {}
+        for stage, samples in self.samples.items():
+            if not samples:
+                continue
+            ms = np.asarray(samples) * 1000
+            p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+            stats[stage] = {
+                "count": len(samples),
+                "mean": round(float(ms.mean()), 3),
+                "p50": round(float(p50), 3),
+                "p95": round(float(p95), 3),
+                "p99": round(float(p99), 3),
+            }
+        return stats
+
+
+class TimedCapture:
+    """Bọc cv2.VideoCapture để đo thời gian giải mã mỗi frame"""
+
+    def __init__(self, cap: cv2.VideoCapture | ReplayCapture, timer: StageTimer):
+        self._cap = cap
+        self._timer = timer
+
+    def read(self) -> tuple[bool, Any]:
+        start = time.perf_counter()
+        result = self._cap.read()
+        self._timer.record("decode", time.perf_counter() - start)
+        return result
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._cap, name)
+
+
+@dataclass
+class BenchResult:
+    name: str
+    frames: int
+    fps: float
+    # Số xe đã kết thúc track và số box được track qua mọi frame
+    detections: int
+    boxes: int
+    # Đỉnh RSS của cả tiến trình tới lúc đo xong, không phải riêng benchmark này
+    # (ru_maxrss không bao giờ giảm, các mục sau kế thừa đỉnh của mục trước)
+    process_peak_rss_mb: float
+    stages: dict[str, dict[str, float]] = field(default_factory=dict)
+
+
+def bench_detector(
+    name: str,
+    detector: LicensePlateDetector,
+    frames: list[npt.NDArray[Any]],
+    warmup: int,
+    conf_threshold: float = 0.5,
+) -> BenchResult:
+    """Chạy process_frame trên các frame đã nạp sẵn (không tính giải mã)"""
+    detector.reset_tracker()
+    detector.reset_tracks()
+    timer = StageTimer()
+    timer.wrap(detector, "_track", "track")
+    timer.wrap(detector.tracks, "update", "registry")
+
+    detections = boxes = 0
+    for frame in frames[:warmup]:
+        detector.process_frame(frame, conf_threshold, True, True)
+    timer.reset()
+
+    start = time.perf_counter()
+    for frame in frames[warmup:]:
+        t0 = time.perf_counter()
+        _, finished = detector.process_frame(frame, conf_threshold, True, True)
+        timer.record("frame", time.perf_counter() - t0)
+        detections += len(finished)
+        boxes += len(detector.last_tracks)
+    elapsed = time.perf_counter() - start
+    detections += len(detector.tracks.flush())
+    timer.unwrap()
+
+    count = len(frames) - warmup
+    return BenchResult(
+        name=name,
+        frames=count,
+        fps=round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        detections=detections,
+        boxes=boxes,
+        process_peak_rss_mb=round(peak_memory_mb(), 1),
+        stages=timer.summary(),
+    )
+
+
+def bench_pipeline(
+    name: str,
+    detector: LicensePlateDetector,
+    clip_path: str,
+    frames: int,
+    warmup: int,
+    conf_threshold: float = 0.5,
+) -> BenchResult:
+    """
+    Chạy nguyên vòng lặp của VideoThread (giải mã, nhận diện, đếm, quỹ đạo,
+    phát kết quả, chuyển QImage) ngay trên luồng hiện tại với file video.
+    """
+    from license_plate_monitor.ui.threads import VideoThread
+
+    thread = VideoThread(
+        clip_path,
+        "Local File",
+        "",
+        detector=detector,
+        conf_threshold=conf_threshold,
+    )
+    detector.reset_tracker()
+    timer = StageTimer()
+    timer.wrap(thread.trajectories, "update", "trajectory")
+    timer.wrap(thread, "_handle_detections", "publish")
+    if thread.counter is not None:
+        timer.wrap(thread.counter, "update", "counting")
+
+    setup_capture = thread._setup_capture
+
+    def setup_timed_capture() -> Any:
+        # Registry được tạo lại trong _initialize_detector, bọc sau bước đó
+        timer.wrap(detector, "_track", "track")
+        timer.wrap(detector.tracks, "update", "registry")
+        return TimedCapture(setup_capture(), timer)
+
+    thread._setup_capture = setup_timed_capture  # type: ignore[method-assign]
+
+    state = {"frames": 0, "detections": 0, "boxes": 0, "start": 0.0, "last": 0.0}
+
+    def on_frame(_: Any) -> None:
+        now = time.perf_counter()
+        state["frames"] += 1
+        if state["frames"] == warmup:
+            timer.reset()
+            state["start"] = now
+            state["detections"] = state["boxes"] = 0
+        elif state["frames"] > warmup:
+            timer.record("frame", now - state["last"])
+            state["boxes"] += len(detector.last_tracks)
+        state["last"] = now
+        if state["frames"] >= warmup + frames:
+            thread.stop()
+
+    def on_detection(_: Any) -> None:
+        state["detections"] += 1
+
+    thread.change_pixmap_signal.connect(on_frame)
+    thread.new_detection_signal.connect(on_detection)
+    thread.run()
+    timer.unwrap()
+
+    count = int(state["frames"]) - warmup
+    elapsed = state["last"] - state["start"]
+    return BenchResult(
+        name=name,
+        frames=count,
+        fps=round(count / elapsed, 2) if elapsed > 0 else 0.0,
+        detections=int(state["detections"]),
+        boxes=int(state["boxes"]),
+        process_peak_rss_mb=round(peak_memory_mb(), 1),
+        stages=timer.summary(),
+    )
+
+
+def environment() -> dict[str, str]:
+    """Phiên bản các thư viện ảnh hưởng tới hiệu năng"""
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "cpu_count": str(os.cpu_count()),
+        "opencv": cv2.__version__,
+    }
+    for package in ("ultralytics", "torch", "openvino", "numpy"):
+        try:
+            info[package] = metadata.version(package)
+        except metadata.PackageNotFoundError:
+            continue
+    return info
+
+
+def compare(
+    current: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """
+    In bảng so sánh với baseline, trả về danh sách các mục bị chậm đi quá
+    'tolerance' (FPS giảm hoặc p95 của một bước tăng).
+    """
+    regressions: list[str] = []
+    previous = {r["name"]: r for r in baseline.get("results", [])}
+    for result in current["results"]:
+        base = previous.get(result["name"])
+        if base is None:
+            print(f"    {result['name']}: chưa có trong baseline")
+            continue
+        change = result["fps"] / base["fps"] - 1 if base["fps"] else 0.0
+        print(
+            f"    {result['name']}: {base['fps']:.1f} -> {result['fps']:.1f} FPS "
+            f"({change:+.1%})"
+        )
+        if change < -tolerance:
+            regressions.append(f"{result['name']}: FPS {change:+.1%}")
+        for stage, stats in result["stages"].items():
+            base_stats = base["stages"].get(stage)
+            if not base_stats or not base_stats["p95"]:
+                continue
+            stage_change = stats["p95"] / base_stats["p95"] - 1
+            # Bỏ qua dao động của các bước chỉ tốn vài phần trăm mili giây
+            delta_ms = stats["p95"] - base_stats["p95"]
+            if stage_change > tolerance and delta_ms > MIN_DELTA_MS:
+                regressions.append(
+                    f"{result['name']}/{stage}: p95 {base_stats['p95']:.2f} -> "
+                    f"{stats['p95']:.2f} ms ({stage_change:+.1%})"
+                )
+    return regressions
+
+
+def run_benchmarks(
+    clips: list[str],
+    model_name: str | None = None,
+    frames: int = 300,
+    warmup: int = 20,
+    width: int = 1280,
+    height: int = 720,
+    conf_threshold: float = 0.5,
+    output_path: str = DEFAULT_RESULTS_PATH,
+    baseline_path: str = DEFAULT_BASELINE_PATH,
+    save_baseline: bool = False,
+    tolerance: float = 0.1,
+) -> list[str]:
+    """
+    Chạy bộ benchmark trên clip giả lập và các clip đã ghi: process_frame
+    riêng và cả vòng lặp VideoThread. Trả về danh sách các mục bị chậm đi.
+    """
+    detector = (
+        LicensePlateDetector(model_name) if model_name else LicensePlateDetector()
+    )
+    sources: list[tuple[str, Callable[[], list[npt.NDArray[Any]]]]] = [
+        (
+            "synthetic",
+            lambda: synthetic_clip(frames + warmup, width, height),
+        )
+    ]
+    for clip in clips:
+        name = os.path.splitext(os.path.basename(clip))[0]
+        # Bản ghi luồng (.json) được giải mã qua nguồn phát lại, bỏ qua mất kết nối
+        reader = load_recording if clip.endswith(RECORDING_SUFFIX) else load_clip
+        sources.append((name, partial(reader, clip, frames + warmup)))
+
+    results: list[BenchResult] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, load_frames in sources:
+            clip_frames = load_frames()
+            if len(clip_frames) <= warmup:
+                raise ValueError(f"Clip {name} ngắn hơn số frame khởi động ({warmup})")
+            print(f"[*] {name}: {len(clip_frames)} frame")
+            results.append(
+                bench_detector(
+                    f"{name}/detector", detector, clip_frames, warmup, conf_threshold
+                )
+            )
+            # Ghi lại thành file để VideoThread đọc như nguồn "Local File"
+            path = os.path.join(tmp, f"{name}.mp4")
+            write_clip(clip_frames, path, 25.0)
+            count = len(clip_frames) - warmup
+            del clip_frames
+            results.append(
+                bench_pipeline(
+                    f"{name}/pipeline", detector, path, count, warmup, conf_threshold
+                )
+            )
+            for result in results[-2:]:
+                frame_p95 = result.stages.get("frame", {}).get("p95", 0.0)
+                print(
+                    f"    {result.name}: {result.fps:.1f} FPS, p95 {frame_p95:.1f} ms, "
+                    f"{result.detections} xe, "
+                    f"RAM đỉnh tiến trình {result.process_peak_rss_mb:.0f} MB"
+                )
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "model": detector.model_name,
+        "profile": str(detector.profile),
+        "environment": environment(),
+        "results": [asdict(r) for r in results],
+    }
+    for path in [output_path] + ([baseline_path] if save_baseline else []):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"[+] Đã lưu kết quả vào {path}")
+
+    if save_baseline or not os.path.exists(baseline_path):
+        return []
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    print(f"[*] So sánh với baseline {baseline_path} ({baseline.get('created_at')})")
+    regressions = compare(report, baseline, tolerance)
+    for regression in regressions:
+        print(f"[!] Chậm hơn baseline: {regression}")
+    return regressions
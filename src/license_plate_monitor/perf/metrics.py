@@ -0,0 +1,256 @@
+import bisect
+import logging
+import threading
+import time
+from collections.abc import Callable
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METRICS_PORT = 9464
+
+# Ngưỡng bucket (giây), dày ở vùng vài mili giây nơi phần lớn các bước rơi vào
+LATENCY_BUCKETS: tuple[float, ...] = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# Thứ tự các bước của vòng lặp video, cũng là thứ tự hiển thị
+STAGES = (
+    "capture",
+    "wait",
+    "inference",
+    "postprocess",
+    "annotate",
+    "convert",
+    "emit",
+    "disk",
+    "frame",
+)
+# Độ trễ đầu-cuối tính từ lúc nhận frame: tới khi hiện lên màn hình
+# ("display") và tới khi kết quả nhận diện được phát ra ("detection")
+LATENCIES = ("display", "detection")
+STAGE_SHORT_NAMES = {
+    "capture": "cap",
+    "wait": "wait",
+    "inference": "inf",
+    "postprocess": "post",
+    "annotate": "ann",
+    "convert": "rgb",
+    "emit": "ui",
+    "disk": "disk",
+    "frame": "frame",
+    "display": "g2g",
+    "detection": "det",
+}
+
+
+class LatencyHistogram:
+    """Histogram bucket cố định kiểu Prometheus, ghi một mẫu chỉ tốn một bisect"""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        # Số mẫu của từng bucket (không cộng dồn), ô cuối là +Inf
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += seconds
+            self.count += 1
+
+    def snapshot(self) -> tuple[list[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+
+class StreamMetrics:
+    """Các histogram theo bước của một luồng video"""
+
+    def __init__(self, stream: str):
+        self.stream = stream
+        self.histograms = {stage: LatencyHistogram() for stage in (*STAGES, *LATENCIES)}
+        # Số kết quả nhận diện có độ trễ vượt ngân sách của luồng
+        self.over_budget = 0
+
+    def observe(self, stage: str, seconds: float) -> None:
+        self.histograms[stage].observe(seconds)
+
+    def lap(self, stage: str, start: float) -> float:
+        """Ghi thời gian từ 'start' tới hiện tại, trả về thời điểm hiện tại"""
+        now = time.perf_counter()
+        self.histograms[stage].observe(now - start)
+        return now
+
+
+class MetricsRegistry:
+    """Tập metrics của mọi luồng, dùng chung giữa luồng video, giao diện và HTTP"""
+
+    def __init__(self) -> None:
+        self._streams: dict[str, StreamMetrics] = {}
+        self._lock = threading.Lock()
+        # Tổng (sum, count) ở lần đọc trước, để tính trung bình gần đây
+        self._previous: dict[tuple[str, str], tuple[float, int]] = {}
+        # Các nguồn metrics khác (vd: bộ lập lịch suy luận), mỗi hàm trả về
+        # các dòng văn bản Prometheus đã định dạng sẵn
+        self.collectors: list[Callable[[], list[str]]] = []
+
+    def stream(self, name: str) -> StreamMetrics:
+        with self._lock:
+            metrics = self._streams.get(name)
+            if metrics is None:
+                metrics = StreamMetrics(name)
+                self._streams[name] = metrics
+            return metrics
+
+    def streams(self) -> list[StreamMetrics]:
+        with self._lock:
+            return list(self._streams.values())
+
+    def recent_means(self, stream: str) -> dict[str, float]:
+        """Thời gian trung bình (ms) mỗi bước kể từ lần gọi trước"""
+        means: dict[str, float] = {}
+        for stage, histogram in self.stream(stream).histograms.items():
+            _, total, count = histogram.snapshot()
+            prev_total, prev_count = self._previous.get((stream, stage), (0.0, 0))
+            self._previous[(stream, stage)] = (total, count)
+            if count > prev_count:
+                means[stage] = (total - prev_total) / (count - prev_count) * 1000
+        return means
+
+    def render(self) -> str:
+        """Xuất toàn bộ histogram theo định dạng văn bản của Prometheus"""
+        streams = self.streams()
+        lines = [
+            "# HELP lpm_stage_seconds Time spent in each video pipeline stage.",
+            "# TYPE lpm_stage_seconds histogram",
+        ]
+        for metrics in streams:
+            for stage in STAGES:
+                _render_histogram(lines, "lpm_stage_seconds", metrics, "stage", stage)
+        lines += [
+            "# HELP lpm_latency_seconds Time from frame capture to display "
+            "or to a published detection.",
+            "# TYPE lpm_latency_seconds histogram",
+        ]
+        for metrics in streams:
+            for path in LATENCIES:
+                _render_histogram(lines, "lpm_latency_seconds", metrics, "path", path)
+        lines += [
+            "# HELP lpm_detections_over_budget_total Detections published later "
+            "than the stream latency budget.",
+            "# TYPE lpm_detections_over_budget_total counter",
+        ]
+        for metrics in streams:
+            stream = _escape_label(metrics.stream)
+            lines.append(
+                f'lpm_detections_over_budget_total{{stream="{stream}"}} '
+                f"{metrics.over_budget}"
+            )
+        for collect in self.collectors:
+            lines += collect()
+        return "\n".join(lines) + "\n"
+
+
+def _render_histogram(
+    lines: list[str], name: str, metrics: StreamMetrics, key: str, value: str
+) -> None:
+    histogram = metrics.histograms[value]
+    counts, total, count = histogram.snapshot()
+    if count == 0:
+        return
+    labels = f'stream="{_escape_label(metrics.stream)}",{key}="{value}"'
+    cumulative = 0
+    for bound, n in zip(histogram.buckets, counts):
+        cumulative += n
+        lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{{labels},le="+Inf"}} {count}')
+    lines.append(f"{name}_sum{{{labels}}} {total:.6f}")
+    lines.append(f"{name}_count{{{labels}}} {count}")
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_overlay(means: dict[str, float]) -> str:
+    """Chuỗi ngắn gọn cho thanh trạng thái: "cap 2.1 | inf 41.0 | ... ms" """
+    parts = [
+        f"{STAGE_SHORT_NAMES[stage]} {means[stage]:.1f}"
+        for stage in (*STAGES, *LATENCIES)
+        if stage in means
+    ]
+    return " | ".join(parts) + " ms" if parts else ""
+
+
+class MetricsServer:
+    """HTTP endpoint /metrics chỉ lắng nghe trên máy cục bộ, chạy ở luồng nền"""
+
+    def __init__(
+        self,
+        registry: MetricsRegistry,
+        port: int = DEFAULT_METRICS_PORT,
+        host: str = "127.0.0.1",
+    ):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> bool:
+        """Mở cổng, trả về False (và chỉ ghi log) nếu cổng đã bị chiếm"""
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: Any) -> None:
+                return
+
+        try:
+            self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        except OSError as e:
+            logger.warning(f"Không mở được cổng metrics {self.port}: {e}")
+            return False
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(
+            target=self._server.serve_forever, name="metrics-http", daemon=True
+        )
+        self._thread.start()
+        print(f"[*] Metrics: http://{self.host}:{self.port}/metrics")
+        return True
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
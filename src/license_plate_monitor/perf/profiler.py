@@ -0,0 +1,204 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import CodeType, FrameType
+
+PROFILES_DIR = "profiles"
+DEFAULT_PROFILE_SECONDS = 30.0
+# Chỉ tóm tắt các hàm của những gói này (phần còn lại vẫn có trong file stack)
+SUMMARY_PACKAGES = ("license_plate_monitor.ai", "license_plate_monitor.ui")
+# Khung sâu nhất của một luồng đang chờ khóa, hàng đợi, sự kiện hoặc I/O
+WAIT_FRAMES = frozenset(
+    {
+        "threading:Condition.wait",
+        "threading:Condition.wait_for",
+        "threading:Event.wait",
+        "threading:Semaphore.acquire",
+        "threading:Barrier.wait",
+        "threading:Thread.join",
+        "threading:Thread._wait_for_tstate_lock",
+        "selectors:SelectSelector.select",
+        "selectors:_PollLikeSelector.select",
+        "selectors:EpollSelector.select",
+        "selectors:KqueueSelector.select",
+    }
+)
+# Luồng dùng ít CPU hơn tỉ lệ này giữa hai lần lấy mẫu coi như đang chờ
+MIN_CPU_SHARE = 0.05
+
+
+def thread_cpu_time(thread_id: int) -> float | None:
+    """Thời gian CPU (giây) của một luồng, None nếu hệ điều hành không hỗ trợ"""
+    if sys.platform == "linux":
+        try:
+            return time.clock_gettime(time.pthread_getcpuclockid(thread_id))
+        except OSError:
+            return None
+    return None
+
+
+@dataclass
+class FunctionStats:
+    name: str
+    # Số mẫu hàm là khung sâu nhất thuộc dự án (gồm thời gian thư viện nó gọi)
+    own: int = 0
+    # Số mẫu hàm nằm đâu đó trên stack
+    total: int = 0
+
+
+@dataclass
+class ProfileReport:
+    folded_path: str
+    summary_path: str
+    samples: int
+    duration: float
+    hottest: list[FunctionStats] = field(default_factory=list)
+
+
+class SamplingProfiler:
+    """
+    Profiler thống kê: cứ 'interval' giây chụp stack của mọi luồng Python
+    (kể cả QThread) qua sys._current_frames(). Không cài hook nào vào
+    trình thông dịch, nên khi không chạy thì không tốn gì. Luồng đang chờ
+    (khung sâu nhất là hàm chờ, hoặc gần như không dùng CPU từ lần lấy mẫu
+    trước) không được tính, để worker rảnh không lấn át hàm thực sự nóng.
+    """
+
+    def __init__(
+        self,
+        duration: float = DEFAULT_PROFILE_SECONDS,
+        interval: float = 0.005,
+        output_dir: str = PROFILES_DIR,
+        packages: tuple[str, ...] = SUMMARY_PACKAGES,
+    ):
+        self.duration = duration
+        self.interval = interval
+        self.output_dir = output_dir
+        self.packages = packages
+        self.samples: Counter[tuple[str, ...]] = Counter()
+        # Số mẫu bị bỏ vì luồng đang chờ
+        self.idle = 0
+        self._cpu: dict[int, float] = {}
+        self._labels: dict[CodeType, str] = {}
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def _label(self, frame: FrameType) -> str:
+        code = frame.f_code
+        label = self._labels.get(code)
+        if label is None:
+            module = frame.f_globals.get("__name__", "?")
+            label = f"{module}:{code.co_qualname}"
+            self._labels[code] = label
+        return label
+
+    def _sample(self, own_id: int, names: dict[int, str], elapsed: float) -> None:
+        previous, self._cpu = self._cpu, {}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            waiting = self._label(frame) in WAIT_FRAMES
+            cpu = thread_cpu_time(thread_id)
+            if cpu is not None:
+                self._cpu[thread_id] = cpu
+                last = previous.get(thread_id)
+                if last is not None and elapsed > 0:
+                    waiting = waiting or cpu - last < MIN_CPU_SHARE * elapsed
+            if waiting:
+                self.idle += 1
+                continue
+            stack: list[str] = []
+            current: FrameType | None = frame
+            while current is not None:
+                stack.append(self._label(current))
+                current = current.f_back
+            stack.append(names.get(thread_id, f"thread-{thread_id}"))
+            stack.reverse()
+            self.samples[tuple(stack)] += 1
+
+    def run(self) -> ProfileReport:
+        """Lấy mẫu tới hết 'duration' hoặc tới khi stop(), rồi ghi kết quả"""
+        own_id = threading.get_ident()
+        started = time.perf_counter()
+        deadline = started + self.duration
+        names: dict[int, str] = {}
+        next_refresh = 0.0
+        last_sample = 0.0
+        while not self._stop.is_set():
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if now >= next_refresh:
+                # Tên luồng đổi ít, cập nhật mỗi giây là đủ
+                names = {
+                    t.ident: t.name.replace(" ", "_")
+                    for t in threading.enumerate()
+                    if t.ident is not None
+                }
+                next_refresh = now + 1.0
+            self._sample(own_id, names, now - last_sample if last_sample else 0.0)
+            last_sample = now
+            self._stop.wait(self.interval)
+        return self._write(time.perf_counter() - started)
+
+    def start(self) -> threading.Thread:
+        """Chạy run() trên luồng nền"""
+        self._thread = threading.Thread(target=self.run, name="profiler", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def join(self, timeout: float | None = None) -> None:
+        """Chờ luồng nền ghi xong kết quả"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def hottest(self, limit: int = 25) -> list[FunctionStats]:
+        """Các hàm thuộc 'packages' chiếm nhiều mẫu nhất"""
+        stats: dict[str, FunctionStats] = {}
+        for stack, count in self.samples.items():
+            ours = [label for label in stack[1:] if label.startswith(self.packages)]
+            if not ours:
+                continue
+            for label in set(ours):
+                entry = stats.setdefault(label, FunctionStats(label))
+                entry.total += count
+            stats[ours[-1]].own += count
+        ranked = sorted(stats.values(), key=lambda s: (s.own, s.total), reverse=True)
+        return ranked[:limit]
+
+    def _write(self, duration: float) -> ProfileReport:
+        os.makedirs(self.output_dir, exist_ok=True)
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        base = os.path.join(self.output_dir, f"profile_{stamp}")
+
+        # Định dạng "collapsed stack" dùng được với flamegraph.pl/speedscope
+        folded_path = f"{base}.folded"
+        with open(folded_path, "w", encoding="utf-8") as f:
+            for stack, count in self.samples.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+        total = sum(self.samples.values())
+        hottest = self.hottest()
+        summary_path = f"{base}.txt"
+        with open(summary_path, "w", encoding="utf-8") as f:
+            f.write(
+                f"{total} mẫu trong {duration:.1f}s "
+                f"(bỏ {self.idle} mẫu luồng đang chờ)\n"
+            )
+            f.write(f"{'own':>7} {'total':>7}  hàm\n")
+            for entry in hottest:
+                own = entry.own / total if total else 0.0
+                inclusive = entry.total / total if total else 0.0
+                f.write(f"{own:7.1%} {inclusive:7.1%}  {entry.name}\n")
+
+        print(f"[+] Profile: {total} mẫu trong {duration:.1f}s -> {folded_path}")
+        for entry in hottest[:5]:
+            print(f"    {entry.own:6d} {entry.total:6d}  {entry.name}")
+        return ProfileReport(folded_path, summary_path, total, duration, hottest)
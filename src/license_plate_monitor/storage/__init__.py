@@ -0,0 +1,13 @@
+from .archive import ArchiveRecord, DetectionArchive, SearchQuery
+from .clips import ClipConfig, ClipRecorder
+from .retention import RetentionConfig, RetentionManager
+
+__all__ = [
+    "ArchiveRecord",
+    "ClipConfig",
+    "ClipRecorder",
+    "DetectionArchive",
+    "RetentionConfig",
+    "RetentionManager",
+    "SearchQuery",
+]
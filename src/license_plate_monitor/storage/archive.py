@@ -0,0 +1,252 @@
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Any
+
+from license_plate_monitor.analytics.watchlist import plate_key
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ARCHIVE_PATH = os.path.join("detections", "archive.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS detections (
+    id INTEGER PRIMARY KEY,
+    ts REAL NOT NULL,
+    stream TEXT NOT NULL,
+    track_id INTEGER,
+    label TEXT,
+    conf REAL,
+    plate TEXT,
+    plate_key TEXT,
+    plate_conf REAL,
+    path TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_detections_ts ON detections (ts);
+CREATE INDEX IF NOT EXISTS idx_detections_stream_ts ON detections (stream, ts);
+CREATE INDEX IF NOT EXISTS idx_detections_path ON detections (path);
+CREATE TABLE IF NOT EXISTS plate_grams (
+    gram TEXT NOT NULL,
+    det_id INTEGER NOT NULL,
+    PRIMARY KEY (gram, det_id)
+) WITHOUT ROWID;
+"""
+
+
+def trigrams(key: str) -> set[str]:
+    return {key[i : i + 3] for i in range(len(key) - 2)}
+
+
+def pattern_to_glob(pattern: str) -> tuple[str, set[str]]:
+    """
+    Chuyển mẫu tìm kiếm (vd: 51F-12?45, 51F*) thành biểu thức GLOB trên khóa
+    biển số và tập trigram bắt buộc lấy từ các đoạn ký tự cố định.
+    '?' thay cho đúng một ký tự, '*' cho một chuỗi bất kỳ.
+    """
+    parts = re.split(r"([?*])", pattern.strip())
+    glob_parts: list[str] = []
+    grams: set[str] = set()
+    for part in parts:
+        if part in ("?", "*"):
+            glob_parts.append(part)
+            continue
+        key = plate_key(part)
+        glob_parts.append(key)
+        grams |= trigrams(key)
+    return "".join(glob_parts), grams
+
+
+@dataclass
+class SearchQuery:
+    pattern: str = ""
+    since: float | None = None
+    until: float | None = None
+    streams: list[str] | None = None
+    limit: int = 50
+    # Vị trí trang trước (ts, id) để phân trang theo khóa, không dùng OFFSET
+    after: tuple[float, int] | None = None
+
+
+@dataclass
+class ArchiveRecord:
+    id: int
+    ts: float
+    stream: str
+    track_id: int
+    label: str
+    conf: float
+    plate: str
+    plate_conf: float
+    path: str
+
+
+class DetectionArchive:
+    """
+    Lưu metadata của các lần nhận diện vào SQLite kèm index trigram trên biển số.
+    Ghi qua luồng nền theo lô để không chặn luồng video.
+    """
+
+    def __init__(self, path: str = DEFAULT_ARCHIVE_PATH, batch_size: int = 200):
+        self.path = path
+        self.batch_size = batch_size
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.executescript(SCHEMA)
+
+        self._queue: queue.Queue[dict[str, Any] | None] = queue.Queue()
+        self._writer = threading.Thread(
+            target=self._write_loop, name="archive-writer", daemon=True
+        )
+        self._writer.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        # WAL cho phép đọc (tìm kiếm) song song với luồng ghi
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def add(self, det: dict[str, Any], stream: str, path: str = "") -> None:
+        """Xếp hàng một kết quả nhận diện để ghi (không chặn)"""
+        self._queue.put(
+            {
+                "ts": det.get("timestamp", time.time()),
+                "stream": stream,
+                "track_id": int(det["id"]),
+                "label": det["label"],
+                "conf": float(det["conf"]),
+                "plate": det.get("plate", ""),
+                "plate_conf": float(det.get("plate_conf", 0.0)),
+                "path": path,
+            }
+        )
+
+    def _write_loop(self) -> None:
+        conn = self._connect()
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                batch = [item]
+                while len(batch) < self.batch_size:
+                    try:
+                        item = self._queue.get(timeout=0.5)
+                    except queue.Empty:
+                        break
+                    if item is None:
+                        self._insert(conn, batch)
+                        return
+                    batch.append(item)
+                self._insert(conn, batch)
+        finally:
+            conn.close()
+
+    def _insert(self, conn: sqlite3.Connection, rows: list[dict[str, Any]]) -> None:
+        try:
+            with conn:
+                for row in rows:
+                    key = plate_key(row["plate"])
+                    cur = conn.execute(
+                        "INSERT INTO detections (ts, stream, track_id, label, conf,"
+                        " plate, plate_key, plate_conf, path)"
+                        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                        (
+                            row["ts"],
+                            row["stream"],
+                            row["track_id"],
+                            row["label"],
+                            row["conf"],
+                            row["plate"],
+                            key,
+                            row["plate_conf"],
+                            row["path"],
+                        ),
+                    )
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO plate_grams (gram, det_id)"
+                        " VALUES (?, ?)",
+                        [(gram, cur.lastrowid) for gram in trigrams(key)],
+                    )
+        except sqlite3.Error as e:
+            logger.error(f"Lỗi ghi archive: {e}")
+
+    def purge(self, paths: list[str]) -> None:
+        """
+        Bỏ đường dẫn của ảnh đã bị dọn khỏi các bản ghi (lịch sử biển số vẫn
+        còn, chỉ không còn ảnh). Gọi từ luồng dọn dẹp, không chặn luồng video.
+        """
+        if not paths:
+            return
+        try:
+            with closing(self._connect()) as conn, conn:
+                conn.executemany(
+                    "UPDATE detections SET path = '' WHERE path = ?",
+                    [(path,) for path in paths],
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Lỗi cập nhật archive: {e}")
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._writer.join(timeout=10)
+
+    def streams(self) -> list[str]:
+        # 'with conn' chỉ commit, closing() mới đóng kết nối
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT DISTINCT stream FROM detections").fetchall()
+        return sorted(r[0] for r in rows)
+
+    def search(self, query: SearchQuery) -> list[ArchiveRecord]:
+        """
+        Tìm các lần nhận diện theo mẫu biển số, khoảng thời gian và luồng.
+        Kết quả sắp xếp mới nhất trước; truyền 'after' để lấy trang kế tiếp.
+        """
+        where: list[str] = []
+        params: list[Any] = []
+
+        if query.pattern:
+            glob, grams = pattern_to_glob(query.pattern)
+            if grams:
+                # Chỉ xét các bản ghi chứa đủ mọi trigram cố định của mẫu
+                placeholders = ", ".join("?" * len(grams))
+                where.append(
+                    "d.id IN (SELECT det_id FROM plate_grams"
+                    f" WHERE gram IN ({placeholders})"
+                    " GROUP BY det_id HAVING COUNT(*) = ?)"
+                )
+                params.extend(sorted(grams))
+                params.append(len(grams))
+            where.append("d.plate_key GLOB ?")
+            params.append(glob)
+        if query.since is not None:
+            where.append("d.ts >= ?")
+            params.append(query.since)
+        if query.until is not None:
+            where.append("d.ts <= ?")
+            params.append(query.until)
+        if query.streams:
+            where.append(f"d.stream IN ({', '.join('?' * len(query.streams))})")
+            params.extend(query.streams)
+        if query.after is not None:
+            where.append("(d.ts < ? OR (d.ts = ? AND d.id < ?))")
+            params.extend([query.after[0], query.after[0], query.after[1]])
+
+        sql = (
+            "SELECT d.id, d.ts, d.stream, d.track_id, d.label, d.conf, d.plate,"
+            " d.plate_conf, d.path FROM detections d"
+        )
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY d.ts DESC, d.id DESC LIMIT ?"
+        params.append(query.limit)
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [ArchiveRecord(*row) for row in rows]
@@ -0,0 +1,255 @@
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+import cv2
+import numpy as np
+import numpy.typing as npt
+
+logger = logging.getLogger(__name__)
+
+CLIPS_DIR = os.path.join("detections", "clips")
+
+# Một frame đã nén: (thời điểm theo luồng, ảnh JPEG)
+EncodedFrame = tuple[float, bytes]
+
+
+@dataclass
+class ClipConfig:
+    """Cấu hình ghi đoạn video quanh sự kiện"""
+
+    enabled: bool = False
+    pre_seconds: float = 5.0
+    post_seconds: float = 5.0
+    # Độ trễ tối đa từ lúc xe hiện rõ nhất tới lúc sự kiện được phát (track kết
+    # thúc, chờ OCR); vòng đệm giữ thêm bấy lâu để clip vẫn có đủ phần trước
+    max_delay: float = 5.0
+    jpeg_quality: int = 75
+    # Thu nhỏ frame trước khi nén để giảm CPU và RAM (1.0 = giữ nguyên)
+    scale: float = 1.0
+    # Giới hạn tổng dung lượng JPEG trong vòng đệm của một luồng
+    max_bytes: int = 64 * 1024 * 1024
+    # Các loại xe luôn được ghi clip (ngoài xe trùng danh sách theo dõi)
+    trigger_labels: list[str] = field(default_factory=list)
+    output_dir: str = CLIPS_DIR
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ClipConfig":
+        """Factory method để tạo ClipConfig từ mục "clips" của cấu hình luồng."""
+        return cls(
+            enabled=bool(data.get("enabled", False)),
+            pre_seconds=float(data.get("pre_seconds", 5.0)),
+            post_seconds=float(data.get("post_seconds", 5.0)),
+            max_delay=float(data.get("max_delay", 5.0)),
+            jpeg_quality=int(data.get("jpeg_quality", 75)),
+            scale=float(data.get("scale", 1.0)),
+            max_bytes=int(data.get("max_bytes", 64 * 1024 * 1024)),
+            trigger_labels=list(data.get("trigger_labels", [])),
+            output_dir=str(data.get("output_dir", CLIPS_DIR)),
+        )
+
+
+@dataclass
+class PendingClip:
+    path: str
+    start: float
+    end: float
+    frames: list[EncodedFrame]
+    size: int = 0
+    pinned: bool = False
+
+
+class ClipRecorder:
+    """
+    Giữ vài giây video gần nhất của một luồng dưới dạng JPEG trong bộ nhớ.
+    Khi có sự kiện, ghép các frame trước và sau sự kiện thành file video.
+    Việc nén và ghi file chạy trên luồng nền; luồng nhận diện chỉ đẩy frame
+    vào hàng đợi và bỏ qua frame nếu hàng đợi đầy.
+    """
+
+    def __init__(
+        self,
+        config: ClipConfig,
+        stream_name: str,
+        on_written: Callable[[str, bool], None] | None = None,
+    ):
+        self.config = config
+        # Gọi trên luồng ghi (đường dẫn, có ghim) sau khi clip đã nằm trên đĩa
+        self.on_written = on_written
+        self.directory = os.path.join(config.output_dir, stream_name)
+        self._frames: queue.Queue[tuple[float, npt.NDArray[Any]] | None] = queue.Queue(
+            maxsize=4
+        )
+        self._clips: queue.Queue[PendingClip | None] = queue.Queue()
+
+        self._ring: deque[EncodedFrame] = deque()
+        self._ring_bytes = 0
+        self._pending: list[PendingClip] = []
+        # Bảo vệ vòng đệm và danh sách clip chờ giữa luồng nén và luồng gọi
+        self._lock = threading.Lock()
+        self.dropped = 0
+
+        self._encoder = threading.Thread(
+            target=self._encode_loop, name="clip-encoder", daemon=True
+        )
+        self._writer = threading.Thread(
+            target=self._write_loop, name="clip-writer", daemon=True
+        )
+        self._encoder.start()
+        self._writer.start()
+
+    def push(self, frame: npt.NDArray[Any], timestamp: float) -> None:
+        """Đưa frame vào hàng đợi nén, không bao giờ chặn luồng gọi"""
+        try:
+            self._frames.put_nowait((timestamp, frame))
+        except queue.Full:
+            self.dropped += 1
+
+    def trigger(self, name: str, timestamp: float, pinned: bool = False) -> str:
+        """
+        Yêu cầu ghi clip quanh 'timestamp', trả về đường dẫn file sẽ tạo.
+        Sự kiện rơi vào clip đang mở được gộp vào clip đó để không ghi trùng.
+        """
+        start = timestamp - self.config.pre_seconds
+        end = timestamp + self.config.post_seconds
+        with self._lock:
+            for clip in self._pending:
+                if clip.start <= start <= clip.end:
+                    # Sự kiện đã qua: phần nối dài có thể đã nằm sẵn trong vòng đệm
+                    extra = [f for f in self._ring if clip.end < f[0] <= end]
+                    clip.frames += extra
+                    clip.size += sum(len(f[1]) for f in extra)
+                    clip.end = max(clip.end, end)
+                    clip.pinned = clip.pinned or pinned
+                    return clip.path
+
+            os.makedirs(self.directory, exist_ok=True)
+            path = os.path.join(self.directory, f"{name}.mp4")
+            frames = [f for f in self._ring if start <= f[0] <= end]
+            size = sum(len(f[1]) for f in frames)
+            self._pending.append(PendingClip(path, start, end, frames, size, pinned))
+            return path
+
+    def _encode(self, frame: npt.NDArray[Any]) -> bytes | None:
+        if self.config.scale != 1.0:
+            frame = cv2.resize(
+                frame,
+                None,
+                fx=self.config.scale,
+                fy=self.config.scale,
+                interpolation=cv2.INTER_AREA,
+            )
+        ok, buffer = cv2.imencode(
+            ".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.config.jpeg_quality]
+        )
+        return buffer.tobytes() if ok else None
+
+    def _encode_loop(self) -> None:
+        while True:
+            try:
+                item = self._frames.get(timeout=0.2)
+            except queue.Empty:
+                self._finish_pending_clips(force=False)
+                continue
+            if item is None:
+                break
+
+            timestamp, frame = item
+            try:
+                data = self._encode(frame)
+            except cv2.error as e:
+                logger.error(f"Lỗi nén frame cho clip: {e}")
+                data = None
+            if data is not None:
+                self._append(timestamp, data)
+            self._finish_pending_clips(force=False)
+
+        # Dừng: ghi nốt các clip dang dở với những frame đã có
+        self._finish_pending_clips(force=True)
+        self._clips.put(None)
+
+    def _append(self, timestamp: float, data: bytes) -> None:
+        """Thêm frame vào vòng đệm và các clip đang chờ frame sau sự kiện"""
+        encoded = (timestamp, data)
+        with self._lock:
+            self._append_locked(encoded)
+
+    def _append_locked(self, encoded: EncodedFrame) -> None:
+        timestamp, data = encoded
+        self._ring.append(encoded)
+        self._ring_bytes += len(data)
+        horizon = timestamp - self.config.pre_seconds - self.config.max_delay
+        while self._ring and (
+            self._ring_bytes > self.config.max_bytes or self._ring[0][0] < horizon
+        ):
+            self._ring_bytes -= len(self._ring.popleft()[1])
+
+        for clip in self._pending:
+            # Clip cũng bị giới hạn dung lượng để RAM luôn dự đoán được
+            if (
+                clip.start <= timestamp <= clip.end
+                and clip.size < self.config.max_bytes
+            ):
+                clip.frames.append(encoded)
+                clip.size += len(data)
+
+    def _finish_pending_clips(self, force: bool) -> None:
+        """Chuyển các clip đã đủ frame sau sự kiện sang luồng ghi file"""
+        with self._lock:
+            latest = self._ring[-1][0] if self._ring else float("-inf")
+            done = [c for c in self._pending if force or latest > c.end]
+            self._pending = [c for c in self._pending if not (force or latest > c.end)]
+        for clip in done:
+            self._clips.put(clip)
+
+    def _write_loop(self) -> None:
+        while True:
+            clip = self._clips.get()
+            if clip is None:
+                return
+            try:
+                self._write_clip(clip)
+            except Exception as e:
+                logger.error(f"Lỗi ghi clip {clip.path}: {e}")
+                continue
+            if self.on_written is not None and clip.frames:
+                self.on_written(clip.path, clip.pinned)
+
+    def _write_clip(self, clip: PendingClip) -> None:
+        if not clip.frames:
+            return
+        frames = clip.frames
+        duration = frames[-1][0] - frames[0][0]
+        fps = (len(frames) - 1) / duration if duration > 0 else 25.0
+
+        first = cv2.imdecode(np.frombuffer(frames[0][1], np.uint8), cv2.IMREAD_COLOR)
+        if first is None:
+            raise ValueError("Không giải mã được frame đầu của clip")
+        h, w = first.shape[:2]
+        fourcc = cv2.VideoWriter.fourcc(*"mp4v")
+        writer = cv2.VideoWriter(clip.path, fourcc, fps, (w, h))
+        try:
+            for _, data in frames:
+                image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+                if image is not None and image.shape[:2] == (h, w):
+                    writer.write(image)
+        finally:
+            writer.release()
+        logger.info(f"Đã ghi clip {clip.path} ({len(frames)} frame)")
+
+    @property
+    def buffered_bytes(self) -> int:
+        return self._ring_bytes
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Ghi nốt các clip đang chờ rồi dừng các luồng nền"""
+        deadline = time.monotonic() + timeout
+        self._frames.put(None, timeout=timeout)
+        self._encoder.join(max(0.0, deadline - time.monotonic()))
+        self._writer.join(max(0.0, deadline - time.monotonic()))
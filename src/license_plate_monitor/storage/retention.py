@@ -0,0 +1,355 @@
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import Any
+
+from license_plate_monitor.storage.archive import DetectionArchive
+
+logger = logging.getLogger(__name__)
+
+DETECTIONS_DIR = "detections"
+DEFAULT_INDEX_PATH = os.path.join(DETECTIONS_DIR, "retention.db")
+# Các thư mục con không chứa ảnh/clip của luồng (không bao giờ dọn)
+RESERVED_DIRS = ("batch", "heatmaps")
+MEDIA_SUFFIXES = (".png", ".jpg", ".jpeg", ".mp4")
+# Ảnh lưu ở thư mục gốc bởi các bản cũ (trước khi tách thư mục theo luồng)
+LEGACY_STREAM = ""
+GB = 1024**3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    stream TEXT NOT NULL,
+    ts REAL NOT NULL,
+    size INTEGER NOT NULL,
+    pinned INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_files_evict ON files (stream, pinned, ts);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+@dataclass
+class RetentionConfig:
+    """Giới hạn dung lượng và tuổi của ảnh/clip đã lưu của một luồng"""
+
+    enabled: bool = True
+    # Dung lượng tối đa (GB), 0 = không giới hạn
+    max_gb: float = 10.0
+    # Tuổi tối đa (ngày), 0 = giữ mãi
+    max_age_days: float = 90.0
+    # Vượt quota thì xóa tới khi còn tỉ lệ này của quota, tránh xóa lắt nhắt
+    low_water: float = 0.9
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "RetentionConfig":
+        """Factory method để tạo RetentionConfig từ mục "retention" của cấu hình."""
+        return cls(
+            enabled=bool(data.get("enabled", True)),
+            max_gb=max(0.0, float(data.get("max_gb", 10.0))),
+            max_age_days=max(0.0, float(data.get("max_age_days", 90.0))),
+            low_water=min(1.0, max(0.1, float(data.get("low_water", 0.9)))),
+        )
+
+    @property
+    def max_bytes(self) -> int:
+        return int(self.max_gb * GB)
+
+
+@dataclass
+class StreamUsage:
+    bytes: int = 0
+    files: int = 0
+    evicted: int = 0
+
+
+class RetentionManager:
+    """
+    Giữ dung lượng thư mục detections/ trong giới hạn của từng luồng.
+    Mỗi file được ghi nhận một lần vào index SQLite (đường dẫn, luồng, thời
+    điểm, kích thước) khi vừa lưu, nên không bao giờ phải duyệt lại thư mục.
+    Tổng dung lượng giữ trong RAM; file cũ nhất bị xóa trước, theo từng lô
+    nhỏ trên luồng nền. Ảnh/clip của xe trong danh sách theo dõi được ghim
+    và không bao giờ bị xóa tự động. Bản ghi trong archive trỏ tới file đã
+    xóa được bỏ đường dẫn ngay trong cùng lượt dọn.
+    """
+
+    def __init__(
+        self,
+        root: str = DETECTIONS_DIR,
+        index_path: str = DEFAULT_INDEX_PATH,
+        default: RetentionConfig | None = None,
+        batch_size: int = 500,
+        sweep_interval: float = 60.0,
+        pause: float = 0.05,
+        archive: DetectionArchive | None = None,
+    ):
+        self.root = root
+        self.archive = archive
+        self.index_path = index_path
+        self.default = default or RetentionConfig()
+        self.batch_size = batch_size
+        self.sweep_interval = sweep_interval
+        # Nghỉ giữa các lô xóa để nhường đĩa cho luồng video
+        self.pause = pause
+        self.configs: dict[str, RetentionConfig] = {}
+        self._usage: dict[str, StreamUsage] = {}
+        self._queue: queue.Queue[tuple[str, str, bool] | None] = queue.Queue()
+        self._stop = threading.Event()
+        # Luồng đã báo không thể xuống dưới quota vì toàn file được ghim
+        self._stuck: set[str] = set()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="retention", daemon=True)
+        self._thread.start()
+
+    def configure(self, stream: str, config: RetentionConfig) -> None:
+        """Đặt giới hạn cho một luồng; luồng chưa đặt dùng giới hạn mặc định"""
+        self.configs[stream] = config
+
+    def add(self, stream: str, path: str, pinned: bool = False) -> None:
+        """Ghi nhận file vừa lưu (không chặn, kích thước được đọc trên luồng nền)"""
+        self._queue.put((stream, path, pinned))
+
+    def usage(self) -> dict[str, StreamUsage]:
+        """Dung lượng đang dùng của từng luồng (bản sao, đọc từ luồng nào cũng được)"""
+        return {
+            stream: StreamUsage(u.bytes, u.files, u.evicted)
+            for stream, u in self._usage.items()
+        }
+
+    def close(self, timeout: float = 10.0) -> None:
+        """Ghi nốt các file đang chờ vào index rồi dừng luồng nền"""
+        self._stop.set()
+        self._queue.put(None)
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _connect(self) -> sqlite3.Connection:
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        conn = sqlite3.connect(self.index_path, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _run(self) -> None:
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            logger.error(f"Không mở được index dọn dẹp {self.index_path}: {e}")
+            return
+        try:
+            rows = conn.execute(
+                "SELECT stream, SUM(size), COUNT(*) FROM files GROUP BY stream"
+            ).fetchall()
+            for stream, size, count in rows:
+                self._usage[stream] = StreamUsage(int(size), int(count))
+            scanned = conn.execute("SELECT 1 FROM meta WHERE key = 'scanned'")
+            if scanned.fetchone() is None:
+                self._scan(conn)
+
+            next_sweep = 0.0
+            busy = False
+            while True:
+                # Còn việc xóa thì chỉ ghé qua hàng đợi rồi làm tiếp lô sau
+                items, stopping = self._drain(self.pause if busy else 1.0)
+                if items:
+                    self._ingest(conn, items)
+                if stopping:
+                    return
+                now = time.time()
+                sweep = now >= next_sweep
+                if sweep:
+                    next_sweep = now + self.sweep_interval
+                busy = self._evict(conn, now, check_age=sweep or busy)
+        except sqlite3.Error as e:
+            logger.error(f"Lỗi index dọn dẹp: {e}")
+        finally:
+            conn.close()
+
+    def _drain(self, timeout: float) -> tuple[list[tuple[str, str, bool]], bool]:
+        items: list[tuple[str, str, bool]] = []
+        try:
+            item = self._queue.get(timeout=timeout)
+            while True:
+                if item is None:
+                    return items, True
+                items.append(item)
+                # Giới hạn mỗi giao dịch, phần còn lại để vòng sau
+                if len(items) >= self.batch_size * 4:
+                    return items, False
+                item = self._queue.get_nowait()
+        except queue.Empty:
+            return items, False
+
+    def _config(self, stream: str) -> RetentionConfig:
+        return self.configs.get(stream, self.default)
+
+    def _ingest(
+        self,
+        conn: sqlite3.Connection,
+        items: list[tuple[str, str, bool]],
+    ) -> None:
+        rows: list[tuple[str, str, float, int, int]] = []
+        for stream, path, pinned in items:
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            rows.append((path, stream, st.st_mtime, st.st_size, int(pinned)))
+        self._insert(conn, rows)
+
+    def _insert(
+        self,
+        conn: sqlite3.Connection,
+        rows: list[tuple[str, str, float, int, int]],
+    ) -> None:
+        with conn:
+            for path, stream, ts, size, pinned in rows:
+                cur = conn.execute(
+                    "INSERT OR IGNORE INTO files (path, stream, ts, size, pinned)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (path, stream, ts, size, pinned),
+                )
+                if cur.rowcount:
+                    usage = self._usage.setdefault(stream, StreamUsage())
+                    usage.bytes += size
+                    usage.files += 1
+                elif pinned:
+                    conn.execute("UPDATE files SET pinned = 1 WHERE path = ?", (path,))
+
+    def _scan(self, conn: sqlite3.Connection) -> None:
+        """
+        Lần chạy đầu: nạp các file đã có sẵn vào index, ghi theo lô.
+        Chỉ chạy một lần; bị ngắt giữa chừng thì lần sau quét lại (bỏ qua
+        file đã có trong index).
+        """
+        print(f"[*] Đang lập index dung lượng cho thư mục {self.root}...")
+        started = time.perf_counter()
+        total = 0
+        rows: list[tuple[str, str, float, int, int]] = []
+        for stream, path, st in self._walk():
+            if self._stop.is_set():
+                return
+            rows.append((path, stream, st.st_mtime, st.st_size, 0))
+            if len(rows) >= self.batch_size:
+                self._insert(conn, rows)
+                total += len(rows)
+                rows = []
+        self._insert(conn, rows)
+        total += len(rows)
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO meta VALUES ('scanned', ?)", (time.time(),)
+            )
+        elapsed = time.perf_counter() - started
+        print(f"[+] Đã lập index {total} file trong {elapsed:.1f}s")
+
+    def _walk(self) -> Iterator[tuple[str, str, os.stat_result]]:
+        """detections/<luồng>/*, detections/clips/<luồng>/* và ảnh cũ ở thư mục gốc"""
+        if not os.path.isdir(self.root):
+            return
+        with os.scandir(self.root) as entries:
+            top = list(entries)
+        for entry in top:
+            if entry.is_file():
+                if entry.name.lower().endswith(MEDIA_SUFFIXES):
+                    yield LEGACY_STREAM, entry.path, entry.stat()
+            elif entry.is_dir() and entry.name not in RESERVED_DIRS:
+                if entry.name == "clips":
+                    with os.scandir(entry.path) as clip_dirs:
+                        streams = [(d.name, d.path) for d in clip_dirs if d.is_dir()]
+                    for stream, directory in streams:
+                        yield from self._walk_stream(stream, directory)
+                else:
+                    yield from self._walk_stream(entry.name, entry.path)
+
+    def _walk_stream(
+        self, stream: str, directory: str
+    ) -> Iterator[tuple[str, str, os.stat_result]]:
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file() and entry.name.lower().endswith(MEDIA_SUFFIXES):
+                    yield stream, entry.path, entry.stat()
+
+    def _evict(self, conn: sqlite3.Connection, now: float, check_age: bool) -> bool:
+        """Xóa tối đa một lô mỗi luồng, trả về True nếu vẫn còn phải xóa tiếp"""
+        busy = False
+        for stream, usage in list(self._usage.items()):
+            config = self._config(stream)
+            if not config.enabled:
+                continue
+            if config.max_gb > 0 and usage.bytes > config.max_bytes:
+                target = usage.bytes - int(config.max_bytes * config.low_water)
+                busy |= self._evict_batch(conn, stream, None, target)
+            # Luồng luôn sát quota vẫn phải xét tuổi, nếu không file cũ không
+            # bao giờ hết hạn khi xóa theo dung lượng dừng trước chúng
+            if check_age and config.max_age_days > 0:
+                cutoff = now - config.max_age_days * 86400
+                busy |= self._evict_batch(conn, stream, cutoff, None)
+        return busy
+
+    def _evict_batch(
+        self,
+        conn: sqlite3.Connection,
+        stream: str,
+        cutoff: float | None,
+        target: int | None,
+    ) -> bool:
+        """Xóa các file cũ nhất chưa ghim: cũ hơn 'cutoff' hoặc đủ 'target' byte"""
+        sql = "SELECT path, size FROM files WHERE stream = ? AND pinned = 0"
+        params: list[Any] = [stream]
+        if cutoff is not None:
+            sql += " AND ts < ?"
+            params.append(cutoff)
+        sql += " ORDER BY ts LIMIT ?"
+        params.append(self.batch_size)
+        rows = conn.execute(sql, params).fetchall()
+
+        if not rows:
+            if target is not None and stream not in self._stuck:
+                self._stuck.add(stream)
+                logger.warning(
+                    f"Luồng '{stream}' vượt quota nhưng chỉ còn file được ghim"
+                )
+            return False
+        self._stuck.discard(stream)
+
+        removed: list[tuple[str]] = []
+        freed = 0
+        for path, size in rows:
+            if target is not None and freed >= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                # Để lại trong index, lần quét sau thử lại
+                logger.warning(f"Không xóa được {path}: {e}")
+                continue
+            removed.append((path,))
+            freed += size
+        with conn:
+            conn.executemany("DELETE FROM files WHERE path = ?", removed)
+        if self.archive is not None:
+            self.archive.purge([path for (path,) in removed])
+
+        usage = self._usage[stream]
+        usage.bytes -= freed
+        usage.files -= len(removed)
+        usage.evicted += len(removed)
+        logger.info(f"Đã dọn {len(removed)} file ({freed / 1e6:.1f} MB) của '{stream}'")
+        # Lô đầy nghĩa là có thể còn file cần xóa
+        done = target is not None and freed >= target
+        return bool(removed) and len(rows) == self.batch_size and not done
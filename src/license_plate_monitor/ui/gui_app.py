@@ -1,19 +1,45 @@
-from typing import TYPE_CHECKING, cast
+import time
+from typing import TYPE_CHECKING, Any, cast
 
 from PyQt6.QtCore import QSettings, Qt, QTimer
 
-from license_plate_monitor.ui.threads import VideoThread, YoutubeInfoThread
+from license_plate_monitor.ai.runtime import DEFAULT_PROFILE_PATH, RuntimeProfile
+from license_plate_monitor.ai.scheduler import InferenceScheduler, format_schedule
+from license_plate_monitor.analytics.timeseries import TimeSeriesStore
+from license_plate_monitor.analytics.watchlist import Watchlist
+from license_plate_monitor.config import stream_key
+from license_plate_monitor.perf.metrics import (
+    DEFAULT_METRICS_PORT,
+    MetricsRegistry,
+    MetricsServer,
+    format_overlay,
+)
+from license_plate_monitor.perf.profiler import (
+    DEFAULT_PROFILE_SECONDS,
+    ProfileReport,
+    SamplingProfiler,
+)
+from license_plate_monitor.storage.archive import ArchiveRecord, DetectionArchive
+from license_plate_monitor.storage.retention import RetentionManager
+from license_plate_monitor.ui.threads import (
+    ArchiveSearchThread,
+    ProfilerThread,
+    VideoThread,
+    YoutubeInfoThread,
+)
 from license_plate_monitor.ui.widgets import (
     AISettingTab,
     DetectionSidebar,
+    HistoryDock,
     SettingsDock,
     SourceTab,
     StatsDock,
 )
+from license_plate_monitor.utils.events import EventServer
 
 if TYPE_CHECKING:
     from license_plate_monitor.ai.detector import LicensePlateDetector
-from PyQt6.QtGui import QAction, QCloseEvent, QImage, QPixmap
+from PyQt6.QtGui import QAction, QCloseEvent, QImage, QPainter, QPixmap
 from PyQt6.QtWidgets import (
     QGroupBox,
     QHBoxLayout,
@@ -31,9 +57,17 @@ from PyQt6.QtWidgets import (
 
 
 class MainWindow(QMainWindow):
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        metrics_port: int = DEFAULT_METRICS_PORT,
+        events_address: str | None = None,
+        events_format: str = "ndjson",
+    ) -> None:
         super().__init__()
         self.settings = QSettings("Ngxccc", "LicensePlateMonitor")
+        self.metrics_port = metrics_port
+        self.events_address = events_address
+        self.events_format = events_format
         self._init_ui_settings()
         self._create_widgets()
         self._setup_layouts()
@@ -48,6 +82,36 @@ class MainWindow(QMainWindow):
         self.setStyleSheet("background-color: #1a1a1a;")
         self.video_thread: VideoThread | None = None
         self.stored_detector: LicensePlateDetector | None = None
+        # Danh sách biển số theo dõi, tự nạp lại khi file trong config/watchlists đổi
+        self.watchlist = Watchlist()
+        self.watchlist.start()
+        # Lưu metadata các lần nhận diện để tra cứu lại (detections/archive.db)
+        self.archive = DetectionArchive()
+        self.search_thread: ArchiveSearchThread | None = None
+        # Giữ ảnh/clip đã lưu trong giới hạn dung lượng và tuổi của từng luồng
+        self.retention = RetentionManager(archive=self.archive)
+        self.retention.start()
+        # Số xe theo thời gian của từng luồng (giữ trong RAM, dung lượng cố định)
+        self.timeseries = TimeSeriesStore()
+        # Thời gian từng bước của pipeline, xem tại http://127.0.0.1:<port>/metrics
+        self.metrics = MetricsRegistry()
+        # Lượt suy luận chia cho các luồng theo ưu tiên/min_fps trong mục "schedule",
+        # số lượt chạy song song lấy theo số stream của runtime profile
+        profile = RuntimeProfile.load(DEFAULT_PROFILE_PATH)
+        self.scheduler = InferenceScheduler(profile.streams)
+        self.metrics.collectors.append(self.scheduler.render_metrics)
+        self.metrics_server: MetricsServer | None = None
+        if self.metrics_port > 0:
+            self.metrics_server = MetricsServer(self.metrics, self.metrics_port)
+            self.metrics_server.start()
+        # Sự kiện nhận diện cho chương trình khác trên máy (chỉ khi có --events)
+        self.event_server: EventServer | None = None
+        if self.events_address:
+            self.event_server = EventServer(self.events_address, self.events_format)
+            if not self.event_server.start():
+                self.event_server = None
+        # Profiler chỉ tồn tại trong lúc đang lấy mẫu, ngoài ra không tốn gì
+        self.profiler_thread: ProfilerThread | None = None
 
     def _create_widgets(self) -> None:
         # Video & Sidebar
@@ -102,11 +166,24 @@ class MainWindow(QMainWindow):
         self.setStatusBar(self.status_bar)
         self.status_bar.showMessage("Sẵn sàng.")
         self.status_bar.setStyleSheet("font-size: 14px;")
+        # Thời gian trung bình từng bước trong giây vừa qua (bật trong menu Hiển thị)
+        self.metrics_label = QLabel()
+        self.metrics_label.setStyleSheet("color: #aaa; font-size: 12px;")
+        self.metrics_label.hide()
+        self.status_bar.addPermanentWidget(self.metrics_label)
+        self.metrics_timer = QTimer(self)
+        self.metrics_timer.setInterval(1000)
+        # Bản đồ mật độ chỉ được tô màu lại theo chu kỳ này, không theo từng frame
+        self.heatmap_image: QImage | None = None
+        self.heatmap_scaled: QImage | None = None
+        self.heatmap_timer = QTimer(self)
+        self.heatmap_timer.setInterval(500)
 
         # Dock Widgets
         self.dock_settings = SettingsDock(self)
         self.dock_settings.setWidget(self.tabs)
         self.stats_dock = StatsDock(self)
+        self.history_dock = HistoryDock(self)
 
     def _setup_layouts(self) -> None:
         # Action Layout
@@ -134,6 +211,8 @@ class MainWindow(QMainWindow):
     def _setup_docks_and_menus(self) -> None:
         self.addDockWidget(Qt.DockWidgetArea.TopDockWidgetArea, self.stats_dock)
         self.addDockWidget(Qt.DockWidgetArea.LeftDockWidgetArea, self.dock_settings)
+        self.addDockWidget(Qt.DockWidgetArea.RightDockWidgetArea, self.history_dock)
+        self.history_dock.hide()
 
         menu_bar = cast(QMenuBar, self.menuBar())
         view_menu = cast(QMenu, menu_bar.addMenu("Hiển thị"))
@@ -144,9 +223,27 @@ class MainWindow(QMainWindow):
         stats_toggle_action = cast(QAction, self.stats_dock.toggleViewAction())
         stats_toggle_action.setText("Bảng thống kê")
 
+        history_toggle_action = cast(QAction, self.history_dock.toggleViewAction())
+        history_toggle_action.setText("Tra cứu lịch sử")
+
+        self.metrics_action = QAction("Thời gian từng bước", self)
+        self.metrics_action.setCheckable(True)
+
+        self.heatmap_action = QAction("Bản đồ mật độ xe", self)
+        self.heatmap_action.setCheckable(True)
+
         # Gắn toggle actions vào Menu
         view_menu.addAction(self.dock_settings.toggleViewAction())
         view_menu.addAction(self.stats_dock.toggleViewAction())
+        view_menu.addAction(self.history_dock.toggleViewAction())
+        view_menu.addAction(self.metrics_action)
+        view_menu.addAction(self.heatmap_action)
+
+        tools_menu = cast(QMenu, menu_bar.addMenu("Công cụ"))
+        self.profile_action = QAction(
+            f"Lấy mẫu hiệu năng ({DEFAULT_PROFILE_SECONDS:.0f} giây)", self
+        )
+        tools_menu.addAction(self.profile_action)
 
     def _connect_signals(self) -> None:
         self.start_btn.clicked.connect(self.toggle_detection)
@@ -158,6 +255,16 @@ class MainWindow(QMainWindow):
 
         self.ai_tab.reset_btn.clicked.connect(self.reset_settings)
 
+        self.history_dock.search_requested.connect(self.search_history)
+        self.history_dock.more_requested.connect(self.load_more_history)
+        self.history_dock.visibilityChanged.connect(self.on_history_visibility)
+
+        self.metrics_action.toggled.connect(self.toggle_metrics_overlay)
+        self.metrics_timer.timeout.connect(self.update_metrics_overlay)
+        self.heatmap_action.toggled.connect(self.toggle_heatmap_overlay)
+        self.heatmap_timer.timeout.connect(self.refresh_heatmap)
+        self.profile_action.triggered.connect(self.start_profiling)
+
     def save_settings(self) -> None:
         """Lưu toàn bộ cấu hình vào máy"""
         # Source Settings
@@ -169,6 +276,9 @@ class MainWindow(QMainWindow):
         self.settings.setValue("labels", self.ai_tab.show_labels.isChecked())
         self.settings.setValue("boxes", self.ai_tab.show_boxes.isChecked())
         self.settings.setValue("auto_save", self.ai_tab.auto_save.isChecked())
+        self.settings.setValue("ocr", self.ai_tab.ocr_enabled.isChecked())
+        self.settings.setValue("metrics_overlay", self.metrics_action.isChecked())
+        self.settings.setValue("heatmap_overlay", self.heatmap_action.isChecked())
         print("[*] Đã lưu cấu hình.")
 
     def load_settings(self) -> None:
@@ -187,6 +297,15 @@ class MainWindow(QMainWindow):
         self.ai_tab.auto_save.setChecked(
             self.settings.value("auto_save", "true") == "true"
         )
+        self.ai_tab.ocr_enabled.setChecked(
+            self.settings.value("ocr", "false") == "true"
+        )
+        self.metrics_action.setChecked(
+            self.settings.value("metrics_overlay", "false") == "true"
+        )
+        self.heatmap_action.setChecked(
+            self.settings.value("heatmap_overlay", "false") == "true"
+        )
 
     def reset_settings(self) -> None:
         """Khôi phục toàn bộ cấu hình về giá trị mặc định ban đầu"""
@@ -204,6 +323,7 @@ class MainWindow(QMainWindow):
         self.ai_tab.show_labels.setChecked(True)
         self.ai_tab.show_boxes.setChecked(True)
         self.ai_tab.auto_save.setChecked(True)
+        self.ai_tab.ocr_enabled.setChecked(False)
 
         # Thông báo cho người dùng
         self.status_bar.showMessage("Đã đặt lại cấu hình mặc định.", 5000)
@@ -215,15 +335,131 @@ class MainWindow(QMainWindow):
         display_text = "  |  ".join(stat_items)
         self.stats_dock.update_text(f"THỐNG KÊ: {display_text}")
 
-    def update_video(self, qt_image: QImage) -> None:
-        pixmap = QPixmap.fromImage(qt_image)
-        self.video_label.setPixmap(
-            pixmap.scaled(
-                self.video_label.size(),
-                Qt.AspectRatioMode.KeepAspectRatio,
+    def on_watchlist_hit(self, det: dict[str, Any]) -> None:
+        """Cảnh báo khi biển số trùng danh sách theo dõi"""
+        match = det["watchlist"][0]
+        message = (
+            f"CẢNH BÁO: {det['plate']} khớp '{match['plate']}' "
+            f"(danh sách {match['list']}) lúc {det['time']}"
+        )
+        self.status_bar.showMessage(message, 15000)
+        print(f"[!] {message}")
+
+    def toggle_metrics_overlay(self, visible: bool) -> None:
+        """Bật/tắt dòng thời gian từng bước ở thanh trạng thái"""
+        self.metrics_label.setVisible(visible)
+        if visible:
+            self.metrics_timer.start()
+        else:
+            self.metrics_timer.stop()
+
+    def update_metrics_overlay(self) -> None:
+        if self.video_thread is None:
+            self.metrics_label.clear()
+            return
+        stream = self.video_thread.stream_name
+        text = format_overlay(self.metrics.recent_means(stream))
+        for report in self.scheduler.report():
+            if report.stream == stream:
+                text = f"{text}  ·  {format_schedule(report)}"
+        self.metrics_label.setText(text)
+
+    def toggle_heatmap_overlay(self, visible: bool) -> None:
+        """Bật/tắt lớp bản đồ mật độ xe trên khung video"""
+        if visible:
+            self.refresh_heatmap()
+            self.heatmap_timer.start()
+        else:
+            self.heatmap_timer.stop()
+            self.heatmap_image = None
+            self.heatmap_scaled = None
+
+    def refresh_heatmap(self) -> None:
+        """Tô màu lại bản đồ mật độ (kích thước lưới, rất nhỏ so với frame)"""
+        heatmap = self.video_thread.heatmap if self.video_thread is not None else None
+        rgba = heatmap.render() if heatmap is not None else None
+        if rgba is None:
+            self.heatmap_image = None
+        else:
+            h, w = rgba.shape[:2]
+            # Stub của PyQt chỉ khai báo bytes, thực tế nhận mọi buffer
+            self.heatmap_image = QImage(
+                rgba.data,  # type: ignore[call-overload]
+                w,
+                h,
+                rgba.strides[0],
+                QImage.Format.Format_RGBA8888,
+            ).copy()
+        self.heatmap_scaled = None
+
+    def _draw_heatmap(self, pixmap: QPixmap) -> None:
+        """Chồng bản đồ mật độ lên ảnh đã thu nhỏ theo khung hiển thị"""
+        if self.heatmap_image is None:
+            return
+        # Chỉ phóng to lại khi bản đồ mới được tô hoặc khung hiển thị đổi cỡ
+        if self.heatmap_scaled is None or self.heatmap_scaled.size() != pixmap.size():
+            self.heatmap_scaled = self.heatmap_image.scaled(
+                pixmap.size(),
+                Qt.AspectRatioMode.IgnoreAspectRatio,
                 Qt.TransformationMode.SmoothTransformation,
             )
+        painter = QPainter(pixmap)
+        painter.drawImage(0, 0, self.heatmap_scaled)
+        painter.end()
+
+    def on_history_visibility(self, visible: bool) -> None:
+        """Nạp danh sách luồng đã lưu khi mở bảng tra cứu"""
+        if visible:
+            self.history_dock.set_streams(self.archive.streams())
+
+    def search_history(self) -> None:
+        """Tìm trang kết quả đầu tiên với bộ lọc hiện tại"""
+        self.history_dock.clear_results()
+        self._start_history_search(next_page=False)
+
+    def load_more_history(self) -> None:
+        """Nạp trang kế tiếp khi người dùng cuộn tới cuối danh sách"""
+        self._start_history_search(next_page=True)
+
+    def _start_history_search(self, next_page: bool) -> None:
+        """Chạy truy vấn ở luồng nền, bỏ qua kết quả của các lần tìm đã cũ"""
+        query = self.history_dock.build_query(next_page)
+        thread = ArchiveSearchThread(self.archive, query)
+        # Gắn parent để luồng cũ không bị thu hồi khi đang chạy
+        thread.setParent(self)
+        self.search_thread = thread
+        self.history_dock.loading = True
+
+        def on_results(records: list[ArchiveRecord]) -> None:
+            if self.search_thread is thread:
+                self.history_dock.loading = False
+                self.history_dock.append_results(records, query.limit)
+
+        def on_error(error_msg: str) -> None:
+            if self.search_thread is thread:
+                self.history_dock.loading = False
+                self.history_dock.status_label.setText(f"Lỗi tìm kiếm: {error_msg}")
+
+        thread.results_signal.connect(on_results)
+        thread.error_signal.connect(on_error)
+        thread.finished.connect(thread.deleteLater)
+        thread.start()
+
+    def update_video(self, qt_image: QImage) -> None:
+        pixmap = QPixmap.fromImage(qt_image).scaled(
+            self.video_label.size(),
+            Qt.AspectRatioMode.KeepAspectRatio,
+            Qt.TransformationMode.SmoothTransformation,
         )
+        if self.heatmap_action.isChecked():
+            self._draw_heatmap(pixmap)
+        self.video_label.setPixmap(pixmap)
+        captured = qt_image.text("capture_time")
+        if captured and self.video_thread is not None:
+            # Từ lúc nhận frame tới lúc ảnh được đưa lên màn hình
+            self.video_thread.metrics.observe(
+                "display", time.perf_counter() - float(captured)
+            )
 
     def on_source_type_changed(self, text: str) -> None:
         """Tự động ẩn/hiện độ phân giải tùy theo nguồn"""
@@ -247,6 +483,8 @@ class MainWindow(QMainWindow):
                 self.source_tab.input.setPlaceholderText("Nhập đường dẫn file")
             case "rtsp":
                 self.source_tab.input.setPlaceholderText("Nhập địa chỉ RTSP")
+            case "replay":
+                self.source_tab.input.setPlaceholderText("Nhập file bản ghi (.json)")
 
     def toggle_detection(self) -> None:
         """Xử lý sự kiện nhấn nút Bắt đầu / Dừng hẳn"""
@@ -290,6 +528,7 @@ class MainWindow(QMainWindow):
             show_labels = self.ai_tab.show_labels.isChecked()
             show_boxes = self.ai_tab.show_boxes.isChecked()
             auto_save = self.ai_tab.auto_save.isChecked()
+            ocr_enabled = self.ai_tab.ocr_enabled.isChecked()
 
             self.video_thread = VideoThread(
                 source,
@@ -300,12 +539,22 @@ class MainWindow(QMainWindow):
                 show_labels,
                 show_boxes,
                 auto_save,
+                ocr_enabled,
+                self.watchlist,
+                self.archive,
+                self.timeseries,
+                self.metrics,
+                self.retention,
+                self.event_server,
+                self.scheduler,
             )
+            self.stats_dock.set_series(self.timeseries.series(stream_key(source)))
 
             self.video_thread.progress_signal.connect(self.update_notification)
             self.video_thread.detector_ready_signal.connect(self.save_detector)
             self.video_thread.change_pixmap_signal.connect(self.update_video)
             self.video_thread.new_detection_signal.connect(self.sidebar.add_card)
+            self.video_thread.watchlist_signal.connect(self.on_watchlist_hit)
             self.video_thread.stats_signal.connect(self.update_stats)
             self.video_thread.start()
 
@@ -379,10 +628,52 @@ class MainWindow(QMainWindow):
         self.source_tab.res_combo.setEnabled(False)
         print(f"[!] Lỗi lấy thông tin YouTube: {error_msg}")
 
+    def start_profiling(self) -> None:
+        """Lấy mẫu stack mọi luồng trong vài chục giây, ghi ra thư mục profiles"""
+        if self.profiler_thread is not None:
+            return
+        thread = ProfilerThread(SamplingProfiler(duration=DEFAULT_PROFILE_SECONDS))
+        thread.setParent(self)
+        self.profiler_thread = thread
+        self.profile_action.setEnabled(False)
+        self.status_bar.showMessage(
+            f"Đang lấy mẫu hiệu năng trong {DEFAULT_PROFILE_SECONDS:.0f} giây..."
+        )
+
+        def on_report(report: ProfileReport) -> None:
+            message = f"Đã lưu profile: {report.folded_path}"
+            if report.hottest:
+                message += f" | nóng nhất: {report.hottest[0].name}"
+            self.status_bar.showMessage(message, 15000)
+
+        def on_error(error_msg: str) -> None:
+            self.status_bar.showMessage(f"Lỗi lấy mẫu hiệu năng: {error_msg}")
+
+        def on_finished() -> None:
+            self.profiler_thread = None
+            self.profile_action.setEnabled(True)
+            thread.deleteLater()
+
+        thread.report_signal.connect(on_report)
+        thread.error_signal.connect(on_error)
+        thread.finished.connect(on_finished)
+        thread.start()
+
     def closeEvent(self, event: QCloseEvent | None) -> None:
         """Dừng luồng AI, Giải phóng Camera, Chấp nhận đóng, Tự động gọi"""
         self.save_settings()
         if self.video_thread is not None:
             self.video_thread.stop()
+        self.watchlist.stop()
+        self.archive.close()
+        self.retention.close()
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+        if self.event_server is not None:
+            self.event_server.stop()
+        if self.profiler_thread is not None:
+            # Dừng sớm vẫn ghi lại những mẫu đã lấy được
+            self.profiler_thread.profiler.stop()
+            self.profiler_thread.wait()
         if event:
             event.accept()
@@ -0,0 +1,152 @@
+import signal
+import sys
+from typing import Any
+
+from PyQt6.QtCore import QCoreApplication, QTimer
+
+from license_plate_monitor.ai.runtime import DEFAULT_PROFILE_PATH, RuntimeProfile
+from license_plate_monitor.ai.scheduler import InferenceScheduler, format_schedule
+from license_plate_monitor.analytics.timeseries import TimeSeriesStore
+from license_plate_monitor.analytics.watchlist import Watchlist
+from license_plate_monitor.perf.metrics import MetricsRegistry, MetricsServer
+from license_plate_monitor.storage.archive import DetectionArchive
+from license_plate_monitor.storage.retention import RetentionManager
+from license_plate_monitor.ui.threads import VideoThread
+from license_plate_monitor.utils.events import EventServer
+from license_plate_monitor.utils.recording import RECORDING_SUFFIX
+
+
+def guess_source_type(source: str) -> str:
+    """Loại nguồn của VideoThread suy ra từ đường dẫn/URL"""
+    lowered = source.strip().lower()
+    if lowered.isdigit():
+        return "webcam"
+    if lowered.endswith(RECORDING_SUFFIX):
+        return "replay"
+    if lowered.startswith(("rtsp://", "rtmp://")):
+        return "rtsp camera"
+    if "youtube.com" in lowered or "youtu.be" in lowered:
+        return "youtube"
+    if lowered.startswith(("http://", "https://")):
+        return "link mp4"
+    return "local file"
+
+
+def monitor_streams(
+    sources: list[str],
+    conf_threshold: float = 0.5,
+    auto_save: bool = True,
+    ocr_enabled: bool = False,
+    duration: float = 0.0,
+    metrics_port: int = 0,
+    events_address: str | None = None,
+    events_format: str = "ndjson",
+) -> None:
+    """
+    Theo dõi nhiều nguồn cùng lúc không cần giao diện. Mỗi nguồn chạy trên
+    VideoThread riêng với detector và tracker riêng; các luồng chỉ dùng chung
+    bộ lập lịch suy luận, archive, bộ dọn dẹp, metrics và danh sách theo dõi.
+    Dừng khi hết 'duration' giây (0 = chạy mãi), khi mọi nguồn kết thúc hoặc
+    khi nhấn Ctrl+C.
+    """
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+
+    watchlist = Watchlist()
+    watchlist.start()
+    archive = DetectionArchive()
+    retention = RetentionManager(archive=archive)
+    retention.start()
+    timeseries = TimeSeriesStore()
+    metrics = MetricsRegistry()
+    # Mỗi lượt suy luận chạy trên detector của luồng được cấp, nên số lượt
+    # chạy song song không bao giờ dùng chung một detector
+    profile = RuntimeProfile.load(DEFAULT_PROFILE_PATH)
+    scheduler = InferenceScheduler(profile.streams)
+    metrics.collectors.append(scheduler.render_metrics)
+    metrics_server: MetricsServer | None = None
+    if metrics_port > 0:
+        metrics_server = MetricsServer(metrics, metrics_port)
+        metrics_server.start()
+    events: EventServer | None = None
+    if events_address:
+        events = EventServer(events_address, events_format)
+        if not events.start():
+            events = None
+
+    threads: list[VideoThread] = []
+
+    def on_finished() -> None:
+        if all(thread.isFinished() for thread in threads):
+            app.quit()
+
+    for source in sources:
+        source_type = guess_source_type(source)
+        thread = VideoThread(
+            source,
+            source_type,
+            "best",
+            None,
+            conf_threshold,
+            False,
+            False,
+            auto_save,
+            ocr_enabled,
+            watchlist,
+            archive,
+            timeseries,
+            metrics,
+            retention,
+            events,
+            scheduler,
+            emit_frames=False,
+        )
+        name = thread.stream_name
+        thread.new_detection_signal.connect(
+            lambda det, name=name: _print_detection(name, det)
+        )
+        thread.watchlist_signal.connect(
+            lambda det, name=name: print(
+                f"[!] {name}: {det['plate']} khớp danh sách theo dõi lúc {det['time']}"
+            )
+        )
+        thread.finished.connect(on_finished)
+        threads.append(thread)
+        print(f"[*] {name}: {source_type} {source}")
+
+    def report() -> None:
+        for item in scheduler.report():
+            print(f"    {item.stream}: {format_schedule(item)}")
+
+    report_timer = QTimer()
+    report_timer.timeout.connect(report)
+    report_timer.start(10_000)
+    if duration > 0:
+        QTimer.singleShot(int(duration * 1000), app.quit)
+    # Vòng lặp Qt chạy trong C: timer ngắn để Python kịp xử lý Ctrl+C
+    signal.signal(signal.SIGINT, lambda *_: app.quit())
+    wake_timer = QTimer()
+    wake_timer.timeout.connect(lambda: None)
+    wake_timer.start(200)
+
+    for thread in threads:
+        thread.start()
+    try:
+        app.exec()
+    finally:
+        report_timer.stop()
+        wake_timer.stop()
+        for thread in threads:
+            thread.stop()
+        report()
+        watchlist.stop()
+        archive.close()
+        retention.close()
+        if metrics_server is not None:
+            metrics_server.stop()
+        if events is not None:
+            events.stop()
+
+
+def _print_detection(stream: str, det: dict[str, Any]) -> None:
+    plate = f" {det['plate']}" if det.get("plate") else ""
+    print(f"[+] {stream}: {det['label']}{plate} lúc {det['time']}")
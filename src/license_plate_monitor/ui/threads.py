@@ -1,19 +1,56 @@
 import os
+import queue
+import time
 from datetime import datetime
+from functools import partial
+from typing import Any
 
 import cv2
 from PyQt6.QtCore import QThread, pyqtSignal
 from PyQt6.QtGui import QImage
 
 from license_plate_monitor.ai.detector import LicensePlateDetector
+from license_plate_monitor.ai.ocr import OCRCallback, OCRConfig, PlateOCRPool
+from license_plate_monitor.ai.plate_votes import PlateVoteCache
+from license_plate_monitor.ai.reid import ReIDIndex
+from license_plate_monitor.ai.scheduler import InferenceScheduler, ScheduleConfig
+from license_plate_monitor.ai.tiling import TilingConfig
+from license_plate_monitor.ai.tracks import TrackRegistry
+from license_plate_monitor.analytics.counting import CountingConfig, ZoneCounter
+from license_plate_monitor.analytics.heatmap import DensityHeatmap, HeatmapConfig
+from license_plate_monitor.analytics.timeseries import TimeSeriesStore
+from license_plate_monitor.analytics.trajectory import (
+    GroundCalibration,
+    TrajectoryStore,
+    anchor_points,
+)
+from license_plate_monitor.analytics.watchlist import Watchlist
+from license_plate_monitor.config import load_stream_config, stream_key
+from license_plate_monitor.perf.metrics import MetricsRegistry
+from license_plate_monitor.perf.profiler import SamplingProfiler
+from license_plate_monitor.storage.archive import DetectionArchive, SearchQuery
+from license_plate_monitor.storage.clips import ClipConfig, ClipRecorder
+from license_plate_monitor.storage.retention import RetentionConfig, RetentionManager
+from license_plate_monitor.utils.events import (
+    EventServer,
+    counts_event,
+    detection_event,
+)
+from license_plate_monitor.utils.recording import ReplayCapture, ReplayConfig
 from license_plate_monitor.utils.youtube import cap_from_youtube, list_video_streams
 
+# Nguồn đọc từ file: thời gian theo video, chờ lượt suy luận thay vì bỏ frame
+# (bỏ frame làm kết quả phát lại khác nhau giữa các lần chạy)
+FILE_SOURCES = ("local file", "replay")
+
 
 class VideoThread(QThread):
     # Gửi thông tin đã xử lý về UI
     change_pixmap_signal = pyqtSignal(QImage)
     # Gửi dictionary chứa: ảnh cắt, tên loại xe, thời gian, độ tin cậy
     new_detection_signal = pyqtSignal(dict)
+    # Gửi kết quả nhận diện có biển số trùng danh sách theo dõi
+    watchlist_signal = pyqtSignal(dict)
     # Gửi data thống kê: {"car": 10, "bike": 5}
     stats_signal = pyqtSignal(dict)
     # Gửi lại đối tượng detector sau khi nạp thành công
@@ -31,6 +68,15 @@ class VideoThread(QThread):
         show_labels: bool = True,
         show_boxes: bool = True,
         auto_save: bool = False,
+        ocr_enabled: bool = False,
+        watchlist: Watchlist | None = None,
+        archive: DetectionArchive | None = None,
+        timeseries: TimeSeriesStore | None = None,
+        metrics: MetricsRegistry | None = None,
+        retention: RetentionManager | None = None,
+        events: EventServer | None = None,
+        scheduler: InferenceScheduler | None = None,
+        emit_frames: bool = True,
     ):
         super().__init__()
         self.source = source
@@ -45,7 +91,73 @@ class VideoThread(QThread):
         self.show_labels = show_labels
         self.show_boxes = show_boxes
         self.auto_save = auto_save
-        self.save_dir = "detections"
+        self.ocr_enabled = ocr_enabled
+        self.ocr_pool: PlateOCRPool | None = None
+        # Kết quả OCR từ worker, chờ luồng video xử lý để không phải khóa trạng thái
+        self._ocr_results: queue.SimpleQueue[tuple[OCRCallback, str, float]] = (
+            queue.SimpleQueue()
+        )
+        self.watchlist = watchlist
+        self.archive = archive
+        self.timeseries = timeseries
+        # Phát sự kiện cho chương trình khác qua socket cục bộ (nếu bật)
+        self.events = events
+        # Lượt suy luận dùng chung với các luồng khác khi máy quá tải
+        self.scheduler = scheduler
+        # Chạy không giao diện thì bỏ bước vẽ và chuyển frame sang QImage
+        self.emit_frames = emit_frames
+        # Tên ngắn của nguồn, dùng làm khóa luồng khi lưu trữ/thống kê
+        self.stream_name = stream_key(source)
+        # Mỗi luồng một thư mục ảnh để giới hạn dung lượng theo luồng
+        self.save_dir = os.path.join("detections", self.stream_name)
+        # Histogram thời gian từng bước của vòng lặp, theo tên luồng
+        self.metrics = (metrics or MetricsRegistry()).stream(self.stream_name)
+        # Cấu hình riêng của nguồn này trong config/streams.json (nếu có)
+        self.stream_config = load_stream_config(source)
+        self.schedule = ScheduleConfig.from_dict(self.stream_config.get("schedule", {}))
+        self.plate_votes = PlateVoteCache.from_dict(self.stream_config.get("ocr", {}))
+        # Xe đã rời khung hình nhưng còn lần đọc biển số đang chờ, theo track ID
+        self._awaiting_reads: dict[int, dict[str, Any]] = {}
+        # Đếm theo vạch/vùng nếu luồng có cấu hình, thay cho đếm theo track ID
+        counting = CountingConfig.from_dict(self.stream_config.get("counting", {}))
+        self.counter = ZoneCounter(counting) if counting.enabled else None
+        # Quỹ đạo các track và hiệu chỉnh mặt đường để ước lượng vận tốc
+        self.trajectories = TrajectoryStore.from_dict(
+            self.stream_config.get("trajectory", {})
+        )
+        self.calibration = GroundCalibration.from_dict(
+            self.stream_config.get("calibration", {})
+        )
+        # Bản đồ mật độ xe, nạp lại phần đã tích lũy từ lần chạy trước
+        heatmap = HeatmapConfig.from_dict(self.stream_config.get("heatmap", {}))
+        self.heatmap = (
+            DensityHeatmap(heatmap, self.stream_name) if heatmap.enabled else None
+        )
+        if self.heatmap is not None:
+            self.heatmap.load()
+        # Vòng đệm video để ghi clip quanh sự kiện (tạo khi luồng bắt đầu chạy)
+        self.clip_config = ClipConfig.from_dict(self.stream_config.get("clips", {}))
+        self.clips: ClipRecorder | None = None
+        # Giới hạn dung lượng/tuổi của ảnh và clip đã lưu của luồng này
+        self.retention = retention
+        if self.retention is not None:
+            self.retention.configure(
+                self.stream_name,
+                RetentionConfig.from_dict(self.stream_config.get("retention", {})),
+            )
+        self.frame_time = 0.0
+        # Thời điểm nhận frame hiện tại (perf_counter) và PTS của nguồn (giây)
+        self.capture_time = 0.0
+        self.frame_pts: float | None = None
+        # Số frame đã đọc và FPS khai báo của nguồn, dùng khi file không có PTS
+        self.frames_read = 0
+        self.source_fps = 0.0
+        # Kết quả phát ra chậm hơn ngân sách này (giây) sẽ bị đánh dấu
+        self.latency_budget = (
+            float(self.stream_config.get("latency", {}).get("budget_ms", 1000)) / 1000
+        )
+        # Nguồn phát lại bản ghi, giữ qua các lần kết nối lại để phát tiếp
+        self.replay: ReplayCapture | None = None
 
         if self.auto_save and not os.path.exists(self.save_dir):
             os.makedirs(self.save_dir)
@@ -60,7 +172,35 @@ class VideoThread(QThread):
         else:
             print("[*] Sử dụng Model đã nạp sẵn.")
 
-    def _setup_capture(self) -> cv2.VideoCapture:
+        self.detector.set_tiling(
+            TilingConfig.from_dict(self.stream_config.get("tiling", {}))
+        )
+        self.detector.reset_tracks(
+            TrackRegistry.from_dict(
+                self.stream_config.get("tracks", {}),
+                ReIDIndex.from_dict(self.stream_config.get("reid", {})),
+            )
+        )
+
+    def _initialize_ocr(self) -> None:
+        """Khởi chạy nhóm worker đọc biển số (mô hình OCR nạp trong worker)"""
+        if self.ocr_enabled and self.ocr_pool is None:
+            config = OCRConfig.from_dict(self.stream_config.get("ocr", {}))
+            self.ocr_pool = PlateOCRPool(config)
+
+    def _initialize_clips(self) -> None:
+        """Khởi chạy bộ ghi clip nếu luồng bật tính năng này"""
+        if self.clip_config.enabled and self.clips is None:
+            self.clips = ClipRecorder(
+                self.clip_config, self.stream_name, self._on_clip_written
+            )
+
+    def _on_clip_written(self, path: str, pinned: bool) -> None:
+        """Callback từ luồng ghi clip: đưa clip vào diện quản lý dung lượng"""
+        if self.retention is not None:
+            self.retention.add(self.stream_name, path, pinned)
+
+    def _setup_capture(self) -> cv2.VideoCapture | ReplayCapture:
         """Helper để khởi tạo cv2.VideoCapture dựa trên loại nguồn"""
         self.progress_signal.emit(f"Đang kết nối tới {self.source_type}...", 50)
 
@@ -74,13 +214,26 @@ class VideoThread(QThread):
         if self.source_type in ["local file", "link mp4", "rtsp camera"]:
             return cv2.VideoCapture(self.source)
 
+        if self.source_type == "replay":
+            if self.replay is None:
+                self.replay = ReplayCapture(
+                    self.source,
+                    ReplayConfig.from_dict(self.stream_config.get("replay", {})),
+                )
+                return self.replay
+            return self.replay.reconnect()
+
         raise ValueError(f"Nguồn '{self.source_type}' không được hỗ trợ.")
 
     def run(self) -> None:
         try:
             self._initialize_detector()
+            self._initialize_ocr()
+            self._initialize_clips()
 
             cap = self._setup_capture()
+            if self.scheduler is not None:
+                self.scheduler.register(self.stream_name, self.schedule)
 
             if not cap.isOpened():
                 error_msg = f"Không thể mở nguồn: {self.source_type}"
@@ -89,15 +242,20 @@ class VideoThread(QThread):
                 return
 
             self.progress_signal.emit("Bắt đầu nhận diện!", 100)
+            self.source_fps = float(cap.get(cv2.CAP_PROP_FPS))
 
             while self._run_flag:
                 if self._is_paused:
                     self.msleep(100)
                     continue
 
+                frame_start = time.perf_counter()
                 success, frame = cap.read()
 
-                if not success:
+                if not success or frame is None:
+                    if self.replay is not None and self.replay.finished:
+                        print("[*] Đã phát hết bản ghi.")
+                        break
                     print("[!] Mất kết nối. Đang thử kết nối lại...")
                     cap.release()
                     self.msleep(1000)
@@ -105,40 +263,70 @@ class VideoThread(QThread):
                     if not cap.isOpened():
                         continue
                     success, frame = cap.read()
-                    if not success:
+                    if not success or frame is None:
                         break
 
+                self.capture_time = self.metrics.lap("capture", frame_start)
+                self.frames_read += 1
                 h, w = frame.shape[:2]
+                pts = float(cap.get(cv2.CAP_PROP_POS_MSEC))
+                self.frame_pts = pts / 1000 if pts > 0 else None
+                self.frame_time = self._frame_time()
+                if self.clips is not None:
+                    # Frame gốc được nén ở luồng nền, không vẽ đè lên nó nữa
+                    self.clips.push(frame, self.frame_time)
 
                 # Xử lý frame bằng YOLO
                 if self.detector is None:
                     break
-                annotated_frame, detections = self.detector.process_frame(
-                    frame, self.conf_threshold, self.show_labels, self.show_boxes
+                if not self._acquire_slot():
+                    # Nhường lượt cho luồng ưu tiên cao hơn, bỏ frame này
+                    continue
+                try:
+                    annotated_frame, detections = self.detector.process_frame(
+                        frame,
+                        self.conf_threshold,
+                        self.show_labels,
+                        self.show_boxes,
+                        self.frame_time,
+                    )
+                finally:
+                    if self.scheduler is not None:
+                        self.scheduler.release()
+
+                timings = self.detector.timings
+                self.metrics.observe("inference", timings["inference"])
+                t = time.perf_counter()
+
+                tracks = self.detector.last_tracks
+                self.trajectories.update(
+                    tracks.ids,
+                    anchor_points(tracks.boxes),
+                    self.frame_time,
+                    self.calibration,
                 )
+                if self.heatmap is not None:
+                    self.heatmap.update(tracks.boxes, frame.shape, self.frame_time)
+                if self.counter is not None and self.counter.update(
+                    tracks, frame.shape
+                ):
+                    self._emit_stats(self.counter.summary())
+
+                self._drain_ocr_results()
+                self._request_plate_reads()
+                self._handle_detections(detections)
+                now = time.perf_counter()
+                self.metrics.observe("postprocess", timings["postprocess"] + now - t)
+                if not self.emit_frames:
+                    self.metrics.observe("frame", now - frame_start)
+                    continue
 
-                for det in detections:
-                    # Cập nhật thống kê xe
-                    label = det["label"]
-                    self.counts[label] = self.counts.get(label, 0) + 1
-                    self.stats_signal.emit(self.counts)
-
-                    # Gửi data về UI (bổ sung thêm timestamp tại thread)
-                    det["time"] = datetime.now().strftime("%H:%M:%S")
-
-                    if self.auto_save:
-                        try:
-                            # Tạo tên file: label_id_timestamp.png
-                            timestamp = datetime.now().strftime("%H%M%S_%f")[:-3]
-                            filename = f"{det['label']}_{det['id']}_{timestamp}.png"
-                            filepath = os.path.join(self.save_dir, filename)
-
-                            # Nếu ảnh là RGB cần chuyển lại BGR
-                            # cv2.cvtColor(det["image"], cv2.COLOR_RGB2BGR
-                            cv2.imwrite(filepath, det["image"])
-                        except Exception as e:
-                            print(f"Lỗi khi lưu ảnh: {e}")
-                    self.new_detection_signal.emit(det)
+                if self.counter is not None:
+                    if annotated_frame is frame:
+                        annotated_frame = frame.copy()
+                    self.counter.draw(annotated_frame)
+                t = time.perf_counter()
+                self.metrics.observe("annotate", timings["annotate"] + t - now)
 
                 # Chuyển đổi BGR (OpenCV) sang RGB (PyQt)
                 rgb_image = cv2.cvtColor(annotated_frame, cv2.COLOR_BGR2RGB)
@@ -146,10 +334,24 @@ class VideoThread(QThread):
                 h, w, ch = rgb_image.shape
                 #  Số byte trên mỗi dòng
                 bytes_per_line = rgb_image.strides[0]
+                # Stub của PyQt chỉ khai báo bytes, thực tế nhận mọi buffer
                 qt_image = QImage(
-                    rgb_image.data, w, h, bytes_per_line, QImage.Format.Format_RGB888
+                    rgb_image.data,  # type: ignore[call-overload]
+                    w,
+                    h,
+                    bytes_per_line,
+                    QImage.Format.Format_RGB888,
                 ).copy()
+                # Gắn thời điểm nhận frame vào ảnh để UI đo độ trễ tới lúc hiển thị
+                qt_image.setText("capture_time", repr(self.capture_time))
+                t = self.metrics.lap("convert", t)
                 self.change_pixmap_signal.emit(qt_image)
+                t = self.metrics.lap("emit", t)
+                self.metrics.observe("frame", t - frame_start)
+
+            # Nguồn kết thúc (hết file): phát nốt các xe còn đang được theo dõi
+            if self._run_flag and self.detector is not None:
+                self._handle_detections(self.detector.tracks.flush())
 
         except Exception as e:
             error_info = f"LỖI KHỞI TẠO: {str(e)}"
@@ -158,6 +360,194 @@ class VideoThread(QThread):
         finally:
             if "cap" in locals() and cap is not None:
                 cap.release()
+            if self.scheduler is not None:
+                self.scheduler.unregister(self.stream_name)
+            if self.ocr_pool is not None:
+                # Đang dừng hẳn thì bỏ qua phần OCR còn lại, hết file thì đọc nốt
+                self.ocr_pool.close(drain=self._run_flag)
+                self.ocr_pool = None
+            self._drain_ocr_results()
+            if self.clips is not None:
+                self.clips.close()
+                self.clips = None
+            if self.heatmap is not None:
+                self.heatmap.save()
+
+    def _frame_time(self) -> float:
+        """Thời điểm của frame (giây): theo video với file, theo đồng hồ với luồng"""
+        if self.source_type in FILE_SOURCES:
+            if self.frame_pts is not None:
+                return self.frame_pts
+            # Không có PTS: suy ra từ số frame và FPS, thiếu FPS thì lấy lúc nhận frame
+            if self.source_fps > 0:
+                return self.frames_read / self.source_fps
+            return self.capture_time
+        return time.monotonic()
+
+    def _request_plate_reads(self) -> None:
+        """Gửi OCR cho các track vừa có ảnh cắt tốt hơn, tới khi kết quả ổn định"""
+        if self.ocr_pool is None or self.detector is None:
+            return
+        tracks = self.detector.tracks
+        for track_id in tracks.improved:
+            state = tracks.get(track_id)
+            if state is None or state.best_crop is None:
+                continue
+            if self.plate_votes.request_read(track_id, state.best_score):
+                self.ocr_pool.submit(
+                    state.best_crop,
+                    self._on_video_thread(partial(self._on_vote_read, track_id)),
+                )
+
+    def _on_vote_read(self, track_id: int, text: str, conf: float) -> None:
+        """Thêm lần đọc vào bầu chọn; xe đã rời đi thì phát khi đủ kết quả"""
+        self.plate_votes.add_read(track_id, text, conf)
+        det = self._awaiting_reads.get(track_id)
+        if det is not None and not self.plate_votes.pending(track_id):
+            del self._awaiting_reads[track_id]
+            self._finish_detection(det)
+
+    def _on_video_thread(self, callback: OCRCallback) -> OCRCallback:
+        """Bọc callback OCR: worker chỉ xếp kết quả vào hàng đợi của luồng video"""
+        return lambda text, conf: self._ocr_results.put((callback, text, conf))
+
+    def _drain_ocr_results(self) -> None:
+        """Xử lý các kết quả OCR đã về, luôn chạy trên luồng video"""
+        while True:
+            try:
+                callback, text, conf = self._ocr_results.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                callback(text, conf)
+            except Exception as e:
+                print(f"[!] Lỗi xử lý kết quả OCR: {e}")
+
+    def _acquire_slot(self) -> bool:
+        """Chờ lượt suy luận; file và bản ghi chờ tới lượt, nguồn trực tiếp bỏ frame"""
+        if self.scheduler is None:
+            return True
+        start = time.perf_counter()
+        timeout = None if self.source_type in FILE_SOURCES else self.schedule.max_wait
+        granted = self.scheduler.acquire(self.stream_name, timeout)
+        self.metrics.lap("wait", start)
+        return granted
+
+    def _emit_stats(self, counts: dict[str, int]) -> None:
+        self.stats_signal.emit(counts)
+        if self.events is not None:
+            self.events.publish(counts_event(self.stream_name, dict(counts)))
+
+    def _handle_detections(self, detections: list[dict[str, Any]]) -> None:
+        """Cập nhật thống kê rồi chuyển các xe đã xác định sang bước đọc biển số"""
+        for det in detections:
+            # Cập nhật thống kê xe (khi không cấu hình vạch/vùng đếm)
+            if self.counter is None:
+                label = det["label"]
+                self.counts[label] = self.counts.get(label, 0) + 1
+                self._emit_stats(self.counts)
+            if self.timeseries is not None:
+                self.timeseries.add(self.stream_name, det["label"], time.time())
+
+            # Gửi data về UI (bổ sung thêm timestamp tại thread)
+            det["timestamp"] = time.time()
+            det["time"] = datetime.now().strftime("%H:%M:%S")
+            det["frame_time"] = self.frame_time
+            det["capture_time"] = self.capture_time
+            det["pts"] = self.frame_pts
+            speed = self.trajectories.speed(det["id"])
+            if speed is not None:
+                det["speed"] = round(speed, 1)
+
+            if self.plate_votes.pending(det["id"]):
+                # Chờ các lần đọc đang chạy thay vì gửi OCR trùng cho cùng ảnh
+                self._awaiting_reads[det["id"]] = det
+            else:
+                self._finish_detection(det)
+
+    def _finish_detection(self, det: dict[str, Any]) -> None:
+        """Gắn biển số đã bầu chọn, hoặc OCR ảnh tốt nhất nếu chưa đọc lần nào"""
+        # Biển số đã được bầu chọn qua nhiều frame trong lúc track còn sống
+        voted = self.plate_votes.finish(det["id"])
+        if voted is not None:
+            self._on_plate_read(det, *voted)
+        elif self.ocr_pool is None:
+            self._publish_detection(det)
+        else:
+            # Chưa có lần đọc nào: OCR ảnh tốt nhất trên worker riêng
+            self.ocr_pool.submit(
+                det["image"],
+                self._on_video_thread(partial(self._on_plate_read, det)),
+            )
+
+    def _on_plate_read(self, det: dict[str, Any], text: str, conf: float) -> None:
+        """Gắn biển số vào kết quả rồi lưu và gửi về UI"""
+        det["plate"] = text
+        det["plate_conf"] = conf
+        self._publish_detection(det)
+
+    def _publish_detection(self, det: dict[str, Any]) -> None:
+        """Đối chiếu danh sách theo dõi, lưu ảnh (nếu bật) và gửi kết quả về UI"""
+        if self.watchlist is not None and det.get("plate"):
+            matches = self.watchlist.lookup(det["plate"])
+            if matches:
+                det["watchlist"] = [m.to_dict() for m in matches]
+
+        clips = self.clips
+        if clips is not None and (
+            det.get("watchlist") or det["label"] in self.clip_config.trigger_labels
+        ):
+            # Ghi đoạn video quanh lúc xe hiện rõ nhất (ảnh cắt tốt nhất), không
+            # phải lúc track kết thúc sau khi xe đã rời khung hình
+            name = f"{det['label']}_{det['id']}_{datetime.now():%Y%m%d_%H%M%S}"
+            # Clip của xe trong danh sách theo dõi được ghim khi ghi xong
+            det["clip"] = clips.trigger(
+                name,
+                det.get("best_time", self.frame_time),
+                pinned=bool(det.get("watchlist")),
+            )
+
+        filepath = ""
+        if self.auto_save:
+            try:
+                # Tạo tên file: label_id[_plate]_timestamp.png
+                timestamp = datetime.now().strftime("%H%M%S_%f")[:-3]
+                plate = f"_{det['plate']}" if det.get("plate") else ""
+                filename = f"{det['label']}_{det['id']}{plate}_{timestamp}.png"
+                filepath = os.path.join(self.save_dir, filename)
+
+                # Nếu ảnh là RGB cần chuyển lại BGR
+                # cv2.cvtColor(det["image"], cv2.COLOR_RGB2BGR
+                start = time.perf_counter()
+                cv2.imwrite(filepath, det["image"])
+                self.metrics.lap("disk", start)
+                if self.retention is not None:
+                    # Ảnh xe trong danh sách theo dõi không bao giờ bị xóa tự động
+                    self.retention.add(
+                        self.stream_name, filepath, bool(det.get("watchlist"))
+                    )
+            except Exception as e:
+                print(f"Lỗi khi lưu ảnh: {e}")
+                filepath = ""
+        if self.archive is not None:
+            # Lưu metadata để tra cứu lịch sử theo biển số, thời gian, luồng
+            self.archive.add(det, self.stream_name, filepath)
+        self._check_latency(det)
+        if self.events is not None:
+            # Ảnh gửi theo đường dẫn file đã lưu (None nếu không bật lưu ảnh)
+            self.events.publish(detection_event(det, self.stream_name, filepath))
+        self.new_detection_signal.emit(det)
+        if det.get("watchlist"):
+            self.watchlist_signal.emit(det)
+
+    def _check_latency(self, det: dict[str, Any]) -> None:
+        """Độ trễ từ lúc nhận frame tới lúc phát kết quả (gồm cả chờ OCR)"""
+        latency = time.perf_counter() - det.get("capture_time", self.capture_time)
+        self.metrics.observe("detection", latency)
+        det["latency_ms"] = round(latency * 1000, 1)
+        if latency > self.latency_budget:
+            det["over_budget"] = True
+            self.metrics.over_budget += 1
 
     def pause(self) -> None:
         self._is_paused = True
@@ -188,3 +578,38 @@ class YoutubeInfoThread(QThread):
             self.resolutions_signal.emit(resolutions.tolist())
         except Exception as e:
             self.error_signal.emit(str(e))
+
+
+class ArchiveSearchThread(QThread):
+    # Gửi về một trang kết quả (list ArchiveRecord)
+    results_signal = pyqtSignal(list)
+    # Gửi về lỗi
+    error_signal = pyqtSignal(str)
+
+    def __init__(self, archive: DetectionArchive, query: SearchQuery):
+        super().__init__()
+        self.archive = archive
+        self.query = query
+
+    def run(self) -> None:
+        try:
+            self.results_signal.emit(self.archive.search(self.query))
+        except Exception as e:
+            self.error_signal.emit(str(e))
+
+
+class ProfilerThread(QThread):
+    # Gửi về ProfileReport khi lấy mẫu xong
+    report_signal = pyqtSignal(object)
+    # Gửi về lỗi
+    error_signal = pyqtSignal(str)
+
+    def __init__(self, profiler: SamplingProfiler):
+        super().__init__()
+        self.profiler = profiler
+
+    def run(self) -> None:
+        try:
+            self.report_signal.emit(self.profiler.run())
+        except Exception as e:
+            self.error_signal.emit(str(e))
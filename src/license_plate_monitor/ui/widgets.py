@@ -1,7 +1,17 @@
+import time
+from datetime import datetime
 from typing import Any, cast
 
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QImage, QPixmap
+from PyQt6.QtCore import QSize, Qt, QTimer, pyqtSignal
+from PyQt6.QtGui import (
+    QColor,
+    QIcon,
+    QImage,
+    QPainter,
+    QPaintEvent,
+    QPixmap,
+    QResizeEvent,
+)
 from PyQt6.QtWidgets import (
     QComboBox,
     QDockWidget,
@@ -10,11 +20,15 @@ from PyQt6.QtWidgets import (
     QHBoxLayout,
     QLabel,
     QLineEdit,
+    QListWidget,
+    QListWidgetItem,
     QScrollArea,
     QVBoxLayout,
     QWidget,
 )
 
+from license_plate_monitor.analytics.timeseries import TrafficSeries
+from license_plate_monitor.storage.archive import ArchiveRecord, SearchQuery
 from license_plate_monitor.ui.utils import StyledButton, StyledCheckBox, StyledSpinBox
 
 
@@ -39,6 +53,12 @@ class DetectionCard(QFrame):
             }
         """)
 
+        # Viền đỏ cho xe nằm trong danh sách theo dõi
+        if data.get("watchlist"):
+            self.setStyleSheet(
+                self.styleSheet() + "DetectionCard { border: 2px solid #c62828; }"
+            )
+
         layout = QHBoxLayout(self)
         layout.setContentsMargins(10, 10, 10, 10)
 
@@ -65,14 +85,32 @@ class DetectionCard(QFrame):
         id_label = QLabel(f"<b>ID: {data['id']}</b> | {data['label'].upper()}")
         id_label.setStyleSheet("color: #3498db; font-size: 13px; margin-left: 10px;")
 
-        conf_label = QLabel(f"Độ tin cậy: {data['conf']:.2f}")
+        conf_text = f"Độ tin cậy: {data['conf']:.2f}"
+        if data.get("speed") is not None:
+            conf_text += f" | {data['speed']:.0f} km/h"
+        if data.get("over_budget"):
+            conf_text += f" | ⏱ trễ {data['latency_ms']:.0f} ms"
+        conf_label = QLabel(conf_text)
         conf_label.setStyleSheet("color: #bbb; font-size: 11px; margin-left: 10px;")
 
         time_label = QLabel(f"{data['time']}")
         time_label.setStyleSheet("color: #888; font-size: 11px; margin-left: 10px;")
 
         info_layout.addWidget(id_label)
+        if data.get("plate"):
+            plate_label = QLabel(f"{data['plate']} ({data['plate_conf']:.2f})")
+            plate_label.setStyleSheet(
+                "color: #FFD54F; font-size: 13px; font-weight: bold; margin-left: 10px;"
+            )
+            info_layout.addWidget(plate_label)
         info_layout.addWidget(conf_label)
+        if data.get("watchlist"):
+            match = data["watchlist"][0]
+            watch_label = QLabel(f"⚠ {match['list']}: {match['plate']}")
+            watch_label.setStyleSheet(
+                "color: #FF5555; font-size: 11px; font-weight: bold; margin-left: 10px;"
+            )
+            info_layout.addWidget(watch_label)
         info_layout.addWidget(time_label)
 
         layout.addWidget(img_label)
@@ -129,7 +167,7 @@ class SourceTab(QWidget):
         layout.setVerticalSpacing(10)
 
         self.combo = QComboBox()
-        self.combo.addItems(["YouTube", "Webcam", "Local File", "RTSP"])
+        self.combo.addItems(["YouTube", "Webcam", "Local File", "RTSP", "Replay"])
         self.combo.setSizeAdjustPolicy(QComboBox.SizeAdjustPolicy.AdjustToContents)
 
         self.input = QLineEdit()
@@ -164,6 +202,11 @@ class AISettingTab(QWidget):
         self.auto_save.setToolTip("Lưu ảnh cắt biển số vào thư mục 'detections'")
         self.auto_save.setChecked(True)
 
+        self.ocr_enabled = StyledCheckBox("Đọc biển số (OCR)")
+        self.ocr_enabled.setToolTip(
+            "Cần cài đặt gói tùy chọn: uv pip install -e .[ocr]"
+        )
+
         self.reset_btn = StyledButton("Đặt lại mặc định", hover_color="#c62828")
         self.reset_btn.update_style("margin-top: 10px")
 
@@ -172,6 +215,7 @@ class AISettingTab(QWidget):
         layout.addWidget(self.show_labels)
         layout.addWidget(self.show_boxes)
         layout.addWidget(self.auto_save)
+        layout.addWidget(self.ocr_enabled)
         layout.addWidget(self.reset_btn)
         layout.addStretch()
 
@@ -188,9 +232,143 @@ class SettingsDock(QDockWidget):
         )
 
 
+class TrafficChart(QWidget):
+    """
+    Biểu đồ cột chồng số xe theo thời gian. Cột được vẽ lên pixmap đệm; mỗi lần
+    làm mới chỉ cuộn pixmap và vẽ lại các cột mới, trừ khi phải đổi thang đo.
+    """
+
+    BAR_WIDTH = 4
+    COLORS = ["#3498db", "#2ecc71", "#f1c40f", "#e67e22", "#9b59b6", "#1abc9c"]
+    BACKGROUND = "#252525"
+
+    def __init__(self, parent: QWidget | None = None) -> None:
+        super().__init__(parent)
+        self.setMinimumSize(240, 90)
+        self.series: TrafficSeries | None = None
+        self.resolution = 1
+        self._pixmap = QPixmap()
+        # Khung thời gian của cột ngoài cùng bên phải đã vẽ
+        self._last_slot: int | None = None
+        # Số xe ứng với toàn bộ chiều cao, tăng gấp đôi khi bị vượt
+        self._scale = 4
+        self._labels: list[str] = []
+
+    def set_series(self, series: TrafficSeries | None, resolution: int = 1) -> None:
+        self.series = series
+        self.resolution = resolution
+        self._scale = 4
+        self._redraw_all()
+
+    def _columns(self) -> int:
+        return max(1, self.width() // self.BAR_WIDTH)
+
+    def _draw_columns(
+        self, painter: QPainter, first_slot: int, counts: Any, now_slot: int
+    ) -> None:
+        """Vẽ các cột từ 'first_slot', cột của 'now_slot' nằm sát mép phải"""
+        height = self._pixmap.height()
+        for i, row in enumerate(counts):
+            slot = first_slot + i
+            x = self.width() - (now_slot - slot + 1) * self.BAR_WIDTH
+            painter.fillRect(x, 0, self.BAR_WIDTH, height, QColor(self.BACKGROUND))
+            y = height
+            for c, value in enumerate(row.tolist()):
+                if value <= 0:
+                    continue
+                bar = max(1, round(value / self._scale * height))
+                y -= bar
+                color = QColor(self.COLORS[c % len(self.COLORS)])
+                painter.fillRect(x, y, self.BAR_WIDTH - 1, bar, color)
+
+    def _fit_scale(self, peak: int) -> bool:
+        """Nới thang đo nếu cột cao nhất vượt khung, trả về True nếu đã đổi"""
+        changed = False
+        while peak > self._scale:
+            self._scale *= 2
+            changed = True
+        return changed
+
+    def _redraw_all(self) -> None:
+        self._pixmap = QPixmap(self.size())
+        self._pixmap.fill(QColor(self.BACKGROUND))
+        self._last_slot = None
+        if self.series is None or self.width() <= 0:
+            self.update()
+            return
+
+        now_slot = int(time.time() // self.resolution)
+        first_slot = now_slot - self._columns() + 1
+        window = self.series.query(
+            first_slot * self.resolution,
+            now_slot * self.resolution,
+            self.resolution,
+        )
+        if len(window.counts):
+            self._fit_scale(int(window.counts.sum(axis=1).max()))
+        self._labels = window.labels
+        painter = QPainter(self._pixmap)
+        self._draw_columns(painter, first_slot, window.counts, now_slot)
+        painter.end()
+        self._last_slot = now_slot
+        self.update()
+
+    def refresh(self) -> None:
+        """Cuộn biểu đồ tới thời điểm hiện tại, chỉ vẽ lại các cột thay đổi"""
+        if self.series is None:
+            return
+        now_slot = int(time.time() // self.resolution)
+        last_slot = self._last_slot
+        if (
+            last_slot is None
+            or self._pixmap.size() != self.size()
+            or now_slot - last_slot >= self._columns()
+        ):
+            self._redraw_all()
+            return
+
+        # Cột cuối lần trước có thể đã nhận thêm số đếm nên vẽ lại cả cột đó
+        window = self.series.query(
+            last_slot * self.resolution,
+            now_slot * self.resolution,
+            self.resolution,
+        )
+        peak = int(window.counts.sum(axis=1).max()) if len(window.counts) else 0
+        if self._fit_scale(peak) or window.labels != self._labels:
+            self._redraw_all()
+            return
+
+        shift = (now_slot - last_slot) * self.BAR_WIDTH
+        if shift:
+            self._pixmap.scroll(-shift, 0, self._pixmap.rect())
+        painter = QPainter(self._pixmap)
+        self._draw_columns(painter, last_slot, window.counts, now_slot)
+        painter.end()
+        self._last_slot = now_slot
+        self.update()
+
+    def resizeEvent(self, event: QResizeEvent | None) -> None:
+        self._redraw_all()
+
+    def paintEvent(self, event: QPaintEvent | None) -> None:
+        painter = QPainter(self)
+        painter.drawPixmap(0, 0, self._pixmap)
+        # Chú thích loại xe và thang đo
+        x = 6
+        for c, label in enumerate(self._labels):
+            painter.setPen(QColor(self.COLORS[c % len(self.COLORS)]))
+            painter.drawText(x, 14, label.upper())
+            x += painter.fontMetrics().horizontalAdvance(label.upper()) + 12
+        painter.setPen(QColor("#888"))
+        painter.drawText(x, 14, f"max {self._scale}/{self.resolution}s")
+        painter.end()
+
+
 class StatsDock(QDockWidget):
     """Dock hiển thị thông tin thống kê số lượng phương tiện"""
 
+    RESOLUTIONS = {"Theo giây": 1, "Theo phút": 60, "Theo giờ": 3600}
+
     def __init__(self, parent: QWidget | None = None) -> None:
         super().__init__("Thống kê dữ liệu", parent)
 
@@ -213,6 +391,148 @@ class StatsDock(QDockWidget):
         )
         layout.addWidget(self.stats_label)
 
+        # Biểu đồ số xe theo thời gian, chọn tầng giây/phút/giờ
+        self.resolution_combo = QComboBox()
+        self.resolution_combo.addItems(list(self.RESOLUTIONS))
+        self.chart = TrafficChart()
+        layout.addWidget(self.resolution_combo)
+        layout.addWidget(self.chart, stretch=1)
+
+        self.resolution_combo.currentTextChanged.connect(self._on_resolution_changed)
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.chart.refresh)
+        self.refresh_timer.start(1000)
+
+    def set_series(self, series: TrafficSeries | None) -> None:
+        """Hiển thị chuỗi thời gian của luồng đang chạy"""
+        resolution = self.RESOLUTIONS[self.resolution_combo.currentText()]
+        self.chart.set_series(series, resolution)
+
+    def _on_resolution_changed(self, text: str) -> None:
+        self.chart.set_series(self.chart.series, self.RESOLUTIONS[text])
+
     def update_text(self, text: str) -> None:
         """Cập nhật nội dung hiển thị"""
         self.stats_label.setText(text)
+
+
+class HistoryDock(QDockWidget):
+    """Dock tra cứu lịch sử nhận diện theo biển số, thời gian và luồng"""
+
+    # Người dùng bấm tìm kiếm (trang đầu) hoặc cuộn gần cuối danh sách (trang sau)
+    search_requested = pyqtSignal()
+    more_requested = pyqtSignal()
+
+    # Nhãn khoảng thời gian -> số giây tính lùi từ hiện tại (None = tất cả)
+    TIME_RANGES: dict[str, int | None] = {
+        "1 giờ qua": 3600,
+        "24 giờ qua": 86400,
+        "7 ngày qua": 7 * 86400,
+        "30 ngày qua": 30 * 86400,
+        "Tất cả": None,
+    }
+    ALL_STREAMS = "Tất cả luồng"
+
+    def __init__(self, parent: QWidget | None = None) -> None:
+        super().__init__("Tra cứu lịch sử", parent)
+        self.setAllowedAreas(Qt.DockWidgetArea.AllDockWidgetAreas)
+        self.setFeatures(
+            QDockWidget.DockWidgetFeature.DockWidgetClosable
+            | QDockWidget.DockWidgetFeature.DockWidgetMovable
+            | QDockWidget.DockWidgetFeature.DockWidgetFloatable
+        )
+
+        self.inner_widget = QWidget()
+        self.setWidget(self.inner_widget)
+        layout = QVBoxLayout(self.inner_widget)
+
+        self.pattern_input = QLineEdit()
+        self.pattern_input.setPlaceholderText("Biển số, vd: 51F-12?45 hoặc 51F*")
+        self.pattern_input.setToolTip("'?' thay một ký tự, '*' thay chuỗi bất kỳ")
+
+        self.range_combo = QComboBox()
+        self.range_combo.addItems(list(self.TIME_RANGES))
+        self.stream_combo = QComboBox()
+        self.stream_combo.addItem(self.ALL_STREAMS)
+        self.search_btn = StyledButton("Tìm kiếm")
+
+        filter_layout = QHBoxLayout()
+        filter_layout.addWidget(self.range_combo)
+        filter_layout.addWidget(self.stream_combo)
+        filter_layout.addWidget(self.search_btn)
+
+        self.results = QListWidget()
+        self.results.setIconSize(QSize(64, 48))
+        self.results.setStyleSheet("color: white; background-color: #252525;")
+        self.status_label = QLabel("")
+        self.status_label.setStyleSheet("color: #aaa;")
+
+        layout.addWidget(self.pattern_input)
+        layout.addLayout(filter_layout)
+        layout.addWidget(self.results)
+        layout.addWidget(self.status_label)
+
+        # Trạng thái phân trang: khóa (ts, id) của bản ghi cuối đã hiển thị
+        self.last_key: tuple[float, int] | None = None
+        self.has_more = False
+        self.loading = False
+
+        self.search_btn.clicked.connect(self.search_requested)
+        self.pattern_input.returnPressed.connect(self.search_requested)
+        scrollbar = self.results.verticalScrollBar()
+        if scrollbar:
+            scrollbar.valueChanged.connect(self._on_scroll)
+
+    def _on_scroll(self, value: int) -> None:
+        """Nạp thêm trang khi cuộn gần cuối danh sách"""
+        scrollbar = self.results.verticalScrollBar()
+        if scrollbar is None or not self.has_more or self.loading:
+            return
+        if value >= scrollbar.maximum() - 5:
+            self.more_requested.emit()
+
+    def build_query(self, next_page: bool = False, limit: int = 50) -> SearchQuery:
+        """Tạo truy vấn từ các bộ lọc hiện tại"""
+        seconds = self.TIME_RANGES[self.range_combo.currentText()]
+        stream = self.stream_combo.currentText()
+        return SearchQuery(
+            pattern=self.pattern_input.text(),
+            since=time.time() - seconds if seconds is not None else None,
+            streams=None if stream == self.ALL_STREAMS else [stream],
+            limit=limit,
+            after=self.last_key if next_page else None,
+        )
+
+    def set_streams(self, streams: list[str]) -> None:
+        """Cập nhật danh sách luồng để lọc, giữ lựa chọn hiện tại"""
+        current = self.stream_combo.currentText()
+        self.stream_combo.clear()
+        self.stream_combo.addItems([self.ALL_STREAMS, *streams])
+        self.stream_combo.setCurrentText(current)
+
+    def clear_results(self) -> None:
+        self.results.clear()
+        self.last_key = None
+        self.has_more = False
+        self.status_label.setText("Đang tìm...")
+
+    def append_results(self, records: list[ArchiveRecord], limit: int) -> None:
+        """Thêm một trang kết quả vào cuối danh sách"""
+        for record in records:
+            when = datetime.fromtimestamp(record.ts).strftime("%d/%m %H:%M:%S")
+            plate = record.plate or "(chưa đọc)"
+            text = f"{plate}  |  {record.label.upper()}  |  {when}\n{record.stream}"
+            item = QListWidgetItem(text)
+            if record.path:
+                # QIcon chỉ đọc ảnh khi mục được vẽ lên màn hình
+                item.setIcon(QIcon(record.path))
+                item.setToolTip(record.path)
+            self.results.addItem(item)
+
+        if records:
+            self.last_key = (records[-1].ts, records[-1].id)
+        self.has_more = len(records) == limit
+        self.status_label.setText(
+            f"{self.results.count()} kết quả"
+            + (" (cuộn để xem thêm)" if self.has_more else "")
+        )
@@ -1,3 +1,30 @@
-from .youtube import VideoStream, cap_from_youtube, list_video_streams
+from .events import EventServer, counts_event, detection_event, encode_event
+from .recording import (
+    Recording,
+    ReplayCapture,
+    ReplayConfig,
+    StreamRecorder,
+    load_recording,
+)
+from .youtube import (
+    VideoStream,
+    cap_from_youtube,
+    list_video_streams,
+    youtube_stream_url,
+)
 
-__all__ = ["cap_from_youtube", "list_video_streams", "VideoStream"]
+__all__ = [
+    "cap_from_youtube",
+    "counts_event",
+    "detection_event",
+    "encode_event",
+    "EventServer",
+    "list_video_streams",
+    "load_recording",
+    "Recording",
+    "ReplayCapture",
+    "ReplayConfig",
+    "StreamRecorder",
+    "VideoStream",
+    "youtube_stream_url",
+]
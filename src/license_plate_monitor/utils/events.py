@@ -0,0 +1,293 @@
+import json
+import logging
+import os
+import selectors
+import socket
+import struct
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+EVENT_FORMATS = ("ndjson", "binary")
+# Khung nhị phân: độ dài phần sau (4 byte) + loại sự kiện (1 byte) + JSON gọn
+FRAME_HEADER = struct.Struct("!IB")
+EVENT_TYPES = {"detection": 1, "counts": 2}
+# Các trường của kết quả nhận diện được gửi đi (ảnh chỉ gửi đường dẫn)
+DETECTION_FIELDS = (
+    "label",
+    "conf",
+    "plate",
+    "plate_conf",
+    "speed",
+    "watchlist",
+    "clip",
+    "latency_ms",
+    "pts",
+)
+
+
+def parse_address(address: str) -> tuple[int, Any]:
+    """
+    "unix:/tmp/lpm.sock" -> socket Unix, "tcp:127.0.0.1:8765" hoặc
+    "127.0.0.1:8765" -> TCP, chỉ có cổng ("8765") -> TCP trên 127.0.0.1
+    """
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[5:]
+    address = address.removeprefix("tcp:")
+    host, _, port = address.rpartition(":")
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def detection_event(det: dict[str, Any], stream: str, crop: str) -> dict[str, Any]:
+    event: dict[str, Any] = {
+        "type": "detection",
+        "stream": stream,
+        "ts": det.get("timestamp", time.time()),
+        "track_id": int(det["id"]),
+        "crop": crop or None,
+    }
+    for key in DETECTION_FIELDS:
+        if key in det:
+            event[key] = det[key]
+    return event
+
+
+def counts_event(stream: str, counts: dict[str, int]) -> dict[str, Any]:
+    return {"type": "counts", "stream": stream, "ts": time.time(), "counts": counts}
+
+
+def _json_default(value: Any) -> Any:
+    # Số kiểu numpy (np.float32...) có .item(), còn lại đổi sang chuỗi
+    return value.item() if hasattr(value, "item") else str(value)
+
+
+def encode_event(event: dict[str, Any], fmt: str) -> bytes:
+    body = json.dumps(
+        event, separators=(",", ":"), ensure_ascii=False, default=_json_default
+    ).encode("utf-8")
+    if fmt == "binary":
+        kind = EVENT_TYPES.get(event.get("type", ""), 0)
+        return FRAME_HEADER.pack(len(body) + 1, kind) + body
+    return body + b"\n"
+
+
+@dataclass
+class Subscriber:
+    sock: socket.socket
+    name: str
+    # Dữ liệu chưa gửi được; vượt giới hạn thì ngắt kết nối subscriber này
+    buffer: bytearray = field(default_factory=bytearray)
+    sent: int = 0
+    writing: bool = False
+
+
+class EventServer:
+    """
+    Phát sự kiện nhận diện và số đếm cho các chương trình khác trên máy,
+    dạng JSON mỗi dòng hoặc khung nhị phân, qua socket Unix hoặc TCP cục bộ.
+    Luồng video chỉ thêm dict vào hàng đợi; một luồng nền mã hóa mỗi sự kiện
+    một lần, gom cả lô và ghi không chặn cho từng subscriber. Subscriber đọc
+    chậm tới mức bộ đệm vượt 'max_buffer' bị ngắt thay vì làm chậm các bên khác.
+    """
+
+    def __init__(
+        self,
+        address: str,
+        fmt: str = "ndjson",
+        max_buffer: int = 4 * 1024 * 1024,
+        max_pending: int = 65536,
+        batch_size: int = 256,
+    ):
+        if fmt not in EVENT_FORMATS:
+            raise ValueError(f"Định dạng sự kiện không hợp lệ: {fmt}")
+        self.address = address
+        self.format = fmt
+        self.max_buffer = max_buffer
+        self.max_pending = max_pending
+        # Số sự kiện tối đa gom vào một lần ghi cho mỗi subscriber
+        self.batch_size = batch_size
+        self._pending: deque[dict[str, Any]] = deque()
+        self._subscribers: dict[int, Subscriber] = {}
+        self._selector = selectors.DefaultSelector()
+        self._listener: socket.socket | None = None
+        # Cặp socket để đánh thức luồng nền khi có sự kiện mới
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._signaled = False
+        self._running = False
+        self._thread: threading.Thread | None = None
+        self.published = 0
+        self.dropped = 0
+        self.disconnected = 0
+
+    def start(self) -> bool:
+        """Mở socket, trả về False (và chỉ ghi log) nếu không mở được"""
+        try:
+            family, target = parse_address(self.address)
+            if family == socket.AF_UNIX and os.path.exists(target):
+                # Socket cũ còn sót lại từ lần chạy trước
+                os.unlink(target)
+            listener = socket.socket(family, socket.SOCK_STREAM)
+            if family == socket.AF_INET:
+                listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            listener.bind(target)
+            listener.listen(16)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Không mở được luồng sự kiện {self.address}: {e}")
+            return False
+        listener.setblocking(False)
+        self._listener = listener
+        self._selector.register(listener, selectors.EVENT_READ, "accept")
+        self._selector.register(self._wake_r, selectors.EVENT_READ, "wake")
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._serve, name="event-stream", daemon=True
+        )
+        self._thread.start()
+        print(f"[*] Luồng sự kiện ({self.format}): {self.address}")
+        return True
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event: dict[str, Any]) -> None:
+        """Xếp sự kiện vào hàng đợi, không bao giờ chặn; không ai nghe thì bỏ qua"""
+        if not self._subscribers:
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append(event)
+        if not self._signaled:
+            self._signaled = True
+            try:
+                self._wake_w.send(b"\0")
+            except (BlockingIOError, OSError):
+                pass
+
+    def stop(self) -> None:
+        self._running = False
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        for sub in list(self._subscribers.values()):
+            self._drop(sub)
+        if self._listener is not None:
+            family, target = parse_address(self.address)
+            self._listener.close()
+            self._listener = None
+            if family == socket.AF_UNIX and os.path.exists(target):
+                os.unlink(target)
+        self._selector.close()
+        self._wake_r.close()
+        self._wake_w.close()
+
+    def _serve(self) -> None:
+        while self._running:
+            # Còn sự kiện chờ thì chỉ ghé qua socket rồi gửi lô tiếp theo
+            timeout = 0.0 if self._pending else 1.0
+            for key, mask in self._selector.select(timeout=timeout):
+                if key.data == "accept":
+                    self._accept()
+                elif key.data == "wake":
+                    self._wake()
+                else:
+                    sub = self._subscribers.get(key.fd)
+                    if sub is None:
+                        continue
+                    if mask & selectors.EVENT_READ:
+                        self._read(sub)
+                    if mask & selectors.EVENT_WRITE and key.fd in self._subscribers:
+                        self._flush(sub)
+            if self._pending:
+                self._dispatch()
+
+    def _accept(self) -> None:
+        assert self._listener is not None
+        try:
+            sock, peer = self._listener.accept()
+        except BlockingIOError:
+            return
+        sock.setblocking(False)
+        sub = Subscriber(sock, str(peer) or "unix")
+        self._subscribers[sock.fileno()] = sub
+        self._selector.register(sock, selectors.EVENT_READ, "subscriber")
+        logger.info(f"Subscriber mới: {sub.name}")
+
+    def _wake(self) -> None:
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except BlockingIOError:
+            pass
+        # Xóa cờ trước khi lấy sự kiện để không lỡ sự kiện đến giữa chừng
+        self._signaled = False
+
+    def _dispatch(self) -> None:
+        """Mã hóa một lô sự kiện một lần rồi chép vào bộ đệm của mọi subscriber"""
+        batch: list[bytes] = []
+        while self._pending and len(batch) < self.batch_size:
+            event = self._pending.popleft()
+            try:
+                batch.append(encode_event(event, self.format))
+            except (TypeError, ValueError) as e:
+                logger.error(f"Không mã hóa được sự kiện: {e}")
+        if not batch:
+            return
+        data = b"".join(batch)
+        self.published += len(batch)
+        for sub in list(self._subscribers.values()):
+            if len(sub.buffer) + len(data) > self.max_buffer:
+                logger.warning(f"Ngắt subscriber đọc chậm: {sub.name}")
+                self._drop(sub)
+                continue
+            sub.buffer += data
+            self._flush(sub)
+
+    def _read(self, sub: Subscriber) -> None:
+        # Subscriber không cần gửi gì; đọc để phát hiện khi họ ngắt kết nối
+        try:
+            if not sub.sock.recv(4096):
+                self._drop(sub)
+        except BlockingIOError:
+            pass
+        except OSError:
+            self._drop(sub)
+
+    def _flush(self, sub: Subscriber) -> None:
+        """Gửi hết mức socket nhận được, phần còn lại chờ socket ghi được"""
+        try:
+            while sub.buffer:
+                sent = sub.sock.send(sub.buffer)
+                del sub.buffer[:sent]
+                sub.sent += sent
+        except BlockingIOError:
+            pass
+        except OSError:
+            self._drop(sub)
+            return
+        writing = bool(sub.buffer)
+        if writing != sub.writing:
+            sub.writing = writing
+            mask = selectors.EVENT_READ | (selectors.EVENT_WRITE if writing else 0)
+            self._selector.modify(sub.sock, mask, "subscriber")
+
+    def _drop(self, sub: Subscriber) -> None:
+        fd = sub.sock.fileno()
+        if self._subscribers.pop(fd, None) is None:
+            return
+        self.disconnected += 1
+        try:
+            self._selector.unregister(sub.sock)
+        except (KeyError, ValueError):
+            pass
+        sub.sock.close()
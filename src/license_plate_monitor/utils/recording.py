@@ -0,0 +1,372 @@
+import json
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from typing import Any
+
+import cv2
+import numpy.typing as npt
+
+from license_plate_monitor.config import stream_key
+from license_plate_monitor.utils.youtube import youtube_stream_url
+
+logger = logging.getLogger(__name__)
+
+RECORDINGS_DIR = "recordings"
+# File mô tả bản ghi, nằm cạnh các đoạn video
+RECORDING_SUFFIX = ".json"
+
+
+@dataclass
+class RecordingSegment:
+    """Một lần kết nối liên tục tới nguồn, lưu thành một file video"""
+
+    file: str
+    # Thời điểm bắt đầu đoạn (giây) tính từ lúc bắt đầu ghi
+    offset: float
+    duration: float = 0.0
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "RecordingSegment":
+        """Factory method để tạo RecordingSegment từ một mục "segments" của bản ghi."""
+        return cls(
+            file=str(data["file"]),
+            offset=float(data.get("offset", 0.0)),
+            duration=float(data.get("duration", 0.0)),
+        )
+
+
+@dataclass
+class Recording:
+    """
+    Bản ghi một nguồn: các đoạn video nén giữ nguyên luồng gốc, kèm thời điểm
+    bắt đầu của từng đoạn. Khoảng trống giữa hai đoạn là lúc mất kết nối.
+    """
+
+    source: str
+    started_at: str
+    segments: list[RecordingSegment] = field(default_factory=list)
+    # Đường dẫn file mô tả, không ghi vào file
+    path: str = field(default="", compare=False)
+
+    @classmethod
+    def load(cls, path: str) -> "Recording":
+        """Đọc file mô tả .json, hoặc coi một file video là bản ghi một đoạn"""
+        if not path.lower().endswith(RECORDING_SUFFIX):
+            return cls(path, "", [RecordingSegment(os.path.abspath(path), 0.0)], path)
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(
+            source=str(data.get("source", "")),
+            started_at=str(data.get("started_at", "")),
+            segments=[RecordingSegment.from_dict(s) for s in data.get("segments", [])],
+            path=path,
+        )
+
+    def save(self) -> None:
+        data = {
+            "source": self.source,
+            "started_at": self.started_at,
+            "segments": [asdict(s) for s in self.segments],
+        }
+        # Ghi file tạm rồi đổi tên để bản ghi không hỏng nếu bị ngắt giữa chừng
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+
+    def segment_path(self, segment: RecordingSegment) -> str:
+        return os.path.join(os.path.dirname(self.path), segment.file)
+
+
+class StreamRecorder:
+    """
+    Ghi luồng nén gốc (RTSP, HTTP, YouTube) ra đĩa bằng "ffmpeg -c copy", không
+    giải mã lại. Mỗi lần mất kết nối, ffmpeg được chạy lại và ghi sang đoạn mới,
+    nên bản ghi giữ được cả thời điểm và độ dài các lần mất kết nối.
+    """
+
+    def __init__(
+        self,
+        source: str,
+        output_dir: str = RECORDINGS_DIR,
+        resolution: str = "best",
+        retry_delay: float = 1.0,
+    ):
+        self.source = source
+        self.resolution = resolution
+        self.retry_delay = retry_delay
+        self._stop = threading.Event()
+        self._process: subprocess.Popen[bytes] | None = None
+
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        name = f"{stream_key(source)}_{stamp}"
+        self.directory = os.path.join(output_dir, name)
+        self.recording = Recording(
+            source=source,
+            started_at=datetime.now().isoformat(timespec="seconds"),
+            path=os.path.join(self.directory, f"{name}{RECORDING_SUFFIX}"),
+        )
+
+    def _input_url(self) -> str:
+        if "youtube.com" in self.source or "youtu.be" in self.source:
+            # Link luồng YouTube hết hạn sau một thời gian, lấy lại mỗi lần kết nối
+            return youtube_stream_url(self.source, self.resolution)
+        return self.source
+
+    def _command(self, ffmpeg: str, url: str, path: str, seconds: float) -> list[str]:
+        cmd = [ffmpeg, "-hide_banner", "-loglevel", "error", "-y"]
+        if url.startswith("rtsp://"):
+            cmd += ["-rtsp_transport", "tcp"]
+        # Matroska vẫn đọc được khi ffmpeg bị dừng đột ngột, khác với mp4
+        cmd += ["-i", url, "-map", "0:v:0", "-c", "copy", "-t", f"{seconds:.3f}"]
+        return [*cmd, "-f", "matroska", path]
+
+    def run(self, duration: float) -> Recording:
+        """Ghi trong 'duration' giây hoặc tới khi stop(), trả về bản ghi"""
+        ffmpeg = shutil.which("ffmpeg")
+        if ffmpeg is None:
+            raise RuntimeError("Cần cài ffmpeg để ghi luồng.")
+        os.makedirs(self.directory, exist_ok=True)
+
+        started = time.monotonic()
+        deadline = started + duration
+        while not self._stop.is_set() and time.monotonic() < deadline:
+            index = len(self.recording.segments)
+            file_name = f"segment_{index:04d}.mkv"
+            path = os.path.join(self.directory, file_name)
+            segment_start = time.monotonic()
+            stderr = b""
+            try:
+                url = self._input_url()
+                self._process = subprocess.Popen(
+                    self._command(ffmpeg, url, path, deadline - segment_start),
+                    stdin=subprocess.DEVNULL,
+                    stderr=subprocess.PIPE,
+                )
+                _, stderr = self._process.communicate()
+            except KeyboardInterrupt:
+                # Ctrl+C: chờ ffmpeg đóng file rồi lưu nốt đoạn đang ghi
+                self.stop()
+                if self._process is not None:
+                    _, stderr = self._process.communicate()
+            except Exception as e:
+                logger.warning(f"Không kết nối được tới {self.source}: {e}")
+
+            if os.path.exists(path) and os.path.getsize(path) > 0:
+                self.recording.segments.append(
+                    RecordingSegment(
+                        file_name,
+                        offset=segment_start - started,
+                        duration=time.monotonic() - segment_start,
+                    )
+                )
+                self.recording.save()
+                print(f"[*] Đã ghi đoạn {file_name}")
+            if stderr:
+                logger.warning(stderr.decode(errors="replace").strip())
+
+            if not self._stop.is_set() and time.monotonic() < deadline:
+                print("[!] Mất kết nối. Đang thử kết nối lại...")
+                self._stop.wait(self.retry_delay)
+
+        self.recording.save()
+        print(
+            f"[+] Đã lưu bản ghi {len(self.recording.segments)} đoạn vào "
+            f"{self.recording.path}"
+        )
+        return self.recording
+
+    def stop(self) -> None:
+        """Dừng ghi, ffmpeg nhận SIGTERM vẫn đóng file đúng cách"""
+        self._stop.set()
+        process = self._process
+        if process is not None and process.poll() is None:
+            process.terminate()
+
+
+@dataclass
+class ReplayConfig:
+    """Cấu hình phát lại bản ghi như một nguồn trực tiếp"""
+
+    # 1.0 = đúng nhịp gốc, 2.0 = nhanh gấp đôi, 0 = nhanh nhất có thể
+    speed: float = 1.0
+    loop: bool = False
+    # Giả lập mất kết nối mỗi 'disconnect_every' giây của video (0 = tắt),
+    # các frame trong 'disconnect_seconds' giây sau đó bị mất như với luồng thật
+    disconnect_every: float = 0.0
+    disconnect_seconds: float = 2.0
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ReplayConfig":
+        """Factory method để tạo ReplayConfig từ mục "replay" của cấu hình luồng."""
+        return cls(
+            speed=max(0.0, float(data.get("speed", 1.0))),
+            loop=bool(data.get("loop", False)),
+            disconnect_every=max(0.0, float(data.get("disconnect_every", 0.0))),
+            disconnect_seconds=max(0.0, float(data.get("disconnect_seconds", 2.0))),
+        )
+
+
+class ReplayCapture:
+    """
+    Phát lại bản ghi với giao diện giống cv2.VideoCapture. Mọi thời điểm
+    (mất kết nối, frame bị bỏ) tính theo thời gian của video nên kết quả giống
+    hệt nhau giữa các lần chạy, chỉ nhịp phát phụ thuộc đồng hồ.
+
+    Khi mất kết nối, read() trả về False và đối tượng coi như đã đóng;
+    reconnect() mở lại và tiếp tục từ lúc kết nối được khôi phục.
+    """
+
+    def __init__(self, path: str, config: ReplayConfig | None = None):
+        self.recording = Recording.load(path)
+        if not self.recording.segments:
+            raise ValueError(f"Bản ghi không có đoạn video nào: {path}")
+        self.config = config or ReplayConfig()
+
+        self._cap: cv2.VideoCapture | None = None
+        self._index = 0
+        # Cộng thêm vào thời gian khi phát lặp lại từ đầu
+        self._loop_offset = 0.0
+        # POS_MSEC của frame đầu tiên mỗi đoạn, mốc 0 của đoạn đó
+        self._first_msec: dict[int, float] = {}
+        # Bỏ các frame trước thời điểm này (đang mất kết nối)
+        self._resume_at = 0.0
+        self._next_disconnect = self.config.disconnect_every or float("inf")
+        self.finished = False
+        self._reconnecting = False
+        # Mốc (thời gian video, đồng hồ) để giữ nhịp phát
+        self._anchor: tuple[float, float] | None = None
+        self.position = 0.0
+        self.reconnect()
+
+    @property
+    def duration(self) -> float:
+        end = self.recording.segments[-1]
+        return end.offset + end.duration
+
+    def reconnect(self) -> "ReplayCapture":
+        """Mở lại đoạn hiện tại (hoặc đoạn kế tiếp sau khi đã hết đoạn)"""
+        self.release()
+        if self.finished:
+            return self
+        self._reconnecting = True
+        segment = self.recording.segments[self._index]
+        self._cap = cv2.VideoCapture(self.recording.segment_path(segment))
+        first_msec = self._first_msec.get(self._index)
+        skip = self._resume_at - self._loop_offset - segment.offset
+        if first_msec is not None and skip > 0:
+            # Tua gần tới lúc khôi phục kết nối, phần còn lại bỏ qua trong read()
+            self._cap.set(cv2.CAP_PROP_POS_MSEC, first_msec + skip * 1000)
+        return self
+
+    def _next_segment(self) -> bool:
+        """Chuyển sang đoạn sau, trả về False nếu đã hết bản ghi"""
+        if self._index + 1 < len(self.recording.segments):
+            self._index += 1
+            self._resume_at = max(
+                self._resume_at,
+                self._loop_offset + self.recording.segments[self._index].offset,
+            )
+            return True
+        if self.config.loop:
+            # Frame cuối cùng cộng thêm một chút để thời gian luôn tăng
+            self._loop_offset = max(self.duration, self.position) + 0.04
+            self._index = 0
+            self._resume_at = self._loop_offset
+            return True
+        self.finished = True
+        return False
+
+    def _pace(self, position: float) -> None:
+        if self.config.speed <= 0:
+            return
+        now = time.perf_counter()
+        if self._anchor is None:
+            self._anchor = (position, now)
+            return
+        media_start, wall_start = self._anchor
+        delay = wall_start + (position - media_start) / self.config.speed - now
+        if delay > 0:
+            time.sleep(delay)
+
+    def read(self) -> tuple[bool, npt.NDArray[Any] | None]:
+        cap = self._cap
+        if cap is None:
+            return False, None
+        while True:
+            success, frame = cap.read()
+            if not success:
+                # Hết một đoạn: giữa các đoạn là lúc nguồn gốc mất kết nối
+                self.release()
+                if not self._next_segment() or not self._reconnecting:
+                    return False, None
+                # Chưa có frame nào kể từ lần kết nối lại: mở luôn đoạn sau
+                cap = self.reconnect()._cap
+                if cap is None:
+                    return False, None
+                continue
+
+            msec = float(cap.get(cv2.CAP_PROP_POS_MSEC))
+            first_msec = self._first_msec.setdefault(self._index, msec)
+            segment = self.recording.segments[self._index]
+            position = self._loop_offset + segment.offset + (msec - first_msec) / 1000
+            if position < self._resume_at:
+                continue
+
+            while self._next_disconnect + self.config.disconnect_seconds <= position:
+                # Lần mất kết nối giả lập rơi vào khoảng trống sẵn có của bản ghi
+                self._next_disconnect += self.config.disconnect_every
+            if position >= self._next_disconnect:
+                self._resume_at = self._next_disconnect + self.config.disconnect_seconds
+                while self._next_disconnect <= self._resume_at:
+                    self._next_disconnect += self.config.disconnect_every
+                if self._reconnecting:
+                    # Chưa kết nối lại được: kéo dài lần mất kết nối hiện tại
+                    continue
+                self.release()
+                return False, None
+
+            self._pace(position)
+            self.position = position
+            self._reconnecting = False
+            return True, frame
+
+    def isOpened(self) -> bool:
+        return self._cap is not None and self._cap.isOpened()
+
+    def get(self, prop: int) -> float:
+        if prop == cv2.CAP_PROP_POS_MSEC:
+            return self.position * 1000
+        return float(self._cap.get(prop)) if self._cap is not None else 0.0
+
+    def release(self) -> None:
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+
+
+def load_recording(path: str, max_frames: int) -> list[npt.NDArray[Any]]:
+    """Giải mã trước tối đa 'max_frames' frame của bản ghi (bỏ qua mất kết nối)"""
+    capture = ReplayCapture(path, ReplayConfig(speed=0.0))
+    frames: list[npt.NDArray[Any]] = []
+    try:
+        while len(frames) < max_frames:
+            success, frame = capture.read()
+            if success and frame is not None:
+                frames.append(frame)
+                continue
+            capture.reconnect()
+            if not capture.isOpened():
+                break
+    finally:
+        capture.release()
+
+    if not frames:
+        raise ValueError(f"Bản ghi không có frame nào: {path}")
+    return frames
@@ -11,6 +11,7 @@ import yt_dlp
 # Cấu hình logging để theo dõi lỗi thay vì chỉ print
 logger = logging.getLogger(__name__)
 
+
 @dataclass
 class VideoStream:
     url: str
@@ -85,6 +86,28 @@ def list_video_streams(
         raise
 
 
+def youtube_stream_url(
+    url: str, resolution: str = "best", ydl_opts: Optional[dict[str, Any]] = None
+) -> str:
+    """
+    Lấy link luồng trực tiếp của video YouTube theo độ phân giải.
+    Chọn 'best' nếu độ phân giải yêu cầu không có sẵn.
+    """
+    streams, resolutions = list_video_streams(url, ydl_opts)
+
+    if resolution == "best":
+        target_res = resolutions[-1]
+    elif resolution not in resolutions:
+        logger.warning(f"Độ phân giải {resolution} không có sẵn. Chọn 'best'.")
+        target_res = resolutions[-1]
+    else:
+        target_res = resolution
+
+    # Tìm index của độ phân giải đã chọn
+    idx = int(np.where(resolutions == target_res)[0][0])
+    return streams[idx].url
+
+
 def cap_from_youtube(
     url: str,
     resolution: str = "best",
@@ -105,19 +128,7 @@ def cap_from_youtube(
         # Tự động tìm file cookies nếu bạn để trong project
         ydl_opts["cookiefile"] = "cookies.txt"
 
-    streams, resolutions = list_video_streams(url, ydl_opts)
-
-    if resolution == "best":
-        target_res = resolutions[-1]
-    elif resolution not in resolutions:
-        logger.warning(f"Độ phân giải {resolution} không có sẵn. Chọn 'best'.")
-        target_res = resolutions[-1]
-    else:
-        target_res = resolution
-
-    # Tìm index của độ phân giải đã chọn
-    idx = int(np.where(resolutions == target_res)[0][0])
-    stream_url = streams[idx].url
+    stream_url = youtube_stream_url(url, resolution, ydl_opts)
 
     cap = cv2.VideoCapture(stream_url)
     if not cap.isOpened():
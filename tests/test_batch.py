@@ -0,0 +1,94 @@
+from pathlib import Path
+
+from license_plate_monitor.ai.batch import (
+    ChunkResult,
+    merge_results,
+    plan_chunks,
+    stitch_tracks,
+)
+
+
+def test_plan_chunks_without_keyframes_splits_evenly() -> None:
+    assert plan_chunks(1000, 4, [], 100) == [
+        (0, 250),
+        (250, 500),
+        (500, 750),
+        (750, 1000),
+    ]
+
+
+def test_plan_chunks_snaps_to_nearest_keyframe() -> None:
+    assert plan_chunks(1000, 2, [0, 240, 480, 720], 100) == [(0, 480), (480, 1000)]
+
+
+def test_plan_chunks_drops_chunks_shorter_than_min_length() -> None:
+    # Keyframe thưa: hai ranh giới đều rơi vào 900, đoạn cuối quá ngắn bị bỏ
+    assert plan_chunks(1000, 3, [0, 900], 200) == [(0, 1000)]
+    assert plan_chunks(1000, 10, [], 300) == [(0, 300), (300, 600), (600, 1000)]
+
+
+def chunk(index: int, start: int, end: int) -> ChunkResult:
+    return ChunkResult(
+        index=index, start=start, end=end, frames=end - start, elapsed=1.0
+    )
+
+
+def test_stitch_tracks_pairs_overlapping_boxes_of_the_same_label() -> None:
+    before = chunk(0, 0, 100)
+    after = chunk(1, 100, 200)
+    box = (10.0, 10.0, 50.0, 40.0)
+    shifted = (12.0, 10.0, 52.0, 40.0)
+    far = (300.0, 300.0, 340.0, 330.0)
+    before.tail = {1: {100: box, 101: box}, 2: {100: far}}
+    before.labels = {1: "car", 2: "car"}
+    # Track 5 trùng box nhưng khác loại xe, track 6 mới là cùng xe
+    after.head = {5: {100: box, 101: box}, 6: {100: shifted, 101: shifted}}
+    after.labels = {5: "truck", 6: "car"}
+    assert stitch_tracks(before, after) == [(1, 6)]
+
+
+def test_merge_results_keeps_the_best_image_of_a_stitched_track(
+    tmp_path: Path,
+) -> None:
+    box = (10.0, 10.0, 50.0, 40.0)
+    before = chunk(0, 0, 100)
+    after = chunk(1, 100, 200)
+    before.spans = {1: (20, 105)}
+    before.labels = {1: "car"}
+    before.tail = {1: {100: box}}
+    after.spans = {3: (100, 180), 4: (150, 190)}
+    after.labels = {3: "car", 4: "bus"}
+    after.head = {3: {100: box}}
+
+    def crop(name: str, score: float) -> dict[str, object]:
+        path = tmp_path / name
+        path.write_bytes(b"jpg")
+        return {
+            "label": "car",
+            "conf": 0.9,
+            "box": box,
+            "frames": 10,
+            "image": str(path),
+            "score": score,
+        }
+
+    before.detections = {1: crop("a.jpg", 5.0)}
+    after.detections = {
+        3: crop("b.jpg", 9.0),
+        4: {**crop("c.jpg", 1.0), "label": "bus"},
+    }
+    before.counts = {("gate", "in", "car"): 1}
+    after.counts = {("gate", "in", "car"): 2}
+
+    vehicles, counts = merge_results([after, before], 10.0, str(tmp_path))
+
+    assert [(v["id"], v["label"]) for v in vehicles] == [(1, "car"), (2, "bus")]
+    car = vehicles[0]
+    assert car["frames"] == 20
+    assert (car["first_seen"], car["last_seen"]) == (2.0, 18.0)
+    # Ảnh kém hơn bị xóa, ảnh tốt nhất được đổi tên theo xe
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        [Path(car["image"]).name, Path(vehicles[1]["image"]).name]
+    )
+    assert Path(car["image"]).name == "car_1_00-00-02.jpg"
+    assert counts == {("gate", "in", "car"): 3}
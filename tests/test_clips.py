@@ -0,0 +1,60 @@
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from license_plate_monitor.storage.clips import ClipConfig, ClipRecorder
+
+FPS = 10
+
+
+def push_frames(recorder: ClipRecorder, start: int, stop: int) -> None:
+    for i in range(start, stop):
+        # Đẩy chậm để hàng đợi nén (4 frame) không bị đầy
+        while recorder._frames.full():
+            time.sleep(0.001)
+        recorder.push(np.full((16, 16, 3), i % 256, dtype=np.uint8), i / FPS)
+    # Chờ luồng nén xử lý hết
+    while not recorder._ring or recorder._ring[-1][0] < (stop - 1) / FPS:
+        time.sleep(0.001)
+
+
+def test_clip_reaches_back_to_an_event_reported_late(tmp_path: Path) -> None:
+    written: list[tuple[str, bool]] = []
+    config = ClipConfig(
+        enabled=True,
+        pre_seconds=1.0,
+        post_seconds=1.0,
+        max_delay=5.0,
+        output_dir=str(tmp_path),
+    )
+    recorder = ClipRecorder(
+        config, "cam", lambda p, pinned: written.append((p, pinned))
+    )
+    push_frames(recorder, 0, 60)
+    # Xe hiện rõ nhất ở giây thứ 3, sự kiện được phát muộn 3 giây
+    path = recorder.trigger("car_1", 3.0, pinned=True)
+    # Sự kiện nằm trong clip đang chờ được gộp, không tạo file mới
+    assert recorder.trigger("car_2", 3.5) == path
+    push_frames(recorder, 60, 70)
+    recorder.close()
+
+    assert written == [(path, True)]
+    cap = cv2.VideoCapture(path)
+    frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    # Từ 2.0s tới 4.5s (clip được nối dài bởi sự kiện thứ hai)
+    assert frames == 26
+
+
+def test_ring_is_bounded_by_pre_seconds_and_max_delay(tmp_path: Path) -> None:
+    config = ClipConfig(
+        enabled=True, pre_seconds=1.0, max_delay=1.0, output_dir=str(tmp_path)
+    )
+    recorder = ClipRecorder(config, "cam")
+    push_frames(recorder, 0, 100)
+    recorder.close()
+    times = [t for t, _ in recorder._ring]
+    assert times[-1] == 9.9
+    assert times[0] >= 9.9 - 2.0
@@ -0,0 +1,124 @@
+import numpy as np
+
+from license_plate_monitor.ai.tracks import FrameTracks
+from license_plate_monitor.analytics.counting import (
+    CountingConfig,
+    CountingLine,
+    CountingZone,
+    ZoneCounter,
+    segment_crossings,
+)
+
+FRAME = (200, 200, 3)
+
+
+def frame_tracks(*tracks: tuple[int, float, float, str]) -> FrameTracks:
+    """Mỗi track: (id, x, y, nhãn); (x, y) là tâm cạnh dưới của box"""
+    return FrameTracks(
+        ids=np.asarray([t[0] for t in tracks], dtype=np.int64),
+        boxes=np.asarray(
+            [(x - 10, y - 20, x + 10, y) for _, x, y, _ in tracks], dtype=np.float32
+        ).reshape(-1, 4),
+        confs=np.ones(len(tracks), dtype=np.float32),
+        classes=np.zeros(len(tracks), dtype=np.int64),
+        labels=[t[3] for t in tracks],
+    )
+
+
+def line_counter(ttl_frames: int = 30) -> ZoneCounter:
+    return ZoneCounter(
+        CountingConfig(
+            lines=[CountingLine("gate", (0, 100), (200, 100), ("in", "out"))],
+            ttl_frames=ttl_frames,
+        )
+    )
+
+
+def test_segment_crossings_direction() -> None:
+    lines = np.asarray([[0, 100, 200, 100]], dtype=np.float32)
+    starts = np.asarray([[50, 80], [50, 120], [50, 80], [250, 80]], dtype=np.float32)
+    ends = np.asarray([[50, 120], [50, 80], [50, 90], [250, 120]], dtype=np.float32)
+    crossed, forward = segment_crossings(starts, ends, lines)
+    # Đi xuống, đi lên, chưa tới vạch, đi ngoài phạm vi đoạn vạch
+    assert crossed[:, 0].tolist() == [True, True, False, False]
+    assert forward[:, 0].tolist() == [True, False, False, False]
+
+
+def test_counts_each_direction_once_per_track() -> None:
+    counter = line_counter()
+    assert counter.update(frame_tracks((1, 50, 80, "car")), FRAME) == []
+    assert counter.update(frame_tracks((1, 50, 120, "car")), FRAME) == [
+        ("gate", "in", "car")
+    ]
+    # Xe lùi lại qua vạch không được đếm thêm
+    assert counter.update(frame_tracks((1, 50, 80, "car")), FRAME) == []
+    assert counter.update(frame_tracks((2, 150, 130, "truck")), FRAME) == []
+    assert counter.update(frame_tracks((2, 150, 70, "truck")), FRAME) == [
+        ("gate", "out", "truck")
+    ]
+    assert counter.summary() == {"gate in car": 1, "gate out truck": 1}
+
+
+def test_track_lost_for_a_few_frames_is_still_counted() -> None:
+    counter = line_counter(ttl_frames=5)
+    counter.update(frame_tracks((7, 50, 80, "car")), FRAME)
+    for _ in range(3):
+        counter.update(frame_tracks(), FRAME)
+    assert counter.update(frame_tracks((7, 50, 120, "car")), FRAME) == [
+        ("gate", "in", "car")
+    ]
+
+
+def test_track_state_expires_after_ttl() -> None:
+    counter = line_counter(ttl_frames=2)
+    counter.update(frame_tracks((7, 50, 80, "car")), FRAME)
+    for _ in range(3):
+        counter.update(frame_tracks(), FRAME)
+    assert counter.update(frame_tracks((7, 50, 120, "car")), FRAME) == []
+
+
+def test_many_tracks_keep_their_own_state() -> None:
+    counter = line_counter()
+    counter.update(
+        frame_tracks((30, 10, 80, "car"), (4, 60, 120, "bus"), (17, 110, 80, "car")),
+        FRAME,
+    )
+    events = counter.update(
+        frame_tracks((17, 110, 120, "car"), (4, 60, 80, "bus"), (30, 10, 90, "car")),
+        FRAME,
+    )
+    assert sorted(events) == [("gate", "in", "car"), ("gate", "out", "bus")]
+
+
+def test_zone_entries_exits_and_occupancy() -> None:
+    counter = ZoneCounter(
+        CountingConfig(
+            zones=[CountingZone("lot", [(0, 0), (100, 0), (100, 100), (0, 100)])]
+        )
+    )
+    # Track mới xuất hiện sẵn trong vùng không tính là lượt vào
+    assert counter.update(frame_tracks((1, 50, 50, "car")), FRAME) == []
+    assert counter.occupancy == {"lot": 1}
+    assert counter.update(
+        frame_tracks((1, 150, 50, "car"), (2, 150, 150, "car")), FRAME
+    ) == [("lot", "out", "car")]
+    assert counter.update(frame_tracks((2, 50, 50, "car")), FRAME) == [
+        ("lot", "in", "car")
+    ]
+    assert counter.occupancy == {"lot": 1}
+
+
+def test_config_from_dict() -> None:
+    config = CountingConfig.from_dict(
+        {
+            "lines": [
+                {"points": [[0, 10], [100, 10]], "directions": ["south", "north"]}
+            ],
+            "zones": [{"name": "lot", "points": [[0, 0], [10, 0], [10, 10]]}],
+        }
+    )
+    assert config.enabled
+    assert config.lines[0].name == "line0"
+    assert config.lines[0].directions == ("south", "north")
+    assert config.zones[0].points[2] == (10.0, 10.0)
+    assert not CountingConfig.from_dict({}).enabled
@@ -0,0 +1,125 @@
+import json
+import socket
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import numpy as np
+
+from license_plate_monitor.utils.events import (
+    FRAME_HEADER,
+    EventServer,
+    counts_event,
+    encode_event,
+)
+
+
+def wait_until(condition: Callable[[], bool], timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def serve(tmp_path: Path, fmt: str, **kwargs: int) -> EventServer:
+    server = EventServer(f"unix:{tmp_path / 'events.sock'}", fmt, **kwargs)
+    assert server.start()
+    return server
+
+
+def subscribe(server: EventServer, count: int) -> socket.socket:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.connect(server.address[5:])
+    wait_until(lambda: server.subscribers == count)
+    return sock
+
+
+def recv_exact(sock: socket.socket, size: int) -> bytes:
+    data = b""
+    while len(data) < size:
+        chunk = sock.recv(size - len(data))
+        assert chunk
+        data += chunk
+    return data
+
+
+def event(i: int, payload: str = "") -> dict[str, object]:
+    return {"type": "detection", "track_id": i, "conf": np.float32(0.5), "x": payload}
+
+
+def test_ndjson_events_reach_every_subscriber(tmp_path: Path) -> None:
+    server = serve(tmp_path, "ndjson")
+    try:
+        clients = [subscribe(server, 1), subscribe(server, 2)]
+        for i in range(3):
+            server.publish(event(i))
+        for client in clients:
+            reader = client.makefile("rb")
+            lines = [json.loads(reader.readline()) for _ in range(3)]
+            # Số kiểu numpy được đổi sang số JSON thường
+            assert [(e["track_id"], e["conf"]) for e in lines] == [
+                (0, 0.5),
+                (1, 0.5),
+                (2, 0.5),
+            ]
+            reader.close()
+            client.close()
+        assert server.published == 3
+        # Luồng nền đã xử lý tín hiệu đánh thức, sự kiện sau lại gửi được tín hiệu
+        wait_until(lambda: not server._signaled)
+    finally:
+        server.stop()
+
+
+def test_binary_frames_carry_length_and_event_type(tmp_path: Path) -> None:
+    frame = encode_event(counts_event("cam", {"car": 2}), "binary")
+    length, kind = FRAME_HEADER.unpack(frame[: FRAME_HEADER.size])
+    assert (length, kind) == (len(frame) - 4, 2)
+
+    server = serve(tmp_path, "binary")
+    try:
+        client = subscribe(server, 1)
+        server.publish(event(7))
+        server.publish(counts_event("cam", {"bus": 1}))
+        received = []
+        for _ in range(2):
+            length, kind = FRAME_HEADER.unpack(recv_exact(client, FRAME_HEADER.size))
+            body = json.loads(recv_exact(client, length - 1))
+            received.append((kind, body["type"]))
+        assert received == [(1, "detection"), (2, "counts")]
+        client.close()
+    finally:
+        server.stop()
+
+
+def test_slow_subscriber_is_dropped_without_stalling_others(tmp_path: Path) -> None:
+    server = serve(tmp_path, "ndjson", max_buffer=256 * 1024, batch_size=16)
+    try:
+        slow = subscribe(server, 1)
+        fast = subscribe(server, 2)
+        received = 0
+
+        def drain() -> None:
+            nonlocal received
+            reader = fast.makefile("rb")
+            while reader.readline():
+                received += 1
+
+        reader_thread = threading.Thread(target=drain)
+        reader_thread.start()
+        # Subscriber chậm không đọc gì: bộ đệm của nó vượt max_buffer
+        total = 2000
+        for i in range(total):
+            server.publish(event(i, "x" * 1024))
+            if i % 100 == 0:
+                time.sleep(0.001)
+
+        wait_until(lambda: server.disconnected == 1)
+        wait_until(lambda: received == total)
+        assert server.subscribers == 1
+        slow.close()
+    finally:
+        server.stop()
+    reader_thread.join(timeout=5)
+    fast.close()
@@ -0,0 +1,79 @@
+import pytest
+
+from license_plate_monitor.ai.plate_votes import PlateVoteCache, vote_characters
+
+
+def test_vote_characters_picks_each_character_by_confidence() -> None:
+    text, conf = vote_characters(
+        [("51A12345", 0.9), ("51A12845", 0.6), ("51A12345", 0.8)]
+    )
+    assert text == "51A12345"
+    assert 0 < conf <= 0.9
+
+
+def test_vote_characters_ignores_minority_lengths() -> None:
+    # Lần đọc thừa ký tự có độ tin cậy thấp không được làm lệch vị trí ký tự
+    text, _ = vote_characters([("30F1234", 0.7), ("30F1234", 0.6), ("30FF1234", 0.9)])
+    assert text == "30F1234"
+
+
+def test_vote_characters_length_weight_is_fractional() -> None:
+    # Một lần đọc tin cậy cao thắng hai lần đọc tin cậy thấp có độ dài khác
+    text, _ = vote_characters([("ABC123", 0.95), ("ABC12", 0.4), ("ABD12", 0.4)])
+    assert text == "ABC123"
+
+
+def test_vote_characters_empty() -> None:
+    assert vote_characters([]) == ("", 0.0)
+    assert vote_characters([("", 0.9), ("ABC", 0.0)]) == ("", 0.0)
+
+
+def test_stops_requesting_once_stable() -> None:
+    cache = PlateVoteCache(max_reads=5, stable_reads=2, min_improvement=1.0)
+    assert cache.request_read(1, 0.5)
+    cache.add_read(1, "51A12345", 0.9)
+    assert cache.request_read(1, 0.6)
+    cache.add_read(1, "51A12345", 0.8)
+    assert not cache.request_read(1, 0.9)
+    assert cache.finish(1) == pytest.approx(("51A12345", 0.85))
+
+
+def test_requires_better_crop_and_caps_reads() -> None:
+    cache = PlateVoteCache(max_reads=2, stable_reads=5, min_improvement=1.15)
+    assert cache.request_read(1, 1.0)
+    # Ảnh không tốt hơn hẳn thì không gửi lại
+    assert not cache.request_read(1, 1.1)
+    assert cache.request_read(1, 1.2)
+    # Đã đủ max_reads (tính cả lần đang chờ)
+    assert not cache.request_read(1, 5.0)
+
+
+def test_pending_reads_are_tracked_until_results_arrive() -> None:
+    cache = PlateVoteCache(min_improvement=1.0)
+    assert cache.pending(7) == 0
+    cache.request_read(7, 0.5)
+    cache.request_read(7, 0.6)
+    assert cache.pending(7) == 2
+    cache.add_read(7, "ABC123", 0.9)
+    assert cache.pending(7) == 1
+    cache.add_read(7, "ABC123", 0.9)
+    assert cache.pending(7) == 0
+    assert cache.finish(7) is not None
+
+
+def test_finish_without_reads_returns_none() -> None:
+    cache = PlateVoteCache()
+    cache.request_read(3, 0.5)
+    assert cache.finish(3) is None
+    # Kết quả đến sau khi track đã kết thúc bị bỏ qua
+    cache.add_read(3, "ABC123", 0.9)
+    assert cache.finish(3) is None
+
+
+def test_evicts_oldest_tracks() -> None:
+    cache = PlateVoteCache(max_tracks=2)
+    for track_id in (1, 2, 3):
+        cache.request_read(track_id, 0.5)
+        cache.add_read(track_id, "ABC123", 0.9)
+    assert cache.finish(1) is None
+    assert cache.finish(3) is not None
@@ -0,0 +1,40 @@
+import queue
+import threading
+import time
+from pathlib import Path
+
+from license_plate_monitor.perf.profiler import SamplingProfiler
+
+
+def spin(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_waiting_threads_are_not_sampled(tmp_path: Path) -> None:
+    stop = threading.Event()
+    idle: queue.Queue[None] = queue.Queue()
+    threads = [
+        threading.Thread(target=spin, args=(stop,), name="busy"),
+        threading.Thread(target=stop.wait, name="event"),
+        threading.Thread(target=idle.get, name="queue"),
+    ]
+    for thread in threads:
+        thread.start()
+    try:
+        # Chờ tới khi các luồng đã vào trạng thái chờ
+        time.sleep(0.05)
+        profiler = SamplingProfiler(duration=0.3, output_dir=str(tmp_path))
+        report = profiler.run()
+    finally:
+        stop.set()
+        idle.put(None)
+        for thread in threads:
+            thread.join()
+
+    sampled = {stack[0] for stack in profiler.samples}
+    assert "busy" in sampled
+    assert "event" not in sampled
+    assert "queue" not in sampled
+    assert profiler.idle > 0
+    assert "luồng đang chờ" in Path(report.summary_path).read_text(encoding="utf-8")
@@ -0,0 +1,72 @@
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from license_plate_monitor.utils.recording import ReplayCapture, ReplayConfig
+
+FPS = 10
+FRAMES = 60
+
+
+def make_clip(tmp_path: Path) -> str:
+    """Clip 6 giây, mỗi frame tô một màu xám riêng để biết chỉ số frame"""
+    path = str(tmp_path / "clip.avi")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter.fourcc(*"MJPG"), FPS, (64, 64))
+    for i in range(FRAMES):
+        writer.write(np.full((64, 64, 3), i * 4, dtype=np.uint8))
+    writer.release()
+    return path
+
+
+def replay(path: str, config: ReplayConfig) -> tuple[list[int], int]:
+    """Chỉ số các frame nhận được và số lần mất kết nối giả lập"""
+    capture = ReplayCapture(path, config)
+    frames: list[int] = []
+    disconnects = 0
+    while not capture.finished:
+        success, frame = capture.read()
+        if success and frame is not None:
+            frames.append(round(float(frame.mean()) / 4))
+        elif not capture.finished:
+            disconnects += 1
+            capture.reconnect()
+    return frames, disconnects
+
+
+def test_simulated_disconnects_drop_the_same_frames(tmp_path: Path) -> None:
+    path = make_clip(tmp_path)
+    # Mất kết nối ở 1.96s, 3.92s, 5.88s, mỗi lần mất 1.02s video
+    config = ReplayConfig(speed=0.0, disconnect_every=1.96, disconnect_seconds=1.02)
+    frames, disconnects = replay(path, config)
+
+    expected = [*range(0, 20), *range(30, 40), *range(50, 59)]
+    assert frames == expected
+    assert disconnects == 3
+    # Thời điểm tính theo video nên lần chạy sau cho kết quả giống hệt
+    assert replay(path, config) == (frames, disconnects)
+
+
+def test_loop_keeps_positions_increasing(tmp_path: Path) -> None:
+    path = make_clip(tmp_path)
+    capture = ReplayCapture(path, ReplayConfig(speed=0.0, loop=True))
+    positions: list[float] = []
+    frames: list[int] = []
+    reconnects = 0
+    while len(frames) < FRAMES + 5:
+        success, frame = capture.read()
+        if not success or frame is None:
+            # Hết bản ghi cũng như mất kết nối: kết nối lại để phát vòng mới
+            reconnects += 1
+            capture.reconnect()
+            continue
+        frames.append(round(float(frame.mean()) / 4))
+        positions.append(capture.get(cv2.CAP_PROP_POS_MSEC) / 1000)
+    capture.release()
+
+    assert not capture.finished
+    assert reconnects == 1
+    assert frames == [*range(FRAMES), *range(5)]
+    assert all(b > a for a, b in zip(positions, positions[1:]))
+    # Vòng thứ hai bắt đầu ngay sau frame cuối của vòng đầu
+    assert abs(positions[FRAMES] - (positions[FRAMES - 1] + 0.04)) < 1e-6
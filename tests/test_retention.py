@@ -0,0 +1,86 @@
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+from license_plate_monitor.storage.archive import DetectionArchive, SearchQuery
+from license_plate_monitor.storage.retention import (
+    GB,
+    RetentionConfig,
+    RetentionManager,
+)
+
+DAY = 86400.0
+NOW = time.time()
+
+
+def save(directory: Path, name: str, age_days: float, size: int = 100) -> str:
+    path = directory / name
+    path.write_bytes(b"x" * size)
+    ts = NOW - age_days * DAY
+    os.utime(path, (ts, ts))
+    return str(path)
+
+
+def manager(
+    tmp_path: Path, config: RetentionConfig, archive: DetectionArchive | None = None
+) -> tuple[RetentionManager, sqlite3.Connection]:
+    retention = RetentionManager(
+        root=str(tmp_path),
+        index_path=str(tmp_path / "retention.db"),
+        default=config,
+        archive=archive,
+    )
+    return retention, retention._connect()
+
+
+def test_over_quota_evicts_oldest_unpinned_files(tmp_path: Path) -> None:
+    # Quota 450 byte, xóa tới khi còn 90% (405 byte)
+    config = RetentionConfig(max_gb=450 / GB, max_age_days=0, low_water=0.9)
+    retention, conn = manager(tmp_path, config)
+    pinned = save(tmp_path, "pinned.png", 10)
+    paths = [save(tmp_path, f"{i}.png", 5 - i) for i in range(5)]
+    retention._ingest(
+        conn, [("cam", pinned, True)] + [("cam", path, False) for path in paths]
+    )
+
+    assert retention._evict(conn, NOW, check_age=False) is False
+    # File ghim cũ nhất vẫn còn, hai file chưa ghim cũ nhất bị xóa
+    assert os.path.exists(pinned)
+    assert [os.path.exists(path) for path in paths] == [False, False, True, True, True]
+    usage = retention.usage()["cam"]
+    assert (usage.bytes, usage.files, usage.evicted) == (400, 4, 2)
+    conn.close()
+
+
+def test_stream_over_quota_still_expires_files_by_age(tmp_path: Path) -> None:
+    config = RetentionConfig(max_gb=450 / GB, max_age_days=90, low_water=0.9)
+    retention, conn = manager(tmp_path, config)
+    ages = [200, 100, 3, 2, 1]
+    paths = [save(tmp_path, f"{age}.png", age) for age in ages]
+    retention._ingest(conn, [("cam", path, False) for path in paths])
+
+    retention._evict(conn, NOW, check_age=True)
+    # Quota chỉ cần xóa file 200 ngày, file 100 ngày hết hạn theo tuổi
+    assert [os.path.exists(path) for path in paths] == [False, False, True, True, True]
+    conn.close()
+
+
+def test_evicted_files_are_purged_from_the_archive(tmp_path: Path) -> None:
+    archive = DetectionArchive(str(tmp_path / "archive.db"))
+    old = save(tmp_path, "old.png", 100)
+    recent = save(tmp_path, "recent.png", 1)
+    for track_id, path in enumerate([old, recent]):
+        det = {"id": track_id, "label": "car", "conf": 0.9, "plate": "51F12345"}
+        archive.add(det, "cam", path)
+    archive.close()
+
+    config = RetentionConfig(max_gb=0, max_age_days=30)
+    retention, conn = manager(tmp_path, config, archive)
+    retention._ingest(conn, [("cam", old, False), ("cam", recent, False)])
+    retention._evict(conn, NOW, check_age=True)
+    conn.close()
+
+    records = archive.search(SearchQuery(pattern="51F12345"))
+    # Lịch sử biển số vẫn còn, chỉ bản ghi của ảnh đã xóa mất đường dẫn
+    assert sorted(r.path for r in records) == ["", recent]
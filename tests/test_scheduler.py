@@ -0,0 +1,124 @@
+import threading
+import time
+from collections.abc import Callable
+from types import SimpleNamespace
+
+import pytest
+
+from license_plate_monitor.ai import scheduler as scheduler_module
+from license_plate_monitor.ai.scheduler import InferenceScheduler, ScheduleConfig
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Clock:
+    # Chỉ thay đồng hồ của bộ lập lịch, Condition.wait vẫn dùng giờ thật
+    fake = Clock()
+    monkeypatch.setattr(
+        scheduler_module, "time", SimpleNamespace(monotonic=fake.monotonic)
+    )
+    return fake
+
+
+def wait_until(condition: Callable[[], bool], timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.005)
+
+
+def grant_order(scheduler: InferenceScheduler, streams: list[str]) -> list[str]:
+    """Cho mọi luồng cùng chờ một lượt duy nhất rồi ghi lại thứ tự được cấp"""
+    assert scheduler.acquire("holder")
+    order: list[str] = []
+
+    def run(stream: str) -> None:
+        if scheduler.acquire(stream):
+            order.append(stream)
+
+    threads = [threading.Thread(target=run, args=(s,)) for s in streams]
+    for thread in threads:
+        thread.start()
+    wait_until(lambda: all(scheduler._streams[s].waiting for s in streams))
+    for count in range(1, len(streams) + 1):
+        # Luồng được cấp giữ lượt, mỗi lần nhả chỉ một luồng chạy tiếp
+        scheduler.release()
+        wait_until(lambda count=count: len(order) == count)
+    for thread in threads:
+        thread.join()
+    return order
+
+
+def test_higher_priority_is_granted_first() -> None:
+    scheduler = InferenceScheduler(slots=1)
+    scheduler.register("low", ScheduleConfig(priority=0))
+    scheduler.register("mid", ScheduleConfig(priority=1))
+    scheduler.register("high", ScheduleConfig(priority=5))
+    assert grant_order(scheduler, ["low", "mid", "high"]) == ["high", "mid", "low"]
+
+
+def test_stream_behind_min_fps_goes_before_higher_priority(clock: Clock) -> None:
+    scheduler = InferenceScheduler(slots=1, window=5.0)
+    scheduler.register("low", ScheduleConfig(priority=0, min_fps=2.0))
+    scheduler.register("high", ScheduleConfig(priority=5))
+    assert grant_order(scheduler, ["high", "low"]) == ["low", "high"]
+
+    # Đủ 2 fps trong cửa sổ: ưu tiên trở lại như bình thường
+    scheduler.release()
+    scheduler.release()
+    for _ in range(10):
+        clock.now += 0.4
+        assert scheduler.acquire("low")
+        scheduler.release()
+    assert grant_order(scheduler, ["low", "high"]) == ["high", "low"]
+
+
+def test_frames_are_shed_when_no_slot_frees_up(clock: Clock) -> None:
+    scheduler = InferenceScheduler(slots=1)
+    assert scheduler.acquire("holder")
+    assert scheduler.acquire("cam", timeout=0) is False
+    assert scheduler.acquire("cam", timeout=0) is False
+    scheduler.release()
+    assert scheduler.acquire("cam", timeout=0) is True
+
+    cam = next(r for r in scheduler.report() if r.stream == "cam")
+    assert (cam.granted, cam.shed) == (1, 2)
+
+
+def test_met_ratio_counts_windows_meeting_min_fps(clock: Clock) -> None:
+    scheduler = InferenceScheduler(slots=1, window=5.0)
+    scheduler.register("cam", ScheduleConfig(min_fps=1.0))
+    # Cửa sổ đầu: 5 yêu cầu đều được cấp
+    for _ in range(5):
+        assert scheduler.acquire("cam")
+        scheduler.release()
+        clock.now += 1.0
+    assert [r.met_ratio for r in scheduler.report()] == [1.0]
+
+    # Cửa sổ sau: máy bận, cả 5 frame đều bị bỏ
+    assert scheduler.acquire("holder")
+    for _ in range(5):
+        assert scheduler.acquire("cam", timeout=0) is False
+        clock.now += 1.0
+    cam = next(r for r in scheduler.report() if r.stream == "cam")
+    assert cam.met_ratio == 0.5
+    assert cam.shed == 5
+
+
+def test_requests_are_trimmed_without_report(clock: Clock) -> None:
+    scheduler = InferenceScheduler(window=5.0)
+    for _ in range(10_000):
+        assert scheduler.acquire("cam")
+        scheduler.release()
+        clock.now += 0.01
+    # Chỉ giữ các yêu cầu trong cửa sổ 5 giây gần nhất (500 frame)
+    state = scheduler._streams["cam"]
+    assert len(state.requests) <= 501
+    assert len(state.grants) <= 501
@@ -0,0 +1,37 @@
+import pytest
+
+from license_plate_monitor.analytics.timeseries import OTHER_LABEL, TrafficSeries
+
+# 10 giây theo giây, 100 giây theo 10 giây
+TIERS = ((1, 10), (10, 10))
+
+
+def test_query_uses_finest_tier_still_covering_start() -> None:
+    series = TrafficSeries(TIERS)
+    for t in range(0, 60):
+        series.add("car", 1000.0 + t)
+
+    recent = series.query(1055.0, 1059.0)
+    assert recent.resolution == 1
+    assert recent.counts[:, 0].tolist() == [1, 1, 1, 1, 1]
+
+    # Tầng giây chỉ còn 10 giây gần nhất, khung cũ hơn lấy từ tầng 10 giây
+    older = series.query(1000.0, 1059.0)
+    assert older.resolution == 10
+    assert older.times.tolist() == [1000, 1010, 1020, 1030, 1040, 1050]
+    assert older.counts[:, 0].tolist() == [10] * 6
+
+    assert series.query(1000.0, 1059.0, resolution=1).counts.sum() == 10
+    with pytest.raises(ValueError):
+        series.query(1000.0, 1059.0, resolution=60)
+
+
+def test_classes_beyond_max_are_counted_as_other() -> None:
+    series = TrafficSeries(TIERS, max_classes=3)
+    for label in ["car", "bus", "truck", "car", "motorbike", "truck"]:
+        series.add(label, 1000.0)
+
+    window = series.query(1000.0, 1000.0)
+    assert window.labels == ["car", "bus", OTHER_LABEL]
+    # truck và motorbike gộp vào cột "other", không trộn vào cột của bus
+    assert window.counts.tolist() == [[2, 1, 3]]
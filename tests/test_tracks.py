@@ -0,0 +1,80 @@
+import numpy as np
+import numpy.typing as npt
+
+from license_plate_monitor.ai.reid import ReIDIndex
+from license_plate_monitor.ai.tracks import FrameTracks, TrackRegistry
+
+Box = tuple[float, float, float, float]
+
+
+def scene(*cars: tuple[Box, tuple[int, int, int]]) -> npt.NDArray[np.uint8]:
+    """Frame xám có các xe là hình chữ nhật màu (BGR), có họa tiết để đủ nét"""
+    frame = np.full((480, 640, 3), 90, dtype=np.uint8)
+    for (x1, y1, x2, y2), color in cars:
+        frame[int(y1) : int(y2), int(x1) : int(x2)] = color
+        frame[int(y1) : int(y2) : 6, int(x1) : int(x2)] = 0
+    return frame
+
+
+def tracks(*items: tuple[int, Box]) -> FrameTracks:
+    return FrameTracks(
+        ids=np.asarray([i for i, _ in items], dtype=np.int64),
+        boxes=np.asarray([b for _, b in items], dtype=np.float32).reshape(-1, 4),
+        confs=np.full(len(items), 0.9, dtype=np.float32),
+        classes=np.zeros(len(items), dtype=np.int64),
+        labels=["car"] * len(items),
+    )
+
+
+RED = (0, 0, 220)
+BOX: Box = (100, 100, 200, 180)
+
+
+def registry() -> TrackRegistry:
+    return TrackRegistry(ttl_frames=3, margin=5, reid=ReIDIndex(window_frames=50))
+
+
+def run_until_finished(reg: TrackRegistry) -> list[int]:
+    emitted: list[int] = []
+    for _ in range(3):
+        emitted += [d["id"] for d in reg.update(scene((BOX, RED)), tracks((1, BOX)))]
+    for _ in range(5):
+        emitted += [d["id"] for d in reg.update(scene(), tracks())]
+    return emitted
+
+
+def test_ended_track_is_revived_under_its_original_id() -> None:
+    reg = registry()
+    assert run_until_finished(reg) == [1]
+
+    moved: Box = (110, 100, 210, 180)
+    assert reg.update(scene((moved, RED)), tracks((2, moved))) == []
+    assert reg.aliases[2] == 1
+    assert reg.canonical(np.asarray([2])).tolist() == [1]
+    state = reg.get(1)
+    assert state is not None and state.emitted and state.first_frame == 1
+    # Track được nối tiếp không phát lại khi kết thúc lần nữa
+    for _ in range(5):
+        assert reg.update(scene(), tracks()) == []
+
+
+def test_reid_rejects_far_or_differently_sized_vehicles() -> None:
+    reg = registry()
+    run_until_finished(reg)
+    # Mất dấu lâu: max_jump * số frame vượt xa khoảng cách, chỉ max_radius chặn
+    for _ in range(15):
+        reg.update(scene(), tracks())
+    # Cùng màu nhưng ở quá xa (vượt max_radius)
+    far: Box = (450, 300, 550, 380)
+    # Cùng màu, gần nhưng to gấp đôi
+    big: Box = (100, 100, 300, 260)
+    reg.update(scene((far, RED)), tracks((2, far)))
+    reg.update(scene((big, RED)), tracks((3, big)))
+    assert reg.aliases == {}
+    assert reg.merged == 0
+
+
+def test_reid_is_off_unless_enabled() -> None:
+    assert ReIDIndex.from_dict({}) is None
+    index = ReIDIndex.from_dict({"enabled": True, "max_radius": 50})
+    assert index is not None and index.max_radius == 50
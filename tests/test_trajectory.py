@@ -0,0 +1,73 @@
+import numpy as np
+import numpy.typing as npt
+import pytest
+
+from license_plate_monitor.analytics.trajectory import (
+    GroundCalibration,
+    TrajectoryStore,
+    anchor_points,
+)
+
+
+def points(*xy: tuple[float, float]) -> npt.NDArray[np.float32]:
+    return np.asarray(xy, dtype=np.float32).reshape(-1, 2)
+
+
+def test_anchor_points() -> None:
+    boxes = np.asarray([[0, 0, 10, 20]], dtype=np.float32)
+    assert anchor_points(boxes).tolist() == [[5.0, 20.0]]
+    assert anchor_points(boxes, "center").tolist() == [[5.0, 10.0]]
+
+
+def test_trajectory_keeps_samples_in_order() -> None:
+    store = TrajectoryStore(length=3)
+    for i in range(5):
+        store.update(np.asarray([7]), points((i, 0)), float(i))
+    assert store.trajectory(7)[:, 0].tolist() == [2.0, 3.0, 4.0]
+    assert store.trajectory(8).shape == (0, 3)
+
+
+def test_full_store_never_evicts_slots_used_in_the_same_frame() -> None:
+    store = TrajectoryStore(capacity=2)
+    store.update(np.asarray([1, 2, 3]), points((0, 0), (1, 1), (2, 2)), 0.0)
+    # Track thứ ba không có slot ở frame này, hai track đầu giữ nguyên mẫu
+    assert len(store.trajectory(1)) == 1
+    assert len(store.trajectory(2)) == 1
+    assert len(store.trajectory(3)) == 0
+
+    # Frame sau: slot lâu không thấy nhất được thu hồi cho track mới
+    store.update(np.asarray([2, 3]), points((1, 2), (2, 3)), 0.1)
+    assert len(store.trajectory(1)) == 0
+    assert len(store.trajectory(3)) == 1
+
+
+def test_stale_tracks_are_released() -> None:
+    store = TrajectoryStore(ttl_frames=2)
+    store.update(np.asarray([1]), points((0, 0)), 0.0)
+    store.update(np.asarray([], dtype=np.int64), points(), 0.1)
+    assert len(store) == 1
+    store.update(np.asarray([], dtype=np.int64), points(), 0.2)
+    assert len(store) == 0
+
+
+def test_speed_from_ground_calibration() -> None:
+    # 1 pixel = 1 mét
+    calibration = GroundCalibration(np.eye(3))
+    store = TrajectoryStore(speed_window=1.0)
+    for i in range(11):
+        store.update(np.asarray([1]), points((i, 0)), i * 0.1, calibration)
+    # 10 m/s = 36 km/h
+    assert store.speed(1) == pytest.approx(36.0)
+    assert store.speed(2) is None
+
+
+def test_calibration_from_point_pairs() -> None:
+    calibration = GroundCalibration.from_dict(
+        {
+            "image_points": [[0, 0], [100, 0], [100, 100], [0, 100]],
+            "world_points": [[0, 0], [10, 0], [10, 10], [0, 10]],
+        }
+    )
+    assert calibration is not None
+    assert calibration.project(np.asarray([50.0, 50.0])) == pytest.approx([5.0, 5.0])
+    assert GroundCalibration.from_dict({}) is None
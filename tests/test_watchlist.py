@@ -0,0 +1,88 @@
+from pathlib import Path
+
+from license_plate_monitor.analytics.watchlist import (
+    Watchlist,
+    WatchlistEntry,
+    WatchlistIndex,
+    load_entries,
+    plate_key,
+    within_one_edit,
+)
+
+
+def make_index(*plates: str) -> WatchlistIndex:
+    return WatchlistIndex([WatchlistEntry(p, "stolen") for p in plates])
+
+
+def test_plate_key_merges_separators_and_confusable_characters() -> None:
+    assert plate_key("51a-123.45") == "51A12345"
+    assert plate_key("3OB-I2S") == plate_key("308-125")
+
+
+def test_within_one_edit() -> None:
+    assert within_one_edit("ABC123", "ABC123") == 0
+    assert within_one_edit("ABC123", "ABC128") == 1
+    assert within_one_edit("ABC123", "ABC1234") == 1
+    assert within_one_edit("ABC123", "AC123") == 1
+    assert within_one_edit("ABC123", "ABD128") is None
+    assert within_one_edit("ABC123", "ABC12345") is None
+
+
+def test_exact_match_ignores_formatting_and_ocr_confusions() -> None:
+    index = make_index("51A-123.45")
+    matches = index.lookup("51A12345")
+    assert [(m.entry.plate, m.distance) for m in matches] == [("51A-123.45", 0)]
+    # O/0 và S/5 hay bị OCR đọc nhầm
+    assert index.lookup("5IA-I23.4S")[0].distance == 0
+
+
+def test_single_edit_matches_substitution_insertion_and_deletion() -> None:
+    index = make_index("30F12345")
+    assert index.lookup("30F12349")[0].distance == 1
+    assert index.lookup("30F123456")[0].distance == 1
+    assert index.lookup("30F1235")[0].distance == 1
+    assert index.lookup("30F12399") == []
+    assert index.lookup("30F12349", max_distance=0) == []
+
+
+def test_matches_are_sorted_by_distance() -> None:
+    index = make_index("29A11111", "29A11112", "88C00000")
+    matches = index.lookup("29A11112")
+    assert [(m.entry.plate, m.distance) for m in matches] == [
+        ("29A11112", 0),
+        ("29A11111", 1),
+    ]
+    assert matches[0].to_dict() == {
+        "plate": "29A11112",
+        "list": "stolen",
+        "note": "",
+        "distance": 0,
+    }
+
+
+def test_empty_inputs() -> None:
+    assert make_index().lookup("51A12345") == []
+    assert make_index("51A12345").lookup("--") == []
+
+
+def test_load_entries_reads_csv_and_txt(tmp_path: Path) -> None:
+    (tmp_path / "stolen.csv").write_text(
+        "# biển số,ghi chú\n51A-123.45,xe mất cắp\n\n", encoding="utf-8"
+    )
+    (tmp_path / "vip.txt").write_text("30F12345\n", encoding="utf-8")
+    (tmp_path / "readme.md").write_text("51A99999\n", encoding="utf-8")
+
+    entries = load_entries(str(tmp_path))
+    assert entries == [
+        WatchlistEntry("51A-123.45", "stolen", "xe mất cắp"),
+        WatchlistEntry("30F12345", "vip", ""),
+    ]
+
+
+def test_watchlist_reload(tmp_path: Path) -> None:
+    (tmp_path / "stolen.csv").write_text("51A12345\n", encoding="utf-8")
+    watchlist = Watchlist(str(tmp_path))
+    assert watchlist.lookup("51A12345") == []
+    watchlist.reload()
+    assert len(watchlist) == 1
+    assert watchlist.lookup("51A12345")[0].entry.list_name == "stolen"